@@ -0,0 +1,167 @@
+# async_api.py
+"""Async versions of the CRUD and dashboard endpoints, mounted under /async.
+
+They run on the asyncio engine from database/async_database.py and return
+exactly what their sync counterparts in main.py return, so the two stacks can
+be benchmarked side by side against the same database.
+"""
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.async_database import get_async_db
+from database.dashboard import compute_dashboard_summary
+from database.dashboard_cache import dashboard_cache
+from database.ledger_filters import LedgerFilters
+from models.program import Program as ProgramModel
+from models.ledger_transaction import LedgerTransaction as LedgerTransactionModel
+from models.wbs_category import WbsCategory as WbsCategoryModel
+from models.wbs_subcategory import WbsSubcategory as WbsSubcategoryModel
+from models.edit_history import EditHistory as EditHistoryModel
+from schemas import schemas
+
+router = APIRouter(prefix="/async", tags=["async"])
+
+
+async def _get_or_404(db: AsyncSession, model, object_id: int, label: str):
+    obj = await db.get(model, object_id)
+    if obj is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return obj
+
+
+async def _create(db: AsyncSession, obj):
+    db.add(obj)
+    await db.commit()
+    await db.refresh(obj)
+    return obj
+
+
+async def _update(db: AsyncSession, model, object_id: int, update_schema, label: str):
+    obj = await _get_or_404(db, model, object_id, label)
+    for key, value in update_schema.model_dump(exclude_unset=True).items():
+        setattr(obj, key, value)
+    await db.commit()
+    await db.refresh(obj)
+    return obj
+
+
+async def _delete(db: AsyncSession, model, object_id: int, label: str):
+    obj = await _get_or_404(db, model, object_id, label)
+    await db.delete(obj)
+    await db.commit()
+    return {"detail": f"{label} deleted"}
+
+
+async def _list(db: AsyncSession, stmt, skip: int, limit: Optional[int]):
+    result = await db.execute(stmt.offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+# ---------------------------
+# Programs Endpoints
+# ---------------------------
+@router.post("/programs/", response_model=schemas.Program)
+async def create_program(program: schemas.ProgramCreate, db: AsyncSession = Depends(get_async_db)):
+    return await _create(db, ProgramModel(**program.model_dump()))
+
+@router.get("/programs/", response_model=List[schemas.Program])
+async def read_programs(skip: int = 0, limit: int = None, db: AsyncSession = Depends(get_async_db)):
+    return await _list(db, select(ProgramModel), skip, limit)
+
+@router.put("/programs/{program_id}", response_model=schemas.Program)
+async def update_program(program_id: int, program_update: schemas.ProgramUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await _update(db, ProgramModel, program_id, program_update, "Program")
+
+@router.delete("/programs/{program_id}", response_model=dict)
+async def delete_program(program_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await _delete(db, ProgramModel, program_id, "Program")
+
+# ---------------------------
+# Ledger Transactions Endpoints
+# ---------------------------
+@router.post("/ledger_transactions/", response_model=schemas.LedgerTransaction)
+async def create_ledger_transaction(transaction: schemas.LedgerTransactionCreate, db: AsyncSession = Depends(get_async_db)):
+    return await _create(db, LedgerTransactionModel(**transaction.model_dump()))
+
+@router.get("/ledger_transactions/", response_model=List[schemas.LedgerTransaction])
+async def read_ledger_transactions(skip: int = 0, limit: int = None, filters: LedgerFilters = Depends(), db: AsyncSession = Depends(get_async_db)):
+    return await _list(db, filters.apply(select(LedgerTransactionModel)), skip, limit)
+
+@router.put("/ledger_transactions/{transaction_id}", response_model=schemas.LedgerTransaction)
+async def update_ledger_transaction(transaction_id: int, update_data: schemas.LedgerTransactionUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await _update(db, LedgerTransactionModel, transaction_id, update_data, "Ledger Transaction")
+
+@router.delete("/ledger_transactions/{transaction_id}", response_model=dict)
+async def delete_ledger_transaction(transaction_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await _delete(db, LedgerTransactionModel, transaction_id, "Ledger Transaction")
+
+# ---------------------------
+# WBS Categories Endpoints
+# ---------------------------
+@router.post("/wbs_categories/", response_model=schemas.WbsCategory)
+async def create_wbs_category(category: schemas.WbsCategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    return await _create(db, WbsCategoryModel(**category.model_dump()))
+
+@router.get("/wbs_categories/", response_model=List[schemas.WbsCategory])
+async def read_wbs_categories(skip: int = 0, limit: int = None, db: AsyncSession = Depends(get_async_db)):
+    return await _list(db, select(WbsCategoryModel), skip, limit)
+
+@router.put("/wbs_categories/{category_id}", response_model=schemas.WbsCategory)
+async def update_wbs_category(category_id: int, update_data: schemas.WbsCategoryUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await _update(db, WbsCategoryModel, category_id, update_data, "WBS Category")
+
+@router.delete("/wbs_categories/{category_id}", response_model=dict)
+async def delete_wbs_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await _delete(db, WbsCategoryModel, category_id, "WBS Category")
+
+# ---------------------------
+# WBS Subcategories Endpoints
+# ---------------------------
+@router.post("/wbs_subcategories/", response_model=schemas.WbsSubcategory)
+async def create_wbs_subcategory(subcategory: schemas.WbsSubcategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    return await _create(db, WbsSubcategoryModel(**subcategory.model_dump()))
+
+@router.get("/wbs_subcategories/", response_model=List[schemas.WbsSubcategory])
+async def read_wbs_subcategories(skip: int = 0, limit: int = None, db: AsyncSession = Depends(get_async_db)):
+    return await _list(db, select(WbsSubcategoryModel), skip, limit)
+
+@router.put("/wbs_subcategories/{subcategory_id}", response_model=schemas.WbsSubcategory)
+async def update_wbs_subcategory(subcategory_id: int, update_data: schemas.WbsSubcategoryUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await _update(db, WbsSubcategoryModel, subcategory_id, update_data, "WBS Subcategory")
+
+@router.delete("/wbs_subcategories/{subcategory_id}", response_model=dict)
+async def delete_wbs_subcategory(subcategory_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await _delete(db, WbsSubcategoryModel, subcategory_id, "WBS Subcategory")
+
+# ---------------------------
+# Edit History Endpoint (GET only)
+# ---------------------------
+@router.get("/edit_history/", response_model=List[schemas.EditHistory])
+async def read_edit_history(skip: int = 0, limit: int = None, db: AsyncSession = Depends(get_async_db)):
+    return await _list(db, select(EditHistoryModel).order_by(EditHistoryModel.edited_at.desc()), skip, limit)
+
+# ---------------------------
+# Dashboard Endpoint
+# ---------------------------
+@router.get("/dashboard/summary/", response_model=schemas.DashboardSummary)
+async def get_dashboard_summary(
+    program_id: int = Query(..., description="ID of the program"),
+    as_of_date: str = Query(..., description="Date in YYYY-MM-DD format for financial summary"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        as_of = datetime.strptime(as_of_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+
+    # Same queries and cache as the sync endpoint; run_sync drives them over the async connection.
+    cache_key = as_of.isoformat()
+    summary = dashboard_cache.get(program_id, cache_key)
+    if summary is None:
+        generation = dashboard_cache.generation(program_id)
+        result = await db.run_sync(compute_dashboard_summary, program_id, as_of)
+        summary = schemas.DashboardSummary(**result)
+        dashboard_cache.put(program_id, cache_key, summary, generation)
+    return summary
@@ -0,0 +1,2 @@
+# database/__init__.py
+from .database import Base, engine, SessionLocal
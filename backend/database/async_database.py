@@ -0,0 +1,39 @@
+# async_database.py
+"""Asyncio engine and session factory mirroring database.py.
+
+The URL is the sync DATABASE_URL with an async driver swapped in (aiosqlite
+for SQLite, asyncpg for Postgres). The ORM event listeners registered on
+``Session`` (history, rollup, dashboard cache) also run for async sessions,
+because an AsyncSession drives a regular Session underneath.
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from database.config import install_sqlite_pragmas
+from database.database import DATABASE_URL, settings
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str):
+    """Return ``url`` with the async driver for its backend."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} databases.")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend])
+
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **settings.engine_kwargs(is_async=True))
+install_sqlite_pragmas(async_engine, settings)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,169 @@
+# bulk_ingest.py
+"""Parse and insert batches of ledger transactions.
+
+Rows are validated one by one against ``LedgerTransactionCreate`` so a bad
+row only produces an entry in the error report. Valid rows are written with
+one executemany INSERT per chunk, bypassing the per-object ORM flush; the
+vendor ids, change version, rollup, edit history, dashboard cache and change
+feed are handled explicitly for each chunk.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models.ledger_transaction import LedgerTransaction
+from models.program import Program
+from models.wbs_category import WbsCategory
+from models.wbs_subcategory import WbsSubcategory
+from schemas.schemas import LedgerTransactionCreate
+from database.rollup import add_row_delta, apply_rollup_deltas, new_deltas
+from database.dashboard_cache import dashboard_cache
+from database.history_listener import CREATED_FIELD, history_row, row_snapshot, write_history
+from database.vendors import intern_vendors
+from database.ledger_sync import session_version
+from database.change_feed import change_feed, ledger_events
+
+JSON_TYPES = ("application/json",)
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+class BulkFormatError(ValueError):
+    """The request body as a whole could not be parsed."""
+
+
+def parse_records(body: bytes, content_type: str):
+    """Yield (row_number, record_or_None, parse_error_or_None) from a JSON array, NDJSON or CSV body."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    text = body.decode("utf-8-sig")
+    if media_type in NDJSON_TYPES:
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line), None
+            except json.JSONDecodeError as e:
+                yield number, None, f"Invalid JSON: {e.msg}"
+    elif media_type in CSV_TYPES:
+        reader = csv.DictReader(io.StringIO(text))
+        try:
+            for number, row in enumerate(reader, start=1):
+                # Empty CSV cells mean "not provided".
+                yield number, {k: v for k, v in row.items() if k and v not in ("", None)}, None
+        except csv.Error as e:
+            # Malformed quoting or a field over csv.field_size_limit(); the reader cannot resume.
+            raise BulkFormatError(f"Invalid CSV at line {reader.line_num}: {e}")
+    elif media_type in JSON_TYPES or not media_type:
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BulkFormatError(f"Invalid JSON: {e.msg}")
+        if not isinstance(records, list):
+            raise BulkFormatError("Expected a JSON array of ledger transactions.")
+        for number, record in enumerate(records, start=1):
+            yield number, record, None
+    else:
+        raise BulkFormatError(f"Unsupported content type {media_type!r}. Use JSON, NDJSON or CSV.")
+
+
+def _existing_ids(db: Session, column, ids: set) -> set:
+    if not ids:
+        return set()
+    return set(db.execute(select(column).where(column.in_(ids))).scalars())
+
+
+def _check_references(db: Session, rows: list) -> dict:
+    """Return {row_number: [errors]} for rows pointing at programs or WBS codes that do not exist."""
+    programs = _existing_ids(db, Program.id, {r["program_id"] for _, r in rows})
+    categories = _existing_ids(db, WbsCategory.id, {r["wbs_category_id"] for _, r in rows if r["wbs_category_id"] is not None})
+    subcategories = _existing_ids(db, WbsSubcategory.id, {r["wbs_subcategory_id"] for _, r in rows if r["wbs_subcategory_id"] is not None})
+    errors = {}
+    for number, r in rows:
+        problems = []
+        if r["program_id"] not in programs:
+            problems.append(f"program_id {r['program_id']} does not exist")
+        if r["wbs_category_id"] is not None and r["wbs_category_id"] not in categories:
+            problems.append(f"wbs_category_id {r['wbs_category_id']} does not exist")
+        if r["wbs_subcategory_id"] is not None and r["wbs_subcategory_id"] not in subcategories:
+            problems.append(f"wbs_subcategory_id {r['wbs_subcategory_id']} does not exist")
+        if problems:
+            errors[number] = problems
+    return errors
+
+
+def _insert_chunk(db: Session, chunk: list) -> list:
+    """Insert ``chunk`` without committing; returns the change feed events to publish once committed."""
+    now = datetime.now(timezone.utc)
+    vendors = intern_vendors(db, [r["vendor_name"] for _, r in chunk])
+    version = session_version(db)
+    rows = []
+    names = {}
+    for _, r in chunk:
+        # The name is not stored on the row; the vendor's display name is read through vendor_id.
+        vendor_id, names[vendor_id] = vendors.get(r["vendor_name"], (None, ""))
+        rows.append({**{k: v for k, v in r.items() if k != "vendor_name"},
+                     "vendor_id": vendor_id, "created_at": now, "row_version": version})
+    table = LedgerTransaction.__table__
+    # RETURNING the whole row, unordered, keeps this a batched multi-row INSERT;
+    # asking for parameter order makes SQLite fall back to one INSERT per row.
+    inserted = db.execute(insert(table).returning(*table.c), rows).mappings().all()
+    deltas = new_deltas()
+    history = []
+    for row in inserted:
+        values = {**row, "vendor_name": names[row["vendor_id"]], "created_at": now}
+        add_row_delta(deltas, values, +1)
+        history.append(history_row(table.name, row["id"], CREATED_FIELD, None, row_snapshot(values), now))
+    apply_rollup_deltas(db.connection(), deltas)
+    write_history(db.connection(), history)
+    return ledger_events("insert", [(row["id"], row["program_id"]) for row in inserted], version)
+
+
+def ingest_records(db: Session, records, chunk_size: int = 0) -> dict:
+    """Validate and insert ``records``; ``chunk_size`` 0 means a single transaction for the whole batch."""
+    errors = []
+    valid = []
+    received = 0
+    for number, record, parse_error in records:
+        received += 1
+        if parse_error:
+            errors.append({"row": number, "errors": [parse_error]})
+            continue
+        try:
+            valid.append((number, LedgerTransactionCreate.model_validate(record).model_dump()))
+        except ValidationError as e:
+            errors.append({"row": number, "errors": [
+                f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+            ]})
+
+    reference_errors = _check_references(db, valid)
+    errors.extend({"row": n, "errors": e} for n, e in reference_errors.items())
+    valid = [(n, r) for n, r in valid if n not in reference_errors]
+
+    inserted = 0
+    size = chunk_size if chunk_size and chunk_size > 0 else max(len(valid), 1)
+    for start in range(0, len(valid), size):
+        chunk = valid[start:start + size]
+        try:
+            events = _insert_chunk(db, chunk)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            message = f"Chunk insert failed: {e.__class__.__name__}"
+            errors.extend({"row": n, "errors": [message]} for n, _ in chunk)
+            continue
+        inserted += len(chunk)
+        for program_id in {r["program_id"] for _, r in chunk}:
+            dashboard_cache.invalidate_program(program_id)
+        change_feed.publish(events)
+
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "received": received,
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": errors,
+    }
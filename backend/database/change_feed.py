@@ -0,0 +1,271 @@
+# change_feed.py
+"""Live feed of ledger, WBS and program changes, pushed as they commit.
+
+Writes are collected in ``after_flush``, the hook ``history_listener`` uses,
+and published in ``after_commit``, so subscribers never see a change that was
+rolled back. A transaction's writes are grouped into one event per table,
+operation and program:
+
+    {"seq": 42, "table": "ledger_transactions", "op": "update",
+     "program_id": 3, "ids": [17, 18], "version": 1201}
+
+``version`` is the ledger change version of the transaction (see
+ledger_sync.py) and None for other tables, so a client can fetch the rows
+from ``/ledger_transactions/changes/``. WBS subcategory events carry the
+program of their category. Subscribers ask for one program or for all.
+
+Each subscriber has a queue of at most FEED_QUEUE_SIZE events (default 256).
+Publishing never blocks a commit: a subscriber that falls that far behind is
+dropped with a ``resync`` event instead of being buffered without limit, and
+at most FEED_MAX_SUBSCRIBERS (default 100) streams are open at once. Nothing
+is collected while no one is subscribed.
+
+Code that writes these tables with Core statements publishes
+``ledger_events`` itself after committing. The feed is in-process: with
+several server processes each one streams only its own commits.
+"""
+import asyncio
+import os
+import threading
+from collections import deque
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from models.ledger_transaction import LedgerTransaction
+from models.program import Program
+from models.wbs_category import WbsCategory
+from models.wbs_subcategory import WbsSubcategory
+from database.fast_json import dumps
+from database.ledger_sync import LEDGER_TABLE, taken_version
+
+MAX_SUBSCRIBERS = int(os.environ.get("FEED_MAX_SUBSCRIBERS", "100"))
+QUEUE_SIZE = int(os.environ.get("FEED_QUEUE_SIZE", "256"))
+# An idle stream sends a comment this often, so proxies keep it open and closed clients are noticed.
+HEARTBEAT_SECONDS = float(os.environ.get("FEED_HEARTBEAT_SECONDS", "15"))
+
+TRACKED_MODELS = (Program, LedgerTransaction, WbsCategory, WbsSubcategory)
+
+_PENDING_KEY = "change_feed_pending"
+_VERSION_KEY = "change_feed_version"
+
+
+class FeedFullError(RuntimeError):
+    """Every subscriber slot is taken."""
+
+
+class Subscription:
+    """One subscriber's bounded queue, filled from any thread and read on the subscriber's event loop."""
+
+    def __init__(self, program_id, queue_size: int, loop):
+        self.program_id = program_id
+        self.queue_size = queue_size
+        self.overflowed = False
+        self.closed = False
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def offer(self, events: list) -> bool:
+        """Queue ``events``; returns False if the subscriber is (now) closed."""
+        with self._lock:
+            if self.closed:
+                return False
+            if len(self._events) + len(events) > self.queue_size:
+                self._events.clear()
+                self.overflowed = self.closed = True
+            else:
+                self._events.extend(events)
+        self._wake()
+        return not self.closed
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:  # the subscriber's loop has already stopped
+            self.closed = True
+
+    async def get(self, timeout: float) -> list:
+        """The queued events, waiting up to ``timeout`` seconds for some; [] on timeout or close."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+
+class ChangeFeed:
+    def __init__(self, max_subscribers: int = MAX_SUBSCRIBERS, queue_size: int = QUEUE_SIZE):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.published = 0
+        self.dropped = 0
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, program_id: int = None) -> Subscription:
+        """A new subscription to ``program_id`` (None: every program); call from the subscriber's event loop."""
+        subscription = Subscription(program_id, self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise FeedFullError(f"The change feed already has {self.max_subscribers} subscribers; retry later.")
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+
+    def publish(self, events: list):
+        """Number ``events`` and queue them for the subscribers of their programs."""
+        if not events or not self._subscribers:
+            return
+        with self._lock:
+            for e in events:
+                self._seq += 1
+                e["seq"] = self._seq
+            self.published += len(events)
+            subscribers = self._subscribers
+        for subscription in subscribers:
+            matching = [e for e in events if subscription.program_id in (None, e["program_id"])]
+            if matching and not subscription.offer(matching):
+                if subscription.overflowed:
+                    with self._lock:
+                        self.dropped += 1
+                self.unsubscribe(subscription)
+
+    def close_all(self):
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription.close()
+
+    async def stream(self, subscription: Subscription, is_disconnected, heartbeat: float = HEARTBEAT_SECONDS):
+        """Server-sent events for ``subscription`` until it is closed or the client goes away."""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                events = await subscription.get(heartbeat)
+                for e in events:
+                    yield b"id: %d\nevent: change\ndata: %s\n\n" % (e["seq"], dumps(e))
+                if subscription.overflowed:
+                    detail = {"detail": "Too many unread changes; resync from /ledger_transactions/changes/ and reconnect."}
+                    yield b"event: resync\ndata: %s\n\n" % dumps(detail)
+                    return
+                if subscription.closed:
+                    return
+                if not events:
+                    if await is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+change_feed = ChangeFeed()
+
+
+def feed_events(changes, version: int = None) -> list:
+    """Events for (table, op, record_id, program_id) ``changes``, one per table, op and program."""
+    grouped = {}
+    for table_name, op, record_id, program_id in changes:
+        grouped.setdefault((table_name, op, program_id), {})[record_id] = None
+    return [
+        {"table": table_name, "op": op, "program_id": program_id, "ids": list(ids),
+         "version": version if table_name == LEDGER_TABLE else None}
+        for (table_name, op, program_id), ids in grouped.items()
+    ]
+
+
+def ledger_events(op: str, records, version: int) -> list:
+    """Events for (record_id, program_id) pairs written to the ledger with Core statements."""
+    if not change_feed.has_subscribers():
+        return []
+    return feed_events(((LEDGER_TABLE, op, record_id, program_id) for record_id, program_id in records), version)
+
+
+def _programs(instance) -> set:
+    """Programs a write to ``instance`` belongs to (old and new, for rows moved between programs)."""
+    if isinstance(instance, Program):
+        return {instance.id}
+    programs = {instance.program_id}
+    programs.update(inspect(instance).attrs.program_id.history.deleted)
+    return {p for p in programs if p is not None}
+
+
+def _category_programs(session, category_ids: set) -> dict:
+    """{category_id: program_id}, from the session where possible and one query otherwise."""
+    programs = {}
+    missing = []
+    for category_id in category_ids:
+        category = session.identity_map.get(identity_key(WbsCategory, category_id))
+        if category is not None:
+            programs[category_id] = category.program_id
+        else:
+            missing.append(category_id)
+    if missing:
+        programs.update(session.connection().execute(
+            select(WbsCategory.id, WbsCategory.program_id).where(WbsCategory.id.in_(missing))
+        ).all())
+    return programs
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changes(session, flush_context):
+    if not change_feed.has_subscribers():
+        return
+    changes = session.info.setdefault(_PENDING_KEY, [])
+    subcategories = []
+    for op, instances in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in instances:
+            if not isinstance(obj, TRACKED_MODELS):
+                continue
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            if isinstance(obj, WbsSubcategory):
+                subcategories.append((op, obj))
+                continue
+            changes.extend((obj.__tablename__, op, obj.id, program_id) for program_id in _programs(obj))
+    if subcategories:
+        programs = _category_programs(session, {obj.category_id for _, obj in subcategories})
+        changes.extend((obj.__tablename__, op, obj.id, programs.get(obj.category_id)) for op, obj in subcategories)
+    # ledger_sync forgets the version at commit, before this module's after_commit runs.
+    version = taken_version(session)
+    if version is not None:
+        session.info[_VERSION_KEY] = version
+
+
+@event.listens_for(Session, "after_commit")
+def publish_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    version = session.info.pop(_VERSION_KEY, None)
+    if changes:
+        change_feed.publish(feed_events(changes, version))
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_VERSION_KEY, None)
@@ -0,0 +1,138 @@
+# config.py
+"""Engine configuration read from the environment.
+
+DATABASE_URL selects the database (SQLite by default). SQLite connections get
+the PRAGMAs below on connect; other backends get a tuned connection pool.
+
+    SQLITE_JOURNAL_MODE   WAL          readers no longer block the writer
+    SQLITE_SYNCHRONOUS    NORMAL       safe with WAL, far fewer fsyncs than FULL
+    SQLITE_CACHE_SIZE     -65536       page cache; negative values are KiB (64 MiB)
+    SQLITE_MMAP_SIZE      268435456    bytes of the file to memory-map (256 MiB)
+    SQLITE_BUSY_TIMEOUT   5000         ms to wait on a lock instead of "database is locked"
+    DB_POOL_SIZE          10           persistent connections per process
+    DB_MAX_OVERFLOW       20           extra connections allowed under load
+    DB_POOL_TIMEOUT       30           seconds to wait for a free connection
+    DB_POOL_RECYCLE       1800         seconds before a connection is replaced
+    DB_POOL_PRE_PING      true         check connections before handing them out
+"""
+import logging
+import os
+from dataclasses import dataclass
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE_URL = "sqlite:///./lre_project_v3.db"
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class DatabaseSettings:
+    url: str = DEFAULT_DATABASE_URL
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size: int = -65536
+    sqlite_mmap_size: int = 268435456
+    sqlite_busy_timeout: int = 5000
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    echo: bool = False
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        return cls(
+            url=os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL),
+            sqlite_journal_mode=os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+            sqlite_synchronous=os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+            sqlite_cache_size=int(os.environ.get("SQLITE_CACHE_SIZE", -65536)),
+            sqlite_mmap_size=int(os.environ.get("SQLITE_MMAP_SIZE", 268435456)),
+            sqlite_busy_timeout=int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+            pool_size=int(os.environ.get("DB_POOL_SIZE", 10)),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+            pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", True),
+            echo=_env_bool("DB_ECHO", False),
+        )
+
+    @property
+    def is_sqlite(self) -> bool:
+        return make_url(self.url).get_backend_name() == "sqlite"
+
+    def sqlite_pragmas(self) -> dict:
+        return {
+            "journal_mode": self.sqlite_journal_mode,
+            "synchronous": self.sqlite_synchronous,
+            "cache_size": self.sqlite_cache_size,
+            "mmap_size": self.sqlite_mmap_size,
+            "busy_timeout": self.sqlite_busy_timeout,
+        }
+
+    def engine_kwargs(self, is_async: bool = False) -> dict:
+        """Keyword arguments for create_engine / create_async_engine."""
+        kwargs = {"echo": self.echo}
+        if self.is_sqlite:
+            if not is_async:
+                # Connections are shared across FastAPI's threadpool.
+                kwargs["connect_args"] = {"check_same_thread": False}
+            return kwargs
+        kwargs.update(
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_recycle=self.pool_recycle,
+            pool_pre_ping=self.pool_pre_ping,
+        )
+        return kwargs
+
+
+def install_sqlite_pragmas(engine, settings: DatabaseSettings):
+    """Apply the configured PRAGMAs to every new SQLite connection of ``engine`` (sync or async)."""
+    if not settings.is_sqlite:
+        return
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pragmas = settings.sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def describe_engine(engine, settings: DatabaseSettings) -> dict:
+    """Return the settings actually in effect on ``engine``, read back from the database where possible."""
+    url = engine.url.render_as_string(hide_password=True)
+    report = {"url": url, "dialect": engine.dialect.name, "driver": engine.dialect.driver}
+    if settings.is_sqlite:
+        with engine.connect() as conn:
+            for name in settings.sqlite_pragmas():
+                report[name] = conn.execute(text(f"PRAGMA {name}")).scalar()
+    else:
+        pool = engine.pool
+        report.update(
+            pool_class=type(pool).__name__,
+            pool_size=getattr(pool, "size", lambda: None)(),
+            max_overflow=getattr(pool, "_max_overflow", None),
+            pool_timeout=getattr(pool, "_timeout", None),
+            pool_recycle=getattr(pool, "_recycle", None),
+            pool_pre_ping=getattr(pool, "_pre_ping", None),
+        )
+    return report
+
+
+def log_engine_report(engine, settings: DatabaseSettings):
+    report = describe_engine(engine, settings)
+    logger.info("Database engine: %s", ", ".join(f"{k}={v}" for k, v in report.items()))
+    return report
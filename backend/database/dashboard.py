@@ -0,0 +1,326 @@
+# dashboard.py
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session
+from models.ledger_transaction import LedgerTransaction
+from models.ledger_rollup import LedgerMonthlyRollup
+from models.program import Program
+from models.vendor import Vendor
+
+# Categories whose |planned - actual| exceeds this are reported as variance alerts.
+VARIANCE_ALERT_THRESHOLD = 1000
+TOP_VENDOR_COUNT = 5
+
+
+def month_key(column, dialect_name: str):
+    """SQL expression formatting a date column as YYYY-MM."""
+    if dialect_name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def _sum(expr):
+    return func.coalesce(func.sum(expr), 0)
+
+
+def _as_float(value) -> float:
+    return float(value or 0)
+
+
+def _month_bounds(as_of: date):
+    """First and last day of the month containing ``as_of``."""
+    first = as_of.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first, next_month - timedelta(days=1)
+
+
+def compute_dashboard_summary(db: Session, program_id: int, as_of: date) -> dict:
+    """Build the DashboardSummary payload for one program.
+
+    Everything except the month containing ``as_of`` is read from the
+    ledger_monthly_rollup table, so the cost depends on the number of
+    (category, subcategory, vendor, month) keys rather than ledger rows. The
+    partial month is summed from the ledger through the program/date indexes.
+    """
+    t = LedgerTransaction
+    r = LedgerMonthlyRollup
+    in_program = r.program_id == program_id
+    as_of_month = as_of.strftime("%Y-%m")
+    month_start, month_end = _month_bounds(as_of)
+
+    # Whole months on either side of as_of come from the rollup ...
+    totals = db.execute(
+        select(
+            _sum(case((and_(r.month != "", r.month < as_of_month), r.actual_amount))),
+            _sum(case((and_(r.month != "", r.month < as_of_month), r.planned_amount))),
+            _sum(case((r.month > as_of_month, r.planned_amount))),
+        ).where(in_program)
+    ).one()
+    actuals_to_date, planned_to_date, planned_to_go = (_as_float(v) for v in totals)
+
+    # ... and the month containing as_of is split at as_of from the ledger itself.
+    partial = db.execute(
+        select(
+            _sum(case((t.actual_date.between(month_start, as_of), t.actual_amount))),
+            _sum(case((t.planned_date.between(month_start, as_of), t.planned_amount))),
+            _sum(case((t.planned_date.between(as_of, month_end), t.planned_amount))),
+        ).where(
+            t.program_id == program_id,
+            or_(t.actual_date.between(month_start, month_end), t.planned_date.between(month_start, month_end)),
+        )
+    ).one()
+    actuals_to_date += _as_float(partial[0])
+    planned_to_date += _as_float(partial[1])
+    planned_to_go += _as_float(partial[2])
+
+    # Per-category planned vs actual over the whole ledger (dated or not).
+    category_rows = db.execute(
+        select(r.wbs_category_id, _sum(r.planned_amount), _sum(r.actual_amount))
+        .where(in_program, r.wbs_category_id != 0)
+        .group_by(r.wbs_category_id)
+        .order_by(r.wbs_category_id)
+    ).all()
+    variance_alerts = []
+    for category_id, planned, actual in category_rows:
+        planned, actual = _as_float(planned), _as_float(actual)
+        variance = abs(planned - actual)
+        if variance > VARIANCE_ALERT_THRESHOLD:
+            variance_alerts.append({
+                "wbs_category_id": category_id,
+                "planned": planned,
+                "actual": actual,
+                "variance": variance,
+            })
+
+    # Spend is grouped on the integer vendor key; names are joined on for the top few.
+    vendor_spend = (
+        select(r.vendor_id, _sum(r.actual_amount).label("spend"))
+        .where(in_program, r.vendor_id != 0)
+        .group_by(r.vendor_id)
+        .subquery()
+    )
+    vendor_rows = db.execute(
+        select(Vendor.vendor_name, vendor_spend.c.spend)
+        .join(Vendor, Vendor.id == vendor_spend.c.vendor_id)
+        .order_by(vendor_spend.c.spend.desc(), Vendor.vendor_name)
+        .limit(TOP_VENDOR_COUNT)
+    ).all()
+    top_vendors = [{"vendor": vendor, "spend": _as_float(spend)} for vendor, spend in vendor_rows]
+
+    # Rollup keys are never deleted, so skip months no ledger line is dated in any more.
+    # Months whose dated lines have no (or zero) amounts are still reported, as zeros.
+    month_rows = db.execute(
+        select(r.month, _sum(r.baseline_amount), _sum(r.planned_amount), _sum(r.actual_amount))
+        .where(in_program, r.month != "", r.dated_count > 0)
+        .group_by(r.month)
+        .order_by(r.month)
+    ).all()
+    monthly_cash_flow = {
+        month: {"baseline": _as_float(baseline), "planned": _as_float(planned), "actual": _as_float(actual)}
+        for month, baseline, planned, actual in month_rows
+    }
+
+    etc = planned_to_go
+    eac = actuals_to_date + etc
+
+    return {
+        "program_id": program_id,
+        "as_of_date": as_of.isoformat(),
+        "actuals_to_date": actuals_to_date,
+        "planned_to_date": planned_to_date,
+        "etc": etc,
+        "eac": eac,
+        "monthly_cash_flow": monthly_cash_flow,
+        "variance_alerts": variance_alerts,
+        "top_vendors": top_vendors,
+    }
+
+
+def summarize_ledger_columns(program_id: int, as_of: date, columns: dict) -> dict:
+    """Build the DashboardSummary payload from in-memory ledger columns.
+
+    Applies the rules of ``compute_dashboard_summary`` to a ledger that is not
+    in the database, such as one reconstructed from a snapshot. ``columns``
+    holds equal-length NumPy arrays: ``wbs_category_id`` (0 for none),
+    ``vendor_index`` into the ``vendors`` names ("" for none), and for the
+    baseline, planned and actual kinds ``<kind>_date`` as days since
+    1970-01-01 (-1 for none) and ``<kind>_amount`` as floats. Sums are
+    rounded to cents like the DECIMAL sums in SQL.
+    """
+    as_of_day = (as_of - date(1970, 1, 1)).days
+    actual_day, actual = columns["actual_date"], columns["actual_amount"]
+    planned_day, planned = columns["planned_date"], columns["planned_amount"]
+
+    actuals_to_date = round(float(actual[(actual_day >= 0) & (actual_day <= as_of_day)].sum()), 2)
+    planned_to_date = round(float(planned[(planned_day >= 0) & (planned_day <= as_of_day)].sum()), 2)
+    etc = round(float(planned[planned_day >= as_of_day].sum()), 2)
+
+    variance_alerts = []
+    categories, category_index = np.unique(columns["wbs_category_id"], return_inverse=True)
+    category_planned = np.bincount(category_index, weights=planned, minlength=len(categories))
+    category_actual = np.bincount(category_index, weights=actual, minlength=len(categories))
+    for category_id, category_plan, category_spend in zip(categories.tolist(), category_planned, category_actual):
+        if category_id == 0:
+            continue
+        category_plan, category_spend = round(float(category_plan), 2), round(float(category_spend), 2)
+        variance = abs(category_plan - category_spend)
+        if variance > VARIANCE_ALERT_THRESHOLD:
+            variance_alerts.append({
+                "wbs_category_id": category_id,
+                "planned": category_plan,
+                "actual": category_spend,
+                "variance": variance,
+            })
+
+    vendors = columns["vendors"]
+    vendor_spend = np.bincount(columns["vendor_index"], weights=actual, minlength=len(vendors))
+    ranked = sorted(((round(float(spend), 2), vendor) for vendor, spend in zip(vendors.tolist(), vendor_spend) if vendor),
+                    key=lambda item: (-item[0], item[1]))
+    top_vendors = [{"vendor": vendor, "spend": spend} for spend, vendor in ranked[:TOP_VENDOR_COUNT]]
+
+    # Month of each dated amount, as months since 1970-01.
+    kinds = ("baseline", "planned", "actual")
+    dated = {}
+    for kind in kinds:
+        days = columns[f"{kind}_date"]
+        valid = days >= 0
+        months = days[valid].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        dated[kind] = (months, columns[f"{kind}_amount"][valid])
+    all_months = np.unique(np.concatenate([months for months, _ in dated.values()]))
+    sums = {
+        kind: np.bincount(np.searchsorted(all_months, months), weights=amounts, minlength=len(all_months))
+        for kind, (months, amounts) in dated.items()
+    }
+    labels = np.datetime_as_string(all_months.astype("datetime64[M]"), unit="M")
+    monthly_cash_flow = {
+        month: {kind: round(float(sums[kind][i]), 2) for kind in kinds}
+        for i, month in enumerate(labels.tolist())
+    }
+
+    return {
+        "program_id": program_id,
+        "as_of_date": as_of.isoformat(),
+        "actuals_to_date": actuals_to_date,
+        "planned_to_date": planned_to_date,
+        "etc": etc,
+        "eac": actuals_to_date + etc,
+        "monthly_cash_flow": monthly_cash_flow,
+        "variance_alerts": variance_alerts,
+        "top_vendors": top_vendors,
+    }
+
+
+def compute_portfolio_summary(db: Session, as_of: date, program_status: str = None, program_ids=None,
+                              top_variances: int = 3) -> dict:
+    """Dashboard figures for many programs at once, in a fixed number of grouped queries.
+
+    Uses the same rules as ``compute_dashboard_summary`` (rollup for whole
+    months, ledger for the month containing ``as_of``) but groups every query
+    by program, so the cost does not multiply by the number of programs.
+    """
+    t = LedgerTransaction
+    r = LedgerMonthlyRollup
+    as_of_month = as_of.strftime("%Y-%m")
+    month_start, month_end = _month_bounds(as_of)
+
+    program_filter = []
+    if program_status is not None:
+        program_filter.append(Program.program_status == program_status)
+    if program_ids:
+        program_filter.append(Program.id.in_(program_ids))
+    programs = db.execute(
+        select(Program.id, Program.program_name, Program.program_code, Program.program_status)
+        .where(*program_filter)
+        .order_by(Program.id)
+    ).all()
+    selected = select(Program.id).where(*program_filter).scalar_subquery()
+
+    # The later queries select the programs again, so they can return a program
+    # created (or moved into the filter) since the list was read; its rows are skipped.
+    figures = {p.id: {"actuals_to_date": 0.0, "planned_to_date": 0.0, "etc": 0.0} for p in programs}
+
+    totals = db.execute(
+        select(
+            r.program_id,
+            _sum(case((and_(r.month != "", r.month < as_of_month), r.actual_amount))),
+            _sum(case((and_(r.month != "", r.month < as_of_month), r.planned_amount))),
+            _sum(case((r.month > as_of_month, r.planned_amount))),
+        ).where(r.program_id.in_(selected)).group_by(r.program_id)
+    ).all()
+    for program_id, actual, planned, to_go in totals:
+        if program_id not in figures:
+            continue
+        figures[program_id]["actuals_to_date"] += _as_float(actual)
+        figures[program_id]["planned_to_date"] += _as_float(planned)
+        figures[program_id]["etc"] += _as_float(to_go)
+
+    # The partial month is read in two queries so each can seek its own
+    # (program_id, date) index instead of scanning for an OR of two dates.
+    partial_actuals = db.execute(
+        select(t.program_id, _sum(case((t.actual_date <= as_of, t.actual_amount))))
+        .where(t.program_id.in_(selected), t.actual_date.between(month_start, month_end))
+        .group_by(t.program_id)
+    ).all()
+    for program_id, actual in partial_actuals:
+        if program_id not in figures:
+            continue
+        figures[program_id]["actuals_to_date"] += _as_float(actual)
+    partial_planned = db.execute(
+        select(
+            t.program_id,
+            _sum(case((t.planned_date <= as_of, t.planned_amount))),
+            _sum(case((t.planned_date >= as_of, t.planned_amount))),
+        )
+        .where(t.program_id.in_(selected), t.planned_date.between(month_start, month_end))
+        .group_by(t.program_id)
+    ).all()
+    for program_id, planned, to_go in partial_planned:
+        if program_id not in figures:
+            continue
+        figures[program_id]["planned_to_date"] += _as_float(planned)
+        figures[program_id]["etc"] += _as_float(to_go)
+
+    variances = {p.id: [] for p in programs}
+    category_rows = db.execute(
+        select(r.program_id, r.wbs_category_id, _sum(r.planned_amount), _sum(r.actual_amount))
+        .where(r.program_id.in_(selected), r.wbs_category_id != 0)
+        .group_by(r.program_id, r.wbs_category_id)
+    ).all()
+    for program_id, category_id, planned, actual in category_rows:
+        if program_id not in figures:
+            continue
+        planned, actual = _as_float(planned), _as_float(actual)
+        variances[program_id].append({
+            "wbs_category_id": category_id,
+            "planned": planned,
+            "actual": actual,
+            "variance": abs(planned - actual),
+        })
+
+    entries = []
+    for p in programs:
+        f = figures[p.id]
+        alerts = sorted(variances[p.id], key=lambda v: (-v["variance"], v["wbs_category_id"]))
+        entries.append({
+            "program_id": p.id,
+            "program_name": p.program_name,
+            "program_code": p.program_code,
+            "program_status": p.program_status,
+            "actuals_to_date": f["actuals_to_date"],
+            "planned_to_date": f["planned_to_date"],
+            "etc": f["etc"],
+            "eac": f["actuals_to_date"] + f["etc"],
+            "variance_alert_count": sum(1 for v in alerts if v["variance"] > VARIANCE_ALERT_THRESHOLD),
+            "top_variances": alerts[:top_variances],
+        })
+
+    return {
+        "as_of_date": as_of.isoformat(),
+        "program_count": len(entries),
+        "actuals_to_date": sum(e["actuals_to_date"] for e in entries),
+        "planned_to_date": sum(e["planned_to_date"] for e in entries),
+        "etc": sum(e["etc"] for e in entries),
+        "eac": sum(e["eac"] for e in entries),
+        "programs": entries,
+    }
@@ -0,0 +1,119 @@
+# dashboard_cache.py
+"""In-process LRU/TTL cache for dashboard summaries.
+
+Entries are keyed on (program_id, as_of_date). Ledger transaction and WBS
+category writes mark their program dirty in ``after_flush`` and the program's
+entries are dropped in ``after_commit``. Each program also carries a
+generation number that is bumped on invalidation; a summary computed while a
+write was committing is not stored, so a stale result can never be cached.
+Code that writes those tables with Core statements must call
+``dashboard_cache.invalidate_program`` after committing.
+"""
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models.ledger_transaction import LedgerTransaction
+from models.wbs_category import WbsCategory
+from models.program import Program
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 300
+
+_DIRTY_KEY = "dashboard_cache_dirty_programs"
+
+
+class DashboardCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # (program_id, as_of) -> (expires_at, value)
+        self._generations = {}  # program_id -> int
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self, program_id: int) -> int:
+        with self._lock:
+            return self._generations.get(program_id, 0)
+
+    def get(self, program_id: int, as_of: str):
+        key = (program_id, as_of)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, program_id: int, as_of: str, value, generation: int):
+        """Store ``value`` unless the program was invalidated since ``generation`` was read."""
+        with self._lock:
+            if self._generations.get(program_id, 0) != generation:
+                return
+            self._entries[(program_id, as_of)] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end((program_id, as_of))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_program(self, program_id: int):
+        with self._lock:
+            self._generations[program_id] = self._generations.get(program_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == program_id]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+dashboard_cache = DashboardCache()
+
+
+def _affected_programs(instance):
+    """Program ids whose dashboard a write to ``instance`` can change (old and new)."""
+    if isinstance(instance, Program):
+        return {instance.id}
+    if not isinstance(instance, (LedgerTransaction, WbsCategory)):
+        return set()
+    programs = {instance.program_id}
+    hist = inspect(instance).attrs["program_id"].history
+    programs.update(hist.deleted)
+    return programs
+
+
+@event.listens_for(Session, "after_flush")
+def collect_dirty_programs(session, flush_context):
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        dirty.update(p for p in _affected_programs(instance) if p is not None)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_dirty_programs(session):
+    for program_id in session.info.pop(_DIRTY_KEY, ()):
+        dashboard_cache.invalidate_program(program_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_dirty_programs(session):
+    session.info.pop(_DIRTY_KEY, None)
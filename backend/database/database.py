@@ -1,16 +1,21 @@
 # database.py
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from database.config import DatabaseSettings, install_sqlite_pragmas
 
-# For development, we use SQLite. Later, you can change this to PostgreSQL for production.
-DATABASE_URL = "sqlite:///./lre_project_v3.db"
+# SQLite by default; set DATABASE_URL (e.g. in docker-compose.yml) to use PostgreSQL.
+# Pool and PRAGMA tuning is read from the environment too; see database/config.py.
+settings = DatabaseSettings.from_env()
+DATABASE_URL = settings.url
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}  # This flag is required for SQLite
-)
+engine = create_engine(DATABASE_URL, **settings.engine_kwargs())
+install_sqlite_pragmas(engine, settings)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Rows per multi-row INSERT, or ids per IN list, when writing in batches; keeps
+# each statement under SQLite's bound-parameter limit (32766) for rows of up to 65 columns.
+PARAMETER_BATCH = 500
+
 from sqlalchemy.orm import declarative_base
 Base = declarative_base()
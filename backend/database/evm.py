@@ -0,0 +1,101 @@
+# evm.py
+"""Earned value (EVM) time series for a program.
+
+The baseline (BCWS), earned (BCWP) and actual (ACWP) sums of a program are
+read per month from ledger_monthly_rollup (one grouped query, so only a row
+per month crosses the driver), loaded into NumPy arrays, spread over a
+contiguous month axis with ``np.bincount`` and turned into cumulative series
+and indices in vectorized form. The cost does not depend on the number of
+ledger rows.
+
+* BCWS: baseline amounts by baseline month (planned value)
+* BCWP: baseline amounts of performed lines by actual month (earned value)
+* ACWP: actual amounts by actual month (actual cost)
+* BAC: the program's total baseline, dated or not
+* CV = BCWP - ACWP, SV = BCWP - BCWS, CPI = BCWP / ACWP, SPI = BCWP / BCWS,
+  TCPI = (BAC - BCWP) / (BAC - ACWP), all cumulative
+
+Ratios whose denominator is zero are reported as None.
+"""
+from datetime import date
+from typing import Optional
+import numpy as np
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
+from models.ledger_rollup import LedgerMonthlyRollup
+
+
+def _load_monthly_sums(db: Session, program_id: int):
+    """(months, baseline, earned, actual) arrays with one entry per rollup month of the program."""
+    r = LedgerMonthlyRollup
+    rows = db.execute(
+        select(r.month, *(func.sum(cast(column, Float)) for column in (r.baseline_amount, r.earned_amount, r.actual_amount)))
+        .where(r.program_id == program_id)
+        .group_by(r.month)
+    ).all()
+    if not rows:
+        empty = np.zeros(0)
+        return np.array([], dtype="datetime64[M]"), empty, empty, empty
+    months, baseline, earned, actual = zip(*rows)
+    # "" (undated) parses as NaT.
+    return (np.array(months, dtype="datetime64[M]"),
+            np.asarray(baseline, dtype=float), np.asarray(earned, dtype=float), np.asarray(actual, dtype=float))
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def _optional(values: np.ndarray) -> list:
+    return [None if np.isnan(v) else float(v) for v in values.tolist()]
+
+
+def compute_evm_series(db: Session, program_id: int, as_of: Optional[date] = None) -> dict:
+    """Monthly and cumulative EVM series for the program's life, cut at ``as_of``'s month if given.
+
+    The summary figures (CPI, SPI, TCPI, EAC, VAC) are those of the last month in the series.
+    """
+    months, baseline, earned, actual = _load_monthly_sums(db, program_id)
+    bac = float(np.round(baseline.sum(), 2))
+
+    dated = ~np.isnat(months)
+    months, baseline, earned, actual = months[dated], baseline[dated], earned[dated], actual[dated]
+    if as_of is not None:
+        in_range = months <= np.datetime64(as_of, "M")
+        months, baseline, earned, actual = months[in_range], baseline[in_range], earned[in_range], actual[in_range]
+
+    result = {"program_id": program_id, "as_of_date": as_of.isoformat() if as_of else None, "bac": bac,
+              "cpi": None, "spi": None, "tcpi": None, "eac": None, "vac": None, "months": []}
+    if months.size == 0:
+        return result
+
+    first = months.min()
+    count = int((months.max() - first).astype(int)) + 1
+    bucket = (months - first).astype(int)
+    bcws = np.round(np.bincount(bucket, weights=baseline, minlength=count), 2)
+    bcwp = np.round(np.bincount(bucket, weights=earned, minlength=count), 2)
+    acwp = np.round(np.bincount(bucket, weights=actual, minlength=count), 2)
+    cum_bcws, cum_bcwp, cum_acwp = (np.round(np.cumsum(s), 2) for s in (bcws, bcwp, acwp))
+    cv = np.round(cum_bcwp - cum_acwp, 2)
+    sv = np.round(cum_bcwp - cum_bcws, 2)
+    cpi = _ratio(cum_bcwp, cum_acwp)
+    spi = _ratio(cum_bcwp, cum_bcws)
+    tcpi = _ratio(bac - cum_bcwp, bac - cum_acwp)
+
+    labels = np.datetime_as_string(first + np.arange(count), unit="M").tolist()
+    columns = {
+        "bcws": bcws.tolist(), "bcwp": bcwp.tolist(), "acwp": acwp.tolist(),
+        "cum_bcws": cum_bcws.tolist(), "cum_bcwp": cum_bcwp.tolist(), "cum_acwp": cum_acwp.tolist(),
+        "cv": cv.tolist(), "sv": sv.tolist(),
+        "cpi": _optional(cpi), "spi": _optional(spi), "tcpi": _optional(tcpi),
+    }
+    result["months"] = [dict(zip(columns, values), month=label) for label, *values in zip(labels, *columns.values())]
+
+    last = result["months"][-1]
+    result.update(cpi=last["cpi"], spi=last["spi"], tcpi=last["tcpi"])
+    if last["cpi"]:
+        result["eac"] = round(bac / last["cpi"], 2)
+        result["vac"] = round(bac - result["eac"], 2)
+    return result
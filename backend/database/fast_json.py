@@ -0,0 +1,69 @@
+# fast_json.py
+"""Fast path for large list responses.
+
+Instead of hydrating ORM objects and validating each one through a Pydantic
+``from_attributes`` model, list endpoints select plain column tuples and
+encode them in one go with orjson. The output is byte-for-byte what FastAPI
+produces for the response_model: same key order, Decimals as strings, dates
+and datetimes in ISO format, compact separators.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import Response
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # Pydantic writes UTC offsets as "Z".
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def schema_columns(model, schema) -> list:
+    """Columns of ``model`` in the field order of the Pydantic ``schema``.
+
+    A field mapped to a SQL expression rather than a table column (such as
+    the ledger's vendor_name) is selected labelled with the field's name.
+    """
+    table = model.__table__
+    mapped = model.__mapper__.columns
+    return [table.c[name] if name in table.c else mapped[name].label(name) for name in schema.model_fields]
+
+
+def select_for_schema(model, schema):
+    """A Core SELECT of exactly the columns ``schema`` serializes, in its field order."""
+    return select(*schema_columns(model, schema))
+
+
+def rows_as_dicts(rows, columns) -> list:
+    names = [c.name for c in columns]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def rows_as_columns(rows, columns) -> dict:
+    """{column name: [values]}: the column-oriented form of ``rows_as_dicts``, without repeated keys."""
+    names = [c.name for c in columns]
+    values = list(zip(*rows)) or [()] * len(names)
+    return {name: list(column) for name, column in zip(names, values)}
+
+
+def json_response(payload) -> Response:
+    return Response(content=dumps(payload), media_type="application/json")
@@ -0,0 +1,207 @@
+# history_archive.py
+"""Retention for edit_history: move old rows into compressed monthly archives.
+
+Rows older than HISTORY_RETENTION_DAYS (default 365) are written to
+zstd-compressed NDJSON files under HISTORY_ARCHIVE_DIR, one part per month
+and run, named ``edit_history-YYYY-MM-<first id>-<last id>.ndjson.zst``.
+Then they are deleted from the table. Each part is first written to a
+temporary file and renamed into place just before the delete commits. A
+failed commit can therefore leave a row both archived and in the table,
+but a crash can never lose one; readers skip such duplicates.
+
+``iter_archived`` reads the parts back newest first, so the history API can
+continue past the end of the hot table (``include_archived=true``).
+
+    python -m database.history_archive --older-than-days 365
+"""
+import argparse
+import heapq
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from models.edit_history import EditHistory
+from database.database import PARAMETER_BATCH
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is in requirements.txt
+    zstandard = None
+
+ARCHIVE_DIR = os.environ.get(
+    "HISTORY_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "history_archive"),
+)
+RETENTION_DAYS = int(os.environ.get("HISTORY_RETENTION_DAYS", "365"))
+ARCHIVE_BATCH = 50000
+ZSTD_LEVEL = 10
+
+_PART_NAME = re.compile(r"^edit_history-(\d{4}-\d{2})-(\d+)-(\d+)\.ndjson\.zst$")
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise RuntimeError("Archiving edit history requires the zstandard package.")
+
+
+def _sort_key(row: dict):
+    return row["edited_at"], row["id"]
+
+
+def _encode(row: dict) -> dict:
+    return {**row, "edited_at": row["edited_at"].isoformat() if row["edited_at"] else None}
+
+
+def _decode(row: dict) -> dict:
+    return {**row, "edited_at": datetime.fromisoformat(row["edited_at"]) if row["edited_at"] else None}
+
+
+def _write_part(archive_dir: str, month: str, rows: list) -> tuple:
+    """Write ``rows`` (one month, oldest first) to a temporary part; returns (tmp_path, final_path)."""
+    name = f"edit_history-{month}-{rows[0]['id']:012d}-{rows[-1]['id']:012d}.ndjson.zst"
+    final_path = os.path.join(archive_dir, name)
+    tmp_path = final_path + ".tmp"
+    payload = "".join(json.dumps(_encode(r), separators=(",", ":")) + "\n" for r in rows).encode()
+    with open(tmp_path, "wb") as f:
+        f.write(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload))
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path, final_path
+
+
+def archive_history(engine, cutoff: datetime, archive_dir: str = None) -> dict:
+    """Move edit_history rows edited before ``cutoff`` into archive parts; returns {month: rows archived}."""
+    _require_zstandard()
+    archive_dir = archive_dir or ARCHIVE_DIR
+    os.makedirs(archive_dir, exist_ok=True)
+    table = EditHistory.__table__
+    archived = defaultdict(int)
+    while True:
+        with engine.begin() as conn:
+            rows = [dict(r) for r in conn.execute(
+                select(table).where(table.c.edited_at < cutoff)
+                .order_by(table.c.edited_at, table.c.id).limit(ARCHIVE_BATCH)
+            ).mappings()]
+            if not rows:
+                break
+            by_month = defaultdict(list)
+            for row in rows:
+                by_month[row["edited_at"].strftime("%Y-%m")].append(row)
+            parts = [_write_part(archive_dir, month, month_rows) for month, month_rows in by_month.items()]
+            ids = [r["id"] for r in rows]
+            for start in range(0, len(ids), PARAMETER_BATCH):
+                conn.execute(delete(table).where(table.c.id.in_(ids[start:start + PARAMETER_BATCH])))
+            for tmp_path, final_path in parts:
+                os.replace(tmp_path, final_path)
+            for month, month_rows in by_month.items():
+                archived[month] += len(month_rows)
+    return dict(archived)
+
+
+def archive_parts(archive_dir: str = None) -> dict:
+    """{month: [part paths]} of the archive, months newest first."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    if not os.path.isdir(archive_dir):
+        return {}
+    parts = defaultdict(list)
+    for name in os.listdir(archive_dir):
+        match = _PART_NAME.match(name)
+        if match:
+            parts[match.group(1)].append(os.path.join(archive_dir, name))
+    return {month: sorted(parts[month]) for month in sorted(parts, reverse=True)}
+
+
+def drop_archived(table_names, archive_dir: str = None) -> int:
+    """Remove the archived rows of ``table_names``; returns how many were removed.
+
+    Parts holding other tables' rows too are rewritten without them (through
+    a temporary file, like new parts); parts left empty are deleted.
+    """
+    removed = 0
+    for month, paths in archive_parts(archive_dir).items():
+        for path in paths:
+            rows = read_part(path)
+            kept = [row for row in rows if row["table_name"] not in table_names]
+            if len(kept) == len(rows):
+                continue
+            removed += len(rows) - len(kept)
+            if kept:
+                tmp_path, final_path = _write_part(os.path.dirname(path), month, kept)
+                os.replace(tmp_path, final_path)
+                if final_path != path:
+                    os.remove(path)
+            else:
+                os.remove(path)
+    return removed
+
+
+def read_part(path: str) -> list:
+    _require_zstandard()
+    with open(path, "rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        text = reader.read().decode()
+    return [_decode(json.loads(line)) for line in text.splitlines() if line]
+
+
+def iter_archived(before: tuple = None, table_name: str = None, record_id: int = None, archive_dir: str = None,
+                  after: datetime = None):
+    """Yield archived rows newest first on (edited_at, id), only those strictly before ``before``
+    and, if ``after`` is given, edited after it.
+
+    A month is decompressed only when iteration reaches it, so reading one
+    page touches one or two parts, and months before ``after`` are never read.
+    """
+    before = tuple(before) if before else None
+    before_month = before[0].strftime("%Y-%m") if before else None
+    after_month = after.strftime("%Y-%m") if after else None
+    for month, paths in archive_parts(archive_dir).items():
+        if before_month and month > before_month:
+            continue
+        if after_month and month < after_month:
+            break
+        rows = [r for path in paths for r in read_part(path)]
+        rows.sort(key=_sort_key, reverse=True)
+        for row in rows:
+            if before and _sort_key(row) >= before:
+                continue
+            if after and row["edited_at"] <= after:
+                break
+            if table_name is not None and row["table_name"] != table_name:
+                continue
+            if record_id is not None and row["record_id"] != record_id:
+                continue
+            yield row
+
+
+def merge_newest_first(*streams):
+    """Merge row streams sorted newest first, dropping rows that appear in more than one."""
+    last_key = None
+    for row in heapq.merge(*streams, key=_sort_key, reverse=True):
+        key = _sort_key(row)
+        if key != last_key:
+            last_key = key
+            yield row
+
+
+def main(argv=None):
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Move old edit history into compressed monthly archives.")
+    parser.add_argument("--older-than-days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    args = parser.parse_args(argv)
+
+    # edited_at is stored without a timezone (UTC), so compare with a naive UTC cutoff.
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=args.older_than_days)
+    archived = archive_history(engine, cutoff, args.archive_dir)
+    for month, count in sorted(archived.items()):
+        print(f"{month}: {count} rows archived")
+    print(f"{sum(archived.values())} rows older than {cutoff:%Y-%m-%d} archived to {args.archive_dir}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,51 +1,122 @@
 # history_listener.py
-from sqlalchemy import event
+from sqlalchemy import event, insert
 from sqlalchemy.orm import Session
 from sqlalchemy import inspect
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from models.edit_history import EditHistory
+from models.ledger_rollup import LedgerMonthlyRollup
+from database.database import PARAMETER_BATCH
+import json
 import logging
+import os
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Per-change log lines are off by default; set HISTORY_LOG_LEVEL=INFO to see them.
+logger.setLevel(os.environ.get("HISTORY_LOG_LEVEL", "WARNING").upper())
+
+# field_changed markers for whole-row events. The row's column values are
+# stored as a JSON object in new_value (insert) or old_value (delete).
+CREATED_FIELD = "__created__"
+DELETED_FIELD = "__deleted__"
+
+# Tables whose writes are not audited.
+UNTRACKED_MODELS = (EditHistory, LedgerMonthlyRollup)
+# Bookkeeping columns left out of history entries (row_version: see ledger_sync.py).
+UNTRACKED_COLUMNS = ("row_version",)
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def row_snapshot(values: dict) -> str:
+    """Serialize a row's column values for a created/deleted history entry."""
+    return json.dumps({key: _json_value(value) for key, value in values.items() if key not in UNTRACKED_COLUMNS},
+                      sort_keys=True)
+
+
+def history_row(table_name, record_id, field, old_value, new_value, edited_at, edited_by="system"):
+    return {
+        "edited_by": edited_by,
+        "edited_at": edited_at,
+        "field_changed": field,
+        "old_value": str(old_value) if old_value is not None else None,
+        "new_value": str(new_value) if new_value is not None else None,
+        "record_id": record_id,
+        "table_name": table_name,
+    }
+
+
+def write_history(connection, rows: list):
+    """Insert collected history rows with one multi-row INSERT per batch."""
+    table = EditHistory.__table__
+    for start in range(0, len(rows), PARAMETER_BATCH):
+        connection.execute(insert(table).values(rows[start:start + PARAMETER_BATCH]))
+
+
+def _column_values(instance) -> dict:
+    insp = inspect(instance)
+    values = {}
+    for attr in insp.mapper.column_attrs:
+        hist = insp.attrs[attr.key].history
+        # For a deleted row the pre-delete value is the unchanged or the removed one.
+        current = hist.unchanged or hist.added or hist.deleted
+        values[attr.key] = current[0] if current else None
+    return values
+
+
+def collect_changes(session: Session, edited_at) -> list:
+    rows = []
+    for instance in session.new:
+        if isinstance(instance, UNTRACKED_MODELS):
+            continue
+        rows.append(history_row(instance.__tablename__, instance.id, CREATED_FIELD,
+                                None, row_snapshot(_column_values(instance)), edited_at))
 
-def create_edit_history(session: Session):
-    # Loop through all updated objects in the session.
     for instance in session.dirty:
-        # Skip if the object isn’t modified or is an EditHistory record itself.
-        if not session.is_modified(instance, include_collections=False):
+        # Skip if the object isn’t modified or is an untracked record itself.
+        if isinstance(instance, UNTRACKED_MODELS):
             continue
-        if isinstance(instance, EditHistory):
+        insp = inspect(instance)
+        # committed_state holds only the attributes touched since the last flush,
+        # so unchanged columns are never visited.
+        changed_keys = [key for key in insp.committed_state
+                        if key in insp.mapper.column_attrs and key not in UNTRACKED_COLUMNS]
+        for key in changed_keys:
+            hist = insp.attrs[key].history
+            if not hist.has_changes():
+                continue
+            old_value = hist.deleted[0] if hist.deleted else None
+            new_value = hist.added[0] if hist.added else None
+            # Record only if the value actually changed.
+            if old_value != new_value:
+                rows.append(history_row(instance.__tablename__, instance.id, key, old_value, new_value, edited_at))
+
+    for instance in session.deleted:
+        if isinstance(instance, UNTRACKED_MODELS):
             continue
+        rows.append(history_row(instance.__tablename__, instance.id, DELETED_FIELD,
+                                row_snapshot(_column_values(instance)), None, edited_at))
+    return rows
 
-        table_name = instance.__tablename__
-        record_id = getattr(instance, "id", 0)  # Use 0 if id isn’t set yet.
 
-        # Use SQLAlchemy’s inspection to check attribute changes.
-        insp = inspect(instance)
-        for attr in insp.attrs:
-            hist = attr.history
-            if hist.has_changes():
-                old_value = hist.deleted[0] if hist.deleted else None
-                new_value = hist.added[0] if hist.added else None
-
-                # Log only if the value actually changed.
-                if old_value != new_value:
-                    logger.info(f"Change detected in {table_name}: {attr.key} from '{old_value}' to '{new_value}'")
-
-                    
-                    edit_history = EditHistory(
-                        edited_by="system",  # Replace with current user if available.
-                        field_changed=attr.key,
-                        old_value=str(old_value) if old_value is not None else None,
-                        new_value=str(new_value) if new_value is not None else None,
-                        record_id=record_id,
-                        table_name=table_name,
-                    )
-                    session.add(edit_history)
+def create_edit_history(session: Session):
+    rows = collect_changes(session, datetime.now(timezone.utc))
+    if not rows:
+        return
+    if logger.isEnabledFor(logging.INFO):
+        for row in rows:
+            logger.info("Change detected in %s #%s: %s from %r to %r", row["table_name"], row["record_id"],
+                        row["field_changed"], row["old_value"], row["new_value"])
+    write_history(session.connection(), rows)
 
 @event.listens_for(Session, "after_flush")
 def after_flush(session, flush_context):
-    logger.info("after_flush event triggered.")
     create_edit_history(session)
@@ -0,0 +1,126 @@
+# history_timeline.py
+"""One record's change timeline and its state at any point in time.
+
+The state is reconstructed by starting from the current row and undoing,
+newest first, every EditHistory entry made after the requested time:
+a field change restores its old value, a ``__deleted__`` entry restores the
+snapshot taken at deletion, and a ``__created__`` entry means the record did
+not exist yet. Rows come from ix_edit_history_record, so the cost depends on
+the record's own history, not on the size of the table. Archived months are
+read only if they can hold changes made after the requested time.
+"""
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models.edit_history import EditHistory
+from models.ledger_transaction import LedgerTransaction
+from models.program import Program
+from models.wbs_category import WbsCategory
+from models.wbs_subcategory import WbsSubcategory
+from database.history_archive import iter_archived, merge_newest_first
+from database.history_listener import CREATED_FIELD, DELETED_FIELD, UNTRACKED_COLUMNS
+
+
+def _mapped_columns(model) -> dict:
+    """{name: SELECT item} for the model's table columns and the SQL expressions it maps (the ledger's vendor_name)."""
+    table = model.__table__
+    return {name: table.c[name] if name in table.c else column.label(name)
+            for name, column in model.__mapper__.columns.items()}
+
+
+AUDITED_TABLES = {model.__tablename__: _mapped_columns(model) for model in (Program, LedgerTransaction, WbsCategory, WbsSubcategory)}
+
+
+class UnknownTableError(ValueError):
+    """The table name is not one whose changes are audited."""
+
+
+def _audited_table(table_name: str):
+    if table_name not in AUDITED_TABLES:
+        raise UnknownTableError(f"Unknown table {table_name!r}. Use one of: {', '.join(AUDITED_TABLES)}.")
+    return AUDITED_TABLES[table_name]
+
+
+def _as_utc_naive(moment: datetime) -> datetime:
+    """edited_at is stored as naive UTC; convert an aware timestamp to match."""
+    if moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def typed_value(column, value):
+    """Turn a value from a history entry (stored as text) back into the column's Python type."""
+    if not isinstance(value, str):
+        return value
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    if python_type is int:
+        return int(value)
+    return value
+
+
+def _history_rows(db: Session, table_name: str, record_id: int, after: datetime = None, newest_first: bool = True):
+    h = EditHistory.__table__
+    order = (h.c.edited_at.desc(), h.c.id.desc()) if newest_first else (h.c.edited_at, h.c.id)
+    stmt = select(h).where(h.c.table_name == table_name, h.c.record_id == record_id).order_by(*order)
+    if after is not None:
+        stmt = stmt.where(h.c.edited_at > after)
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+
+def record_timeline(db: Session, table_name: str, record_id: int, include_archived: bool = False) -> list:
+    """Every history entry of one record, oldest first."""
+    _audited_table(table_name)
+    if not include_archived:
+        return _history_rows(db, table_name, record_id, newest_first=False)
+    hot = _history_rows(db, table_name, record_id)
+    merged = list(merge_newest_first(iter(hot), iter_archived(table_name=table_name, record_id=record_id)))
+    merged.reverse()
+    return merged
+
+
+def reconstruct_record(db: Session, table_name: str, record_id: int, as_of: datetime):
+    """Return (state or None, entries undone, record known) for the record at ``as_of``.
+
+    ``record known`` is False when the record neither exists now nor has any history.
+    """
+    columns = _audited_table(table_name)
+    as_of = _as_utc_naive(as_of)
+    current = db.execute(select(*columns.values()).where(columns["id"] == record_id)).mappings().first()
+    state = {k: v for k, v in current.items() if k not in UNTRACKED_COLUMNS} if current is not None else None
+
+    newer = merge_newest_first(
+        iter(_history_rows(db, table_name, record_id, after=as_of)),
+        iter_archived(table_name=table_name, record_id=record_id, after=as_of),
+    )
+    undone = 0
+    for entry in newer:
+        undone += 1
+        field = entry["field_changed"]
+        if field == CREATED_FIELD:
+            state = None
+        elif field == DELETED_FIELD:
+            snapshot = json.loads(entry["old_value"]) if entry["old_value"] else {}
+            state = {name: typed_value(column, snapshot.get(name))
+                     for name, column in columns.items() if name not in UNTRACKED_COLUMNS}
+        elif state is not None and field in columns:
+            state[field] = typed_value(columns[field], entry["old_value"])
+
+    if current is None and undone == 0:
+        # Deleted before as_of, or never existed: only history at or before as_of can tell.
+        older = _history_rows(db, table_name, record_id)
+        if not older:
+            return None, 0, False
+        state = None
+    # Records created before creation entries were written have no __created__ entry.
+    created_at = state.get("created_at") if state else None
+    if isinstance(created_at, datetime) and _as_utc_naive(created_at) > as_of:
+        state = None
+    return state, undone, True
@@ -0,0 +1,161 @@
+# ledger_bulk_edit.py
+"""Set-based bulk update and delete of ledger transactions.
+
+Rows are selected by id, by the ledger list filters, or by both. Their
+current values are read once. Then one UPDATE or DELETE per batch of ids
+changes them, all in one transaction, instead of one ORM round trip per row.
+As in bulk_ingest, the statements bypass the flush hooks, so vendor ids,
+change versions and tombstones, the rollup, edit history, dashboard cache and
+change feed are handled explicitly. History is still
+written per changed field (or per deleted row), in batched INSERTs.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import case, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+from models.ledger_transaction import LedgerTransaction
+from models.wbs_category import WbsCategory
+from models.wbs_subcategory import WbsSubcategory
+from database.database import PARAMETER_BATCH
+from database.rollup import add_row_delta, apply_rollup_deltas, new_deltas
+from database.dashboard_cache import dashboard_cache
+from database.history_listener import DELETED_FIELD, history_row, row_snapshot, write_history
+from database.vendors import intern_vendors
+from database.ledger_sync import session_version, write_tombstones
+from database.change_feed import change_feed, ledger_events
+
+# Date columns that can be moved by a number of days (e.g. re-planning after a slip).
+SHIFTABLE_DATES = ("baseline_date", "planned_date", "actual_date")
+
+
+class BulkEditError(ValueError):
+    """The bulk edit cannot be applied as requested."""
+
+
+def _batches(ids: list):
+    for start in range(0, len(ids), PARAMETER_BATCH):
+        yield ids[start:start + PARAMETER_BATCH]
+
+
+def _matching_rows(db: Session, ids, conditions) -> dict:
+    """{id: row} of the rows selected by ``ids`` (if given) and ``conditions``."""
+    table = LedgerTransaction.__table__
+    if ids is None and not conditions:
+        raise BulkEditError("Select rows with ids or at least one filter; refusing to change the whole ledger.")
+    stmt = select(table, LedgerTransaction.vendor_name.label("vendor_name")).where(*conditions)
+    if ids is None:
+        return {row["id"]: dict(row) for row in db.execute(stmt).mappings()}
+    rows = {}
+    for batch in _batches(sorted(set(ids))):
+        rows.update((row["id"], dict(row)) for row in db.execute(stmt.where(table.c.id.in_(batch))).mappings())
+    return rows
+
+
+def _check_references(db: Session, changes: dict):
+    for field, model, label in (
+        ("wbs_category_id", WbsCategory, "WBS category"),
+        ("wbs_subcategory_id", WbsSubcategory, "WBS subcategory"),
+    ):
+        value = changes.get(field)
+        if value is not None and db.execute(select(model.id).where(model.id == value)).first() is None:
+            raise BulkEditError(f"{field} {value} does not exist ({label}).")
+
+
+def _shifted(column, days: int, dialect_name: str):
+    """SQL expression for a date column moved by ``days``; NULL dates stay NULL."""
+    if dialect_name == "postgresql":
+        return column + days
+    return func.date(column, f"{days:+d} days")
+
+
+def _finish(db: Session, deltas: dict, history: list, programs: set, events: list):
+    apply_rollup_deltas(db.connection(), deltas)
+    write_history(db.connection(), history)
+    db.commit()
+    for program_id in programs:
+        dashboard_cache.invalidate_program(program_id)
+    change_feed.publish(events)
+
+
+def bulk_update(db: Session, ids, conditions, changes: dict, shift_days: dict = None) -> dict:
+    """Apply ``changes`` (column -> new value) and ``shift_days`` (date column -> days) to the selected rows."""
+    shift_days = shift_days or {}
+    if not changes and not shift_days:
+        raise BulkEditError("Nothing to change: give changes and/or shift_days.")
+    unknown = set(shift_days) - set(SHIFTABLE_DATES)
+    if unknown:
+        raise BulkEditError(f"Cannot shift {', '.join(sorted(unknown))}. Use one of: {', '.join(SHIFTABLE_DATES)}.")
+    both = set(shift_days) & set(changes)
+    if both:
+        raise BulkEditError(f"{', '.join(sorted(both))} cannot be both set and shifted.")
+    _check_references(db, changes)
+    # The vendor name is not a ledger column: the rows are pointed at the vendor instead.
+    vendor_name = changes.get("vendor_name")
+    changes = {field: value for field, value in changes.items() if field != "vendor_name"}
+    if vendor_name is not None:
+        vendor_id, display = intern_vendors(db, [vendor_name]).get(vendor_name, (None, ""))
+        changes["vendor_id"] = vendor_id
+
+    table = LedgerTransaction.__table__
+    old_rows = _matching_rows(db, ids, conditions)
+    dialect_name = db.get_bind().dialect.name
+    values = {**changes, **{field: _shifted(table.c[field], days, dialect_name) for field, days in shift_days.items()}}
+
+    updated = []
+    version = session_version(db)
+    # Rows the edit leaves as they were keep their version, so delta sync does not send them again.
+    changed_row = or_(*(table.c[field].is_distinct_from(value) for field, value in values.items()))
+    stamp = case((changed_row, version), else_=table.c.row_version)
+    for batch in _batches(sorted(old_rows)):
+        updated.extend(db.execute(
+            update(table).where(table.c.id.in_(batch)).values({**values, "row_version": stamp}).returning(*table.c)
+        ).mappings().all())
+
+    now = datetime.now(timezone.utc)
+    deltas = new_deltas()
+    history = []
+    changed = []
+    # RETURNING cannot read vendors, so the new vendor's name is added here.
+    updated = [{**row, "vendor_name": display if vendor_name is not None else old_rows[row["id"]]["vendor_name"]}
+               for row in updated]
+    fields_changed = list(values) + (["vendor_name"] if vendor_name is not None else [])
+    for row in updated:
+        old = old_rows[row["id"]]
+        fields = [field for field in fields_changed if old[field] != row[field]]
+        if not fields:
+            continue
+        changed.append((row["id"], row["program_id"]))
+        add_row_delta(deltas, old, -1)
+        add_row_delta(deltas, row, +1)
+        history.extend(history_row(table.name, row["id"], field, old[field], row[field], now) for field in fields)
+    events = ledger_events("update", changed, version)
+    _finish(db, deltas, history, {row["program_id"] for row in old_rows.values()}, events)
+    return {
+        "matched": len(old_rows),
+        "updated": len(changed),
+        "items": sorted(updated, key=lambda row: row["id"]),
+    }
+
+
+def bulk_delete(db: Session, ids, conditions) -> dict:
+    """Delete the selected rows."""
+    table = LedgerTransaction.__table__
+    old_rows = _matching_rows(db, ids, conditions)
+    deleted_ids = sorted(old_rows)
+    records = [(record_id, old_rows[record_id]["program_id"]) for record_id in deleted_ids]
+    for batch in _batches(deleted_ids):
+        db.execute(delete(table).where(table.c.id.in_(batch)))
+    events = []
+    if deleted_ids:
+        version = session_version(db)
+        write_tombstones(db.connection(), records, version)
+        events = ledger_events("delete", records, version)
+
+    now = datetime.now(timezone.utc)
+    deltas = new_deltas()
+    history = []
+    for record_id in deleted_ids:
+        old = old_rows[record_id]
+        add_row_delta(deltas, old, -1)
+        history.append(history_row(table.name, record_id, DELETED_FIELD, row_snapshot(old), None, now))
+    _finish(db, deltas, history, {row["program_id"] for row in old_rows.values()}, events)
+    return {"deleted": len(deleted_ids), "ids": deleted_ids}
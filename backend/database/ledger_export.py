@@ -0,0 +1,206 @@
+# ledger_export.py
+"""Streaming ledger export as CSV, NDJSON, Parquet or an Arrow IPC stream.
+
+Rows are read with a server-side cursor (``stream_results``) in fixed-size
+batches and each batch is encoded and yielded before the next one is
+fetched, so memory use is bounded by the batch size rather than the export.
+The generators open their own connection because the request's session is
+closed before a streaming response starts sending.
+
+The Arrow helpers also serve the ``format=arrow`` ledger list: column-typed
+record batches that a grid can load without parsing text.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import select
+from database.database import engine
+from models.ledger_transaction import LedgerTransaction
+
+EXPORT_BATCH_SIZE = 5000
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": (ARROW_MEDIA_TYPE, "arrows"),
+}
+
+
+def _ledger_columns() -> list:
+    """SELECT items for the ledger's columns, with the vendor's name (read from vendors) after vendor_id."""
+    items = []
+    for column in LedgerTransaction.__table__.columns:
+        items.append(column)
+        if column.name == "vendor_id":
+            items.append(LedgerTransaction.vendor_name.label("vendor_name"))
+    return items
+
+
+LEDGER_COLUMNS = _ledger_columns()
+COLUMNS = [c.name for c in LEDGER_COLUMNS]
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_batches(filters, batch_size: int = EXPORT_BATCH_SIZE):
+    """Yield lists of row tuples (in COLUMNS order) matching ``filters``."""
+    stmt = filters.apply(select(*LEDGER_COLUMNS))
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for partition in result.partitions(batch_size):
+            yield partition
+
+
+def stream_csv(filters, batch_size: int = EXPORT_BATCH_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for batch in iter_batches(filters, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_ndjson(filters, batch_size: int = EXPORT_BATCH_SIZE):
+    for batch in iter_batches(filters, batch_size):
+        lines = [
+            json.dumps({name: _json_value(value) for name, value in zip(COLUMNS, row)})
+            for row in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+class _ChunkSink:
+    """Write-only file object handing written bytes back to the generator between batches."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def arrow_schema(names=COLUMNS):
+    """Arrow types of the ledger columns ``names``; text for those without a specific type."""
+    import pyarrow as pa
+
+    types = {
+        "id": pa.int64(),
+        "program_id": pa.int64(),
+        "wbs_category_id": pa.int64(),
+        "wbs_subcategory_id": pa.int64(),
+        "vendor_id": pa.int64(),
+        "baseline_date": pa.date32(),
+        "planned_date": pa.date32(),
+        "actual_date": pa.date32(),
+        "baseline_amount": pa.decimal128(12, 2),
+        "planned_amount": pa.decimal128(12, 2),
+        "actual_amount": pa.decimal128(12, 2),
+        "created_at": pa.timestamp("us"),
+        "row_version": pa.int64(),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in names])
+
+
+def parquet_schema():
+    return arrow_schema(COLUMNS)
+
+
+def arrow_batch(rows, schema):
+    """A RecordBatch of row tuples ordered like ``schema``."""
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) or [()] * len(schema)
+    return pa.RecordBatch.from_arrays([pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema)
+
+
+def arrow_ipc(rows, names) -> bytes:
+    """Row tuples with the ledger columns ``names`` as one Arrow IPC stream."""
+    import pyarrow as pa
+
+    schema = arrow_schema(names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(arrow_batch(rows, schema))
+    return sink.getvalue().to_pybytes()
+
+
+def stream_parquet(filters, batch_size: int = EXPORT_BATCH_SIZE):
+    """Write one Parquet row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    for batch in iter_batches(filters, batch_size):
+        writer.write_table(pa.Table.from_batches([arrow_batch(batch, schema)]))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_arrow(filters, batch_size: int = EXPORT_BATCH_SIZE):
+    """Write one Arrow IPC record batch per batch."""
+    import pyarrow as pa
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    yield sink.drain()
+    for batch in iter_batches(filters, batch_size):
+        writer.write_batch(arrow_batch(batch, schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+STREAMERS = {"csv": stream_csv, "ndjson": stream_ndjson, "parquet": stream_parquet, "arrow": stream_arrow}
@@ -0,0 +1,109 @@
+# ledger_filters.py
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from models.ledger_transaction import LedgerTransaction
+from models.vendor import Vendor
+from database.vendors import canonical_vendor_name
+
+# Vendors joined for sorting by vendor name, which the ledger does not store.
+# Aliased, so the vendor_name lookup in the selected columns stays correlated to the ledger row alone.
+SORT_VENDOR = aliased(Vendor, name="sort_vendor")
+
+# Columns the ledger list can be sorted on. Keys are the public sort names.
+SORTABLE_COLUMNS = {
+    "id": LedgerTransaction.id,
+    "vendor_name": SORT_VENDOR.vendor_name,
+    "baseline_date": LedgerTransaction.baseline_date,
+    "baseline_amount": LedgerTransaction.baseline_amount,
+    "planned_date": LedgerTransaction.planned_date,
+    "planned_amount": LedgerTransaction.planned_amount,
+    "actual_date": LedgerTransaction.actual_date,
+    "actual_amount": LedgerTransaction.actual_amount,
+    "created_at": LedgerTransaction.created_at,
+}
+
+
+class LedgerFilters:
+    """Query parameters shared by every endpoint that lists ledger rows.
+
+    Use it as a FastAPI dependency (``filters: LedgerFilters = Depends()``) and
+    call ``apply()`` on either an ORM ``Query`` or a Core ``Select``.
+    """
+
+    def __init__(
+        self,
+        program_id: Optional[int] = Query(None, description="Only rows for this program"),
+        wbs_category_id: Optional[int] = Query(None, description="Only rows in this WBS category"),
+        wbs_subcategory_id: Optional[int] = Query(None, description="Only rows in this WBS subcategory"),
+        vendor_name: Optional[str] = Query(None, description="Vendor name (case, accents and punctuation are ignored)"),
+        baseline_date_from: Optional[date] = Query(None),
+        baseline_date_to: Optional[date] = Query(None),
+        planned_date_from: Optional[date] = Query(None),
+        planned_date_to: Optional[date] = Query(None),
+        actual_date_from: Optional[date] = Query(None),
+        actual_date_to: Optional[date] = Query(None),
+        sort_by: str = Query("id", description="One of: " + ", ".join(SORTABLE_COLUMNS)),
+        sort_order: str = Query("asc", description="asc or desc"),
+    ):
+        if sort_by not in SORTABLE_COLUMNS:
+            raise HTTPException(status_code=400, detail=f"Invalid sort_by. Use one of: {', '.join(SORTABLE_COLUMNS)}.")
+        if sort_order not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="Invalid sort_order. Use asc or desc.")
+
+        self.program_id = program_id
+        self.wbs_category_id = wbs_category_id
+        self.wbs_subcategory_id = wbs_subcategory_id
+        self.vendor_name = vendor_name
+        self.baseline_date_from = baseline_date_from
+        self.baseline_date_to = baseline_date_to
+        self.planned_date_from = planned_date_from
+        self.planned_date_to = planned_date_to
+        self.actual_date_from = actual_date_from
+        self.actual_date_to = actual_date_to
+        self.sort_by = sort_by
+        self.sort_order = sort_order
+
+    def conditions(self):
+        """Return the WHERE clauses for the filters that were supplied."""
+        t = LedgerTransaction
+        clauses = []
+        if self.program_id is not None:
+            clauses.append(t.program_id == self.program_id)
+        if self.wbs_category_id is not None:
+            clauses.append(t.wbs_category_id == self.wbs_category_id)
+        if self.wbs_subcategory_id is not None:
+            clauses.append(t.wbs_subcategory_id == self.wbs_subcategory_id)
+        if self.vendor_name is not None:
+            vendor_id = select(Vendor.id).where(Vendor.canonical_name == canonical_vendor_name(self.vendor_name))
+            clauses.append(t.vendor_id == vendor_id.scalar_subquery())
+        for column, start, end in (
+            (t.baseline_date, self.baseline_date_from, self.baseline_date_to),
+            (t.planned_date, self.planned_date_from, self.planned_date_to),
+            (t.actual_date, self.actual_date_from, self.actual_date_to),
+        ):
+            if start is not None:
+                clauses.append(column >= start)
+            if end is not None:
+                clauses.append(column <= end)
+        return clauses
+
+    def order_by(self):
+        """Return the ORDER BY clauses; id is the tie-breaker so ordering is stable."""
+        columns = [SORTABLE_COLUMNS[self.sort_by]]
+        if self.sort_by != "id":
+            columns.append(LedgerTransaction.id)
+        if self.sort_order == "desc":
+            return [c.desc() for c in columns]
+        return [c.asc() for c in columns]
+
+    def apply(self, query, sort: bool = True):
+        """Add the filter (and optionally sort) clauses to a Query or Select."""
+        query = query.where(*self.conditions())
+        if sort:
+            if self.sort_by == "vendor_name":
+                query = query.outerjoin(SORT_VENDOR, SORT_VENDOR.id == LedgerTransaction.vendor_id)
+            query = query.order_by(*self.order_by())
+        return query
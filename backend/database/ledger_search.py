@@ -0,0 +1,251 @@
+# ledger_search.py
+"""Full-text search over ledger descriptions, notes, vendors and invoice numbers.
+
+On SQLite the words live in an external-content FTS5 table, ``ledger_search``,
+keyed by the ledger row id. Its content is the ``ledger_search_content``
+view, the ledger joined to vendors for the vendor's name. Triggers on
+ledger_transactions keep it in sync with every insert, update and delete,
+whether made through the ORM, the bulk endpoints or the seeder. On
+PostgreSQL a ``search_vector`` tsvector column with a GIN index plays the
+same role, filled by a trigger.
+
+Both are created with the ledger table (``create_all``) and dropped with it.
+``ensure_search_index`` adds them to a database created before search
+existed, or rebuilds them where they were made from the ledger's former
+vendor_name column, and indexes the rows already in it.
+
+Every word of the query must match, as a prefix (``acm glob`` finds
+"Acme GlobalTech"). Results are ranked with bm25 on SQLite and ts_rank on
+PostgreSQL. The FTS5 table also indexes program_id, so a program filter is
+part of the MATCH rather than a scan over every hit. Scoring every hit of a
+word that occurs in most rows would dominate the query, so SQLite ranks at
+most the newest SEARCH_RANK_WINDOW (default 1000) matching rows. Searches
+with fewer matches than that are ranked exactly; for the others
+``search_ledger`` reports the results as truncated (the API sets
+``X-Search-Truncated: true``), so a client can ask for narrower filters.
+"""
+import logging
+import os
+import re
+from sqlalchemy import column, event, func, inspect, literal_column, or_, select, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from models.ledger_transaction import LedgerTransaction
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "ledger_search"
+SEARCH_CONTENT = "ledger_search_content"
+SEARCH_COLUMNS = ("expense_description", "notes", "vendor_name", "invoice_number")
+# Indexed in the FTS5 table for filtering only; it has no weight in the rank.
+FILTER_COLUMNS = ("program_id",)
+# Indexed values that are not ledger columns: SQL reading them for a ledger
+# row ({row}), and the ledger column whose update changes them.
+LOOKUP_COLUMNS = {
+    "vendor_name": ("(SELECT vendor_name FROM vendors WHERE vendors.id = {row}.vendor_id)", "vendor_id"),
+}
+SEARCH_VECTOR = "search_vector"
+SEARCH_VECTOR_FUNCTION = "ledger_search_vector"
+MAX_SEARCH_TERMS = 16
+RANK_WINDOW = int(os.environ.get("SEARCH_RANK_WINDOW", "1000"))
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchQueryError(ValueError):
+    """The search text has no words to look for."""
+
+
+def _search_table_sql(connection):
+    """The CREATE statement of the FTS5 table, or None if there is none."""
+    return connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+    ).scalar()
+
+
+def _has_search_table(connection) -> bool:
+    return _search_table_sql(connection) is not None
+
+
+def _indexed_value(name: str, row: str) -> str:
+    """SQL for the indexed value ``name`` of the ledger row ``row`` (new, old or the table name)."""
+    lookup = LOOKUP_COLUMNS.get(name)
+    return lookup[0].format(row=row) if lookup else f"{row}.{name}"
+
+
+def _trigger_columns() -> str:
+    """The ledger columns whose update changes an indexed value."""
+    names = [LOOKUP_COLUMNS[c][1] if c in LOOKUP_COLUMNS else c for c in SEARCH_COLUMNS + FILTER_COLUMNS]
+    return ", ".join(dict.fromkeys(names))
+
+
+def _sqlite_statements() -> list:
+    ledger = LedgerTransaction.__tablename__
+    indexed = SEARCH_COLUMNS + FILTER_COLUMNS
+    columns = ", ".join(indexed)
+    new_values = ", ".join(_indexed_value(c, "new") for c in indexed)
+    old_values = ", ".join(_indexed_value(c, "old") for c in indexed)
+    content = ", ".join("v.vendor_name" if c == "vendor_name" else f"l.{c}" for c in indexed)
+    remove_old = f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    add_new = f"INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIEW IF NOT EXISTS {SEARCH_CONTENT} AS SELECT l.id, {content} "
+        f"FROM {ledger} l LEFT JOIN vendors v ON v.id = l.vendor_id",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5({columns}, content='{SEARCH_CONTENT}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON {ledger} BEGIN {add_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON {ledger} BEGIN {remove_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF {_trigger_columns()} ON {ledger} "
+        f"BEGIN {remove_old} {add_new} END",
+    ]
+
+
+def _sqlite_drop_statements() -> list:
+    return [f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}" for suffix in ("ai", "ad", "au")] + [
+        f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+        f"DROP VIEW IF EXISTS {SEARCH_CONTENT}",
+    ]
+
+
+def _search_document(row: str) -> str:
+    return " || ' ' || ".join(f"coalesce({_indexed_value(c, row)}, '')" for c in SEARCH_COLUMNS)
+
+
+def _postgresql_statements() -> list:
+    ledger = LedgerTransaction.__tablename__
+    return [
+        f"ALTER TABLE {ledger} ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR} tsvector",
+        f"CREATE OR REPLACE FUNCTION {SEARCH_VECTOR_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        f"BEGIN NEW.{SEARCH_VECTOR} = to_tsvector('simple', {_search_document('NEW')}); RETURN NEW; END $$",
+        f"DROP TRIGGER IF EXISTS {SEARCH_VECTOR_FUNCTION} ON {ledger}",
+        f"CREATE TRIGGER {SEARCH_VECTOR_FUNCTION} BEFORE INSERT OR UPDATE OF {_trigger_columns()} ON {ledger} "
+        f"FOR EACH ROW EXECUTE FUNCTION {SEARCH_VECTOR_FUNCTION}()",
+        f"CREATE INDEX IF NOT EXISTS ix_ledger_search_vector ON {ledger} USING GIN ({SEARCH_VECTOR})",
+    ]
+
+
+def _create_search_index(connection) -> bool:
+    """Create the search structures if missing; returns True if the index was just created."""
+    dialect_name = connection.dialect.name
+    ledger = LedgerTransaction.__tablename__
+    if dialect_name == "postgresql":
+        vector = {c["name"]: c for c in inspect(connection).get_columns(ledger)}.get(SEARCH_VECTOR)
+        existed = vector is not None and "computed" not in vector
+        if vector is not None and not existed:
+            # Generated from the former vendor_name column; a trigger computes it from now on.
+            connection.execute(text(f"ALTER TABLE {ledger} ALTER COLUMN {SEARCH_VECTOR} DROP EXPRESSION"))
+        statements = _postgresql_statements()
+    elif dialect_name == "sqlite":
+        sql = _search_table_sql(connection)
+        existed = sql is not None and f"content='{SEARCH_CONTENT}'" in sql
+        if sql is not None and not existed:
+            # Indexed from the former vendor_name column; rebuilt on the content view.
+            for statement in _sqlite_drop_statements():
+                connection.execute(text(statement))
+        statements = _sqlite_statements()
+    else:
+        return False
+    try:
+        for statement in statements:
+            connection.execute(text(statement))
+    except OperationalError as e:
+        # SQLite builds without FTS5 still run; search reports itself unavailable.
+        logger.warning("Ledger search index not created: %s", e)
+        return False
+    return not existed
+
+
+@event.listens_for(LedgerTransaction.__table__, "after_create")
+def _after_ledger_create(target, connection, **kw):
+    _create_search_index(connection)
+
+
+@event.listens_for(LedgerTransaction.__table__, "before_drop")
+def _before_ledger_drop(target, connection, **kw):
+    # The triggers and tsvector column go with the table; the FTS5 table, its view and the function do not.
+    if connection.dialect.name == "sqlite":
+        for statement in _sqlite_drop_statements():
+            connection.execute(text(statement))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text(f"DROP FUNCTION IF EXISTS {SEARCH_VECTOR_FUNCTION}() CASCADE"))
+
+
+def ensure_search_index(engine):
+    """Add the search index to an existing database and fill it from the ledger.
+
+    Run it before ``drop_obsolete_columns``: an index made from the ledger's
+    vendor_name column still refers to it until it is rebuilt here.
+    """
+    with engine.begin() as conn:
+        if not _create_search_index(conn):
+            return
+        if conn.dialect.name == "sqlite":
+            conn.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+        elif conn.dialect.name == "postgresql":
+            ledger = LedgerTransaction.__tablename__
+            conn.execute(text(f"UPDATE {ledger} SET {SEARCH_VECTOR} = to_tsvector('simple', {_search_document(ledger)})"))
+
+
+def search_available(db: Session) -> bool:
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        return True
+    if connection.dialect.name != "sqlite":
+        return False
+    return _has_search_table(connection)
+
+
+def search_terms(query: str) -> list:
+    terms = _TERM.findall(query or "")
+    if not terms:
+        raise SearchQueryError("Search text must contain at least one word.")
+    return terms[:MAX_SEARCH_TERMS]
+
+
+def search_ledger(db: Session, query: str, conditions=(), limit: int = 50, program_id: int = None) -> tuple:
+    """Ledger rows matching every word of ``query`` as a prefix, best first, with a ``rank`` (higher is better).
+
+    Returns (rows, truncated); ``truncated`` is True when more than
+    RANK_WINDOW rows matched and only the newest of them were ranked.
+    ``conditions`` are ledger filter clauses; ``program_id`` is matched inside the index.
+    """
+    terms = search_terms(query)
+    t = LedgerTransaction.__table__
+    vendor_name = LedgerTransaction.vendor_name.label("vendor_name")
+    if program_id is not None:
+        conditions = (*conditions, t.c.program_id == program_id)
+    if db.get_bind().dialect.name == "postgresql":
+        vector = literal_column(f"{t.name}.{SEARCH_VECTOR}")
+        ts_query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        score = func.ts_rank(vector, ts_query)
+        stmt = select(t, vendor_name, score.label("rank")).where(vector.op("@@")(ts_query), *conditions).order_by(score.desc(), t.c.id)
+        return [dict(row) for row in db.execute(stmt.limit(limit)).mappings()], False
+
+    # Quoting each word keeps FTS5 operators in user input from being interpreted.
+    match = " ".join(f'"{term}"*' for term in terms)
+    if program_id is not None:
+        match = f'{match} AND program_id:"{int(program_id)}"'
+    fts = table(SEARCH_TABLE, column("rowid"))
+    weights = [literal_column("1.0")] * len(SEARCH_COLUMNS) + [literal_column("0.0")] * len(FILTER_COLUMNS)
+    bm25 = func.bm25(literal_column(SEARCH_TABLE), *weights)
+    matches = (
+        select(fts.c.rowid.label("id"), bm25.label("score"))
+        .select_from(fts.join(t, t.c.id == fts.c.rowid))
+        .where(literal_column(SEARCH_TABLE).op("MATCH")(match), *conditions)
+        .order_by(fts.c.rowid.desc())
+        .limit(RANK_WINDOW + 1)
+        .cte("matches")
+    )
+    # One match beyond the window shows there are more; it is left out of the ranking.
+    truncated = select(func.count()).select_from(matches).scalar_subquery() > RANK_WINDOW
+    oldest = select(func.min(matches.c.id)).scalar_subquery()
+    stmt = (
+        select(t, vendor_name, (-matches.c.score).label("rank"), truncated.label("truncated"))
+        .join(matches, matches.c.id == t.c.id)
+        .where(or_(~truncated, matches.c.id != oldest))
+        .order_by(matches.c.score, t.c.id)
+        .limit(limit)
+    )
+    rows = [dict(row) for row in db.execute(stmt).mappings()]
+    # Every row carries the flag; with none, nothing matched at all.
+    return rows, any([row.pop("truncated") for row in rows])
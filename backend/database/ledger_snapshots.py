@@ -0,0 +1,392 @@
+# ledger_snapshots.py
+"""Columnar ledger snapshots and dashboards as of a knowledge date.
+
+A knowledge date asks what the dashboard showed when the ledger stood as
+it did at that moment, rather than which ledger dates fall before
+``as_of_date``. Replaying all of edit_history for that would be too slow,
+so each program's ledger is snapshotted periodically. Each snapshot is a
+zstd-compressed Parquet file under LEDGER_SNAPSHOT_DIR, named
+``program-<id>/ledger-<taken at>-<history id>-e<epoch>.parquet``. The history
+id is the highest edit_history id when the snapshot was taken. It is read
+before the rows, so every later entry is a change the snapshot may lack.
+Replaying an entry sets a value rather than adding to it, so one that the
+snapshot already holds is harmless. The epoch is the database's
+``ledger_epoch``, which a reset such as reseeding bumps; snapshots of another
+epoch describe a different ledger and are ignored, and deleted by the next
+snapshot run.
+
+``ledger_as_known`` starts from the newest snapshot taken at or before the
+knowledge date and replays only the ledger entries written after it.
+Only records that those entries touch are turned into Python rows; the
+rest stay in Arrow columns. Without such a snapshot it starts from the
+current ledger and undoes the entries made after the knowledge date.
+Either way only the history of records that can have belonged to the program
+is read (see ``_departed_records``), through the per-record history index.
+
+Take snapshots from cron, e.g. nightly:
+
+    python -m database.ledger_snapshots --keep 30
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from bisect import bisect_right
+from datetime import date, datetime, timezone
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from models.edit_history import EditHistory
+from models.ledger_transaction import LedgerTransaction
+from models.program import Program
+from database.dashboard import summarize_ledger_columns
+from database.history_archive import iter_archived, merge_newest_first
+from database.history_listener import CREATED_FIELD, DELETED_FIELD
+from database.history_timeline import reconstruct_record, typed_value
+from database.ledger_export import EXPORT_BATCH_SIZE, LEDGER_COLUMNS, parquet_schema
+from database.database import PARAMETER_BATCH
+from database.ledger_sync import ledger_epoch
+
+SNAPSHOT_DIR = os.environ.get(
+    "LEDGER_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ledger_snapshots"),
+)
+KEEP_SNAPSHOTS = int(os.environ.get("LEDGER_SNAPSHOT_KEEP", "30"))
+
+# Columns read back from a snapshot; the dashboard needs no more than these.
+SUMMARY_FIELDS = (
+    "id", "program_id", "wbs_category_id", "vendor_name",
+    "baseline_date", "baseline_amount", "planned_date", "planned_amount",
+    "actual_date", "actual_amount", "created_at",
+)
+TABLE_NAME = LedgerTransaction.__tablename__
+# {name: SELECT item} of the snapshot columns, vendor_name included.
+_COLUMNS = {c.name: c for c in LEDGER_COLUMNS}
+
+_SNAPSHOT_NAME = re.compile(r"^ledger-(\d{8}T\d{12})-(\d+)-e(\d+)\.parquet$")
+_TIME_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+def _utcnow() -> datetime:
+    # edited_at is stored without a timezone (UTC), so snapshot times are naive UTC too.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _as_utc_naive(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _program_dir(program_id: int, snapshot_dir: str = None) -> str:
+    return os.path.join(snapshot_dir or SNAPSHOT_DIR, f"program-{program_id}")
+
+
+def take_snapshot(engine, program_id: int, snapshot_dir: str = None) -> str:
+    """Write a snapshot of one program's ledger and return its path."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = LedgerTransaction.__table__
+    history = EditHistory.__table__
+    schema = parquet_schema()
+    directory = _program_dir(program_id, snapshot_dir)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".ledger-{os.getpid()}.parquet.tmp")
+    with engine.connect() as conn:
+        epoch = ledger_epoch(conn)
+        history_id = conn.execute(select(func.coalesce(func.max(history.c.id), 0))).scalar()
+        stmt = select(*LEDGER_COLUMNS).where(table.c.program_id == program_id).order_by(table.c.id)
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            for batch in result.partitions(EXPORT_BATCH_SIZE):
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(col, type=field.type) for col, field in zip(zip(*batch), schema)], schema=schema
+                ))
+    # Taken after the rows were read, so a snapshot is only used for knowledge dates it cannot be ahead of.
+    taken_at = _utcnow()
+    path = os.path.join(directory, f"ledger-{taken_at.strftime(_TIME_FORMAT)}-{history_id}-e{epoch}.parquet")
+    os.replace(tmp_path, path)
+    return path
+
+
+def _snapshot_files(program_id: int, snapshot_dir: str = None) -> list:
+    """[(taken_at, history_id, epoch, path)] of every snapshot of one program, oldest first."""
+    directory = _program_dir(program_id, snapshot_dir)
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        match = _SNAPSHOT_NAME.match(name)
+        if match:
+            taken_at = datetime.strptime(match.group(1), _TIME_FORMAT)
+            snapshots.append((taken_at, int(match.group(2)), int(match.group(3)), os.path.join(directory, name)))
+    return sorted(snapshots)
+
+
+def list_snapshots(program_id: int, epoch: int, snapshot_dir: str = None) -> list:
+    """[(taken_at, history_id, path)] of one program's snapshots of ``epoch``, oldest first."""
+    return [(taken_at, history_id, path) for taken_at, history_id, e, path in _snapshot_files(program_id, snapshot_dir)
+            if e == epoch]
+
+
+def nearest_snapshot(program_id: int, knowledge: datetime, epoch: int, snapshot_dir: str = None):
+    """The newest (taken_at, history_id, path) of ``epoch`` taken at or before ``knowledge``, or None."""
+    snapshots = list_snapshots(program_id, epoch, snapshot_dir)
+    position = bisect_right([s[0] for s in snapshots], _as_utc_naive(knowledge))
+    return snapshots[position - 1] if position else None
+
+
+def prune_snapshots(program_id: int, keep: int, epoch: int, snapshot_dir: str = None) -> int:
+    """Delete all but the ``keep`` newest snapshots of ``epoch`` and every snapshot of another; returns how many."""
+    snapshots = _snapshot_files(program_id, snapshot_dir)
+    current = [s for s in snapshots if s[2] == epoch]
+    stale = [s for s in snapshots if s[2] != epoch] + (current[:-keep] if keep > 0 else current)
+    for _, _, _, path in stale:
+        os.remove(path)
+    return len(stale)
+
+
+def remove_snapshots(snapshot_dir: str = None):
+    """Delete every program's snapshots, e.g. once the ledger they were taken of is gone."""
+    shutil.rmtree(snapshot_dir or SNAPSHOT_DIR, ignore_errors=True)
+
+
+def take_snapshots(engine, program_ids=None, snapshot_dir: str = None, keep: int = None) -> dict:
+    """Snapshot every program (or ``program_ids``); returns {program_id: path}."""
+    with engine.connect() as conn:
+        epoch = ledger_epoch(conn)
+        if program_ids is None:
+            program_ids = conn.execute(select(Program.id).order_by(Program.id)).scalars().all()
+    taken = {}
+    for program_id in program_ids:
+        taken[program_id] = take_snapshot(engine, program_id, snapshot_dir)
+        if keep is not None:
+            prune_snapshots(program_id, keep, epoch, snapshot_dir)
+    return taken
+
+
+def _summary_schema():
+    import pyarrow as pa
+
+    schema = parquet_schema()
+    return pa.schema([schema.field(name) for name in SUMMARY_FIELDS])
+
+
+def _typed_row(values: dict) -> dict:
+    return {name: typed_value(_COLUMNS[name], values.get(name)) for name in SUMMARY_FIELDS}
+
+
+def _current_rows(db: Session, where) -> list:
+    stmt = select(*(_COLUMNS[name] for name in SUMMARY_FIELDS)).where(where).order_by(LedgerTransaction.id)
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+
+def _left_program(entry, program_id: int) -> bool:
+    """Whether a ledger history entry takes its record out of the program, by deletion or a move."""
+    if entry["field_changed"] == DELETED_FIELD:
+        return json.loads(entry["old_value"] or "{}").get("program_id") == program_id
+    return entry["field_changed"] == "program_id" and entry["old_value"] == str(program_id)
+
+
+def _departed_records(db: Session, program_id: int, since) -> set:
+    """Ledger records that entries matching ``since`` take out of the program.
+
+    A record in the program at any time since then is either in it now or
+    has left it since, so only these and the program's current records have
+    entries of interest; those of every other record are never read.
+    """
+    h = EditHistory.__table__
+    # No table_name condition: the period's entries are then found by time or id rather than by
+    # walking every ledger entry in ix_edit_history_record. Other tables' entries are dropped below.
+    rows = db.execute(
+        select(h.c.table_name, h.c.record_id, h.c.field_changed, h.c.old_value).where(since, or_(
+            h.c.field_changed == DELETED_FIELD,
+            and_(h.c.field_changed == "program_id", h.c.old_value == str(program_id)),
+        ))
+    ).mappings()
+    return {r["record_id"] for r in rows if r["table_name"] == TABLE_NAME and _left_program(r, program_id)}
+
+
+def _record_entries(db: Session, program_id: int, departed: set, where) -> list:
+    """Ledger history entries matching ``where`` of the program's records and of ``departed``, newest first.
+
+    Both are looked up record by record in ix_edit_history_record.
+    """
+    h = EditHistory.__table__
+    t = LedgerTransaction.__table__
+    stmt = select(h).where(h.c.table_name == TABLE_NAME, where)
+    statements = [stmt.where(h.c.record_id.in_(select(t.c.id).where(t.c.program_id == program_id)))]
+    departed = sorted(departed)
+    statements += [stmt.where(h.c.record_id.in_(departed[start:start + PARAMETER_BATCH]))
+                   for start in range(0, len(departed), PARAMETER_BATCH)]
+    entries = {}
+    for statement in statements:
+        entries.update((row["id"], dict(row)) for row in db.execute(statement).mappings())
+    return sorted(entries.values(), key=lambda e: (e["edited_at"], e["id"]), reverse=True)
+
+
+def _archived_entries(db: Session, program_id: int, departed: set, after: datetime) -> list:
+    """Archived ledger entries after ``after`` of the program's records, of ``departed`` and of records they take out."""
+    archived = list(iter_archived(table_name=TABLE_NAME, after=after))
+    if not archived:
+        return []
+    records = set(db.execute(select(LedgerTransaction.id).where(LedgerTransaction.program_id == program_id)).scalars())
+    records.update(departed, (e["record_id"] for e in archived if _left_program(e, program_id)))
+    return [e for e in archived if e["record_id"] in records]
+
+
+def _entries_after_snapshot(db: Session, program_id: int, taken_at: datetime, history_id: int, knowledge: datetime) -> list:
+    """The program's ledger history entries written after the snapshot and up to ``knowledge``, oldest first."""
+    h = EditHistory.__table__
+    departed = _departed_records(db, program_id, h.c.id > history_id)
+    hot = _record_entries(db, program_id, departed, and_(h.c.id > history_id, h.c.edited_at <= knowledge))
+    # The archive only matters for a snapshot older than the history retention.
+    archived = (e for e in _archived_entries(db, program_id, departed, taken_at) if e["edited_at"] <= knowledge)
+    entries = [e for e in merge_newest_first(hot, archived) if e["id"] > history_id]
+    entries.reverse()
+    return entries
+
+
+def _entries_after(db: Session, program_id: int, knowledge: datetime) -> list:
+    """The program's ledger history entries made after ``knowledge``, newest first."""
+    h = EditHistory.__table__
+    departed = _departed_records(db, program_id, h.c.edited_at > knowledge)
+    hot = _record_entries(db, program_id, departed, h.c.edited_at > knowledge)
+    return list(merge_newest_first(hot, _archived_entries(db, program_id, departed, knowledge)))
+
+
+def _moved_records(entries: list, program_id: int) -> set:
+    """Records that some entry moves into or out of the program."""
+    program = str(program_id)
+    return {
+        e["record_id"] for e in entries
+        if e["field_changed"] == "program_id" and program in (e["old_value"], e["new_value"])
+    }
+
+
+def _positions(base, record_ids) -> dict:
+    """{record_id: row index in ``base``} for those of ``record_ids`` that are in it."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    record_ids = list(record_ids)
+    if not record_ids:
+        return {}
+    found = pc.index_in(pa.array(record_ids, pa.int64()), value_set=base.column("id")).to_pylist()
+    return {record_id: i for record_id, i in zip(record_ids, found) if i is not None}
+
+
+def _replay(base, entries: list, undo: bool, outside: dict) -> dict:
+    """Apply ``entries`` to the rows of ``base``; returns {record_id: row or None} for every record touched.
+
+    Entries are applied forwards (new values) or, with ``undo``, backwards
+    (old values). ``outside`` holds the starting rows of records that are not
+    in ``base`` but may move into the program.
+    """
+    positions = _positions(base, {e["record_id"] for e in entries})
+    touched = {}
+    for entry in entries:
+        record_id, field = entry["record_id"], entry["field_changed"]
+        if record_id not in touched:
+            if record_id in positions:
+                touched[record_id] = base.slice(positions[record_id], 1).to_pylist()[0]
+            else:
+                touched[record_id] = outside.get(record_id)
+        if field in (CREATED_FIELD, DELETED_FIELD):
+            restores = (field == DELETED_FIELD) if undo else (field == CREATED_FIELD)
+            snapshot = entry["old_value"] if undo else entry["new_value"]
+            touched[record_id] = _typed_row(json.loads(snapshot)) if restores and snapshot else None
+        elif field in SUMMARY_FIELDS and touched[record_id] is not None:
+            value = entry["old_value"] if undo else entry["new_value"]
+            touched[record_id][field] = typed_value(_COLUMNS[field], value)
+    return touched
+
+
+def ledger_as_known(db: Session, program_id: int, knowledge: datetime, snapshot_dir: str = None):
+    """The program's ledger as it stood at ``knowledge``, as an Arrow table of SUMMARY_FIELDS.
+
+    Returns (table, snapshot path or None, entries replayed).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    knowledge = _as_utc_naive(knowledge)
+    schema = _summary_schema()
+    snapshot = nearest_snapshot(program_id, knowledge, ledger_epoch(db.connection()), snapshot_dir)
+    if snapshot is not None:
+        taken_at, history_id, path = snapshot
+        base = pq.read_table(path, columns=list(SUMMARY_FIELDS)).cast(schema)
+        entries = _entries_after_snapshot(db, program_id, taken_at, history_id, knowledge)
+        moved = _moved_records(entries, program_id)
+        moved -= set(_positions(base, moved))
+        # A record moved in from another program starts from its state when the snapshot was taken.
+        outside = {}
+        for record_id in sorted(moved):
+            state = reconstruct_record(db, TABLE_NAME, record_id, taken_at)[0]
+            outside[record_id] = _typed_row(state) if state is not None else None
+        touched = _replay(base, entries, undo=False, outside=outside)
+    else:
+        path = None
+        base = pa.Table.from_pylist(_current_rows(db, LedgerTransaction.program_id == program_id), schema=schema)
+        entries = _entries_after(db, program_id, knowledge)
+        moved = _moved_records(entries, program_id)
+        moved -= set(_positions(base, moved))
+        outside = {row["id"]: row for row in _current_rows(db, LedgerTransaction.id.in_(moved))} if moved else {}
+        touched = _replay(base, entries, undo=True, outside=outside)
+
+    if touched:
+        keep = pc.invert(pc.is_in(base.column("id"), value_set=pa.array(list(touched), pa.int64())))
+        rows = [row for row in touched.values() if row is not None and row["program_id"] == program_id]
+        base = pa.concat_tables([base.filter(keep), pa.Table.from_pylist(rows, schema=schema)])
+    # Rows written without a __created__ entry (e.g. seeded) did not exist before their created_at.
+    created = base.column("created_at")
+    base = base.filter(pc.or_kleene(pc.is_null(created), pc.less_equal(created, pa.scalar(knowledge, created.type))))
+    return base, path, len(entries)
+
+
+def summary_columns(table) -> dict:
+    """NumPy columns of a SUMMARY_FIELDS table in the form ``summarize_ledger_columns`` expects."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    vendors = pc.dictionary_encode(pc.fill_null(table.column("vendor_name"), "")).combine_chunks()
+    columns = {
+        "wbs_category_id": pc.fill_null(table.column("wbs_category_id"), 0).to_numpy(),
+        "vendor_index": vendors.indices.to_numpy(),
+        "vendors": vendors.dictionary.to_numpy(zero_copy_only=False),
+    }
+    for kind in ("baseline", "planned", "actual"):
+        days = pc.cast(table.column(f"{kind}_date"), pa.int32())
+        columns[f"{kind}_date"] = pc.fill_null(days, -1).to_numpy()
+        columns[f"{kind}_amount"] = pc.fill_null(pc.cast(table.column(f"{kind}_amount"), pa.float64()), 0.0).to_numpy()
+    return columns
+
+
+def compute_dashboard_summary_as_known(db: Session, program_id: int, as_of: date, knowledge: datetime,
+                                       snapshot_dir: str = None) -> dict:
+    """``compute_dashboard_summary`` over the ledger as it stood at ``knowledge``."""
+    table, _, _ = ledger_as_known(db, program_id, knowledge, snapshot_dir)
+    return summarize_ledger_columns(program_id, as_of, summary_columns(table))
+
+
+def main(argv=None):
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Snapshot program ledgers for knowledge-date dashboards.")
+    parser.add_argument("--program-id", type=int, action="append", help="Only this program (repeatable)")
+    parser.add_argument("--keep", type=int, default=KEEP_SNAPSHOTS, help="Snapshots to keep per program")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+
+    taken = take_snapshots(engine, args.program_id, args.snapshot_dir, args.keep)
+    for program_id, path in taken.items():
+        print(f"program {program_id}: {path} ({os.path.getsize(path)} bytes)")
+    print(f"{len(taken)} programs snapshotted to {args.snapshot_dir}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# ledger_sync.py
+"""Change versions and tombstones for incremental (delta) ledger sync.
+
+Every transaction that writes the ledger takes the next version from the
+``change_versions`` counter and stamps it on each row it inserts or updates
+(``row_version``). Rows it deletes, or moves to another program, leave a
+tombstone carrying the version. A client that last synced at version V
+asks for the rows and tombstones newer than V and stores the version it is
+given as its next starting point.
+
+Taking the version is an UPDATE of the counter row, held until commit, so
+versions become visible in the order they were handed out and a delta
+never skips a row that commits late. ORM writes are stamped in
+``before_flush``; code that writes the ledger with Core statements calls
+``session_version`` and ``write_tombstones`` itself.
+
+Tombstones older than a retention period can be removed with
+``python -m database.ledger_sync prune --days 90``. Clients that last synced
+before the newest pruned tombstone get a ``SyncExpiredError`` and must
+reload the ledger in full.
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from models.change_version import ChangeVersion
+from models.ledger_tombstone import LedgerTombstone
+from models.ledger_transaction import LedgerTransaction
+from database.database import PARAMETER_BATCH
+
+LEDGER_TABLE = LedgerTransaction.__tablename__
+
+_VERSION_KEY = "ledger_sync_version"
+
+# Counter row bumped by every reset_sync. Files derived from the ledger outside
+# the database (snapshots) record it, so a reset or reseeded database is noticed.
+EPOCH_TABLE = "ledger_epoch"
+
+
+class SyncExpiredError(ValueError):
+    """The client's version predates the kept tombstones (or this database); it must reload in full."""
+
+
+def next_version(connection, table_name: str = LEDGER_TABLE) -> int:
+    """Take the next change version for ``table_name``; the counter row stays locked until commit."""
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    table = ChangeVersion.__table__
+    stmt = upsert(table).values(table_name=table_name, version=1, pruned_version=0)
+    stmt = stmt.on_conflict_do_update(index_elements=["table_name"], set_={"version": table.c.version + 1})
+    return connection.execute(stmt.returning(table.c.version)).scalar_one()
+
+
+def session_version(session: Session) -> int:
+    """The change version of the session's current transaction, taken on first use."""
+    version = session.info.get(_VERSION_KEY)
+    if version is None:
+        version = session.info[_VERSION_KEY] = next_version(session.connection())
+    return version
+
+
+def taken_version(session: Session):
+    """The change version the session's current transaction has taken, or None if it has not written the ledger."""
+    return session.info.get(_VERSION_KEY)
+
+
+def current_versions(connection, table_name: str = LEDGER_TABLE) -> tuple:
+    """(latest version, pruned version) of ``table_name``; (0, 0) before its first write."""
+    table = ChangeVersion.__table__
+    row = connection.execute(
+        select(table.c.version, table.c.pruned_version).where(table.c.table_name == table_name)
+    ).first()
+    return tuple(row) if row is not None else (0, 0)
+
+
+def ledger_epoch(connection) -> int:
+    """How many times the ledger has been reset with ``reset_sync``; 0 before the first."""
+    return current_versions(connection, EPOCH_TABLE)[0]
+
+
+def write_tombstones(connection, records, version: int):
+    """Insert a tombstone per (record_id, program_id) pair in ``records``."""
+    now = datetime.now(timezone.utc)
+    rows = [{"record_id": record_id, "program_id": program_id, "version": version, "deleted_at": now}
+            for record_id, program_id in records]
+    for start in range(0, len(rows), PARAMETER_BATCH):
+        connection.execute(insert(LedgerTombstone).values(rows[start:start + PARAMETER_BATCH]))
+
+
+def _left_programs(instance) -> list:
+    """Programs a dirty ledger row was moved out of in this flush."""
+    hist = inspect(instance).attrs.program_id.history
+    return [program_id for program_id in hist.deleted if program_id is not None and program_id != instance.program_id]
+
+
+@event.listens_for(Session, "before_flush")
+def stamp_versions(session, flush_context, instances):
+    written = [obj for obj in session.new if isinstance(obj, LedgerTransaction)]
+    written += [obj for obj in session.dirty
+                if isinstance(obj, LedgerTransaction) and session.is_modified(obj, include_collections=False)]
+    removed = [(obj.id, obj.program_id) for obj in session.deleted if isinstance(obj, LedgerTransaction)]
+    removed += [(obj.id, program_id) for obj in written if obj not in session.new for program_id in _left_programs(obj)]
+    if not written and not removed:
+        return
+    version = session_version(session)
+    for obj in written:
+        obj.row_version = version
+    if removed:
+        write_tombstones(session.connection(), removed, version)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def forget_version(session):
+    session.info.pop(_VERSION_KEY, None)
+
+
+def ledger_changes(db: Session, columns, since: int = None, program_id: int = None) -> dict:
+    """Ledger rows (selecting ``columns``) and deleted row ids since version ``since``.
+
+    Without ``since`` every row is returned. The version is read before the
+    rows, so rows committed in between are sent again next time rather than
+    missed.
+    """
+    connection = db.connection()
+    version, pruned_version = current_versions(connection)
+    if since is not None and not pruned_version <= since <= version:
+        raise SyncExpiredError(f"Version {since} can no longer be synced from; reload the ledger (current version {version}).")
+
+    t = LedgerTransaction.__table__
+    stmt = select(*columns)
+    if program_id is not None:
+        stmt = stmt.where(t.c.program_id == program_id)
+    if since is None:
+        rows = db.execute(stmt.order_by(t.c.id)).all()
+        return {"version": version, "items": rows, "deleted": []}
+
+    rows = db.execute(stmt.where(t.c.row_version > since).order_by(t.c.row_version, t.c.id)).all()
+    ts = LedgerTombstone.__table__
+    gone = select(ts.c.record_id).where(ts.c.version > since).distinct()
+    if program_id is not None:
+        gone = gone.where(ts.c.program_id == program_id)
+    # A row that left and came back (or moved elsewhere, unscoped) is sent as a row, not deleted.
+    present = {row.id for row in rows}
+    deleted = sorted(record_id for record_id in db.execute(gone).scalars() if record_id not in present)
+    return {"version": version, "items": rows, "deleted": deleted}
+
+
+def reset_sync(connection, table_name: str = LEDGER_TABLE) -> int:
+    """Drop every tombstone and make all earlier versions expire; returns the new version.
+
+    For bulk rewrites such as reseeding, after which clients must reload.
+    Also starts a new ``ledger_epoch``.
+    """
+    version = next_version(connection, table_name)
+    next_version(connection, EPOCH_TABLE)
+    connection.execute(delete(LedgerTombstone))
+    connection.execute(
+        update(ChangeVersion).where(ChangeVersion.table_name == table_name).values(pruned_version=version)
+    )
+    return version
+
+
+def prune_tombstones(connection, older_than: datetime, table_name: str = LEDGER_TABLE) -> int:
+    """Delete tombstones from before ``older_than``; returns how many were removed."""
+    ts = LedgerTombstone.__table__
+    newest = connection.execute(select(func.max(ts.c.version)).where(ts.c.deleted_at < older_than)).scalar()
+    if newest is None:
+        return 0
+    removed = connection.execute(delete(ts).where(ts.c.version <= newest)).rowcount
+    connection.execute(
+        update(ChangeVersion)
+        .where(ChangeVersion.table_name == table_name, ChangeVersion.pruned_version < newest)
+        .values(pruned_version=newest)
+    )
+    return removed
+
+
+def main(argv=None):
+    from database.database import engine, Base
+    import models  # noqa: F401  (registers every table)
+
+    parser = argparse.ArgumentParser(description="Maintain ledger delta-sync tombstones.")
+    parser.add_argument("command", choices=["prune"])
+    parser.add_argument("--days", type=int, default=90, help="keep tombstones from the last N days")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    # deleted_at is stored without a timezone (UTC), so compare with a naive UTC cutoff.
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=args.days)
+    with engine.begin() as conn:
+        removed = prune_tombstones(conn, cutoff)
+        version, pruned_version = current_versions(conn)
+    print(f"{removed} tombstones pruned; clients must have synced at or after version {pruned_version} (current {version}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# migrations.py
+import argparse
+import re
+import sys
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from database.database import Base
+
+
+def ensure_indexes(engine):
+    """Create any model-declared index that is missing from an existing database.
+
+    ``Base.metadata.create_all`` only creates indexes together with brand new
+    tables, so databases created before an index was added to a model would
+    never pick it up.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+
+
+def ensure_columns(engine) -> list:
+    """Add model columns that are missing from existing tables; returns the added (table, column) pairs.
+
+    Only columns that can be added in place are supported: nullable ones or
+    NOT NULL ones with a ``server_default``. A foreign key is declared inline
+    (``REFERENCES``), which SQLite and PostgreSQL both accept in ADD COLUMN.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = str(CreateColumn(column).compile(dialect=engine.dialect))
+                for fk in column.foreign_keys:
+                    ddl += f" REFERENCES {preparer.format_table(fk.column.table)} ({preparer.quote(fk.column.name)})"
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                added.append((table.name, column.name))
+    return added
+
+
+# Indexes that models no longer declare, by table; dropped from existing databases.
+OBSOLETE_INDEXES = {
+    # Vendor lookups moved to the integer vendor_id (ix_ledger_vendor_id).
+    "ledger_transactions": ("ix_ledger_vendor", "ix_ledger_program_vendor"),
+}
+
+# Columns that models no longer declare, by table. They are left in existing
+# databases, no longer read or written, until an operator drops them with
+# ``python -m database.migrations drop-obsolete``.
+OBSOLETE_COLUMNS = {
+    # The vendor's name is read from vendors through vendor_id; the old
+    # spellings stay until the backfill has been checked.
+    "ledger_transactions": ("vendor_name",),
+}
+def drop_obsolete_indexes(engine) -> list:
+    """Drop the OBSOLETE_INDEXES present in an existing database; returns their names."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    dropped = []
+    with engine.begin() as conn:
+        for table_name, names in OBSOLETE_INDEXES.items():
+            if table_name not in existing_tables:
+                continue
+            existing = {ix["name"] for ix in inspector.get_indexes(table_name)}
+            for name in names:
+                if name in existing:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                    dropped.append(name)
+    return dropped
+
+
+def obsolete_columns(engine) -> list:
+    """The OBSOLETE_COLUMNS present in a database, as (table, column info) pairs from the inspector."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    present = []
+    for table_name, names in OBSOLETE_COLUMNS.items():
+        if table_name not in existing_tables:
+            continue
+        present.extend((table_name, c) for c in inspector.get_columns(table_name) if c["name"] in names)
+    return present
+
+
+def _drop_not_null_sqlite(conn, table_name: str, column_name: str) -> bool:
+    """Remove a column's NOT NULL constraint by editing the table's schema text.
+
+    SQLite has no ALTER for this; its documentation allows editing
+    sqlite_schema for dropping a NOT NULL constraint, which leaves the stored
+    rows as they are. Returns False if the column definition is not found.
+    """
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table_name}
+    ).scalar()
+    definition = re.compile(rf'([(,]\s*"?{re.escape(column_name)}"?\s+[^,(]*(?:\([^)]*\))?[^,]*?)\s+NOT NULL', re.I)
+    relaxed, count = definition.subn(r"\1", sql, count=1)
+    if not count:
+        return False
+    version = conn.execute(text("PRAGMA schema_version")).scalar()
+    conn.execute(text("PRAGMA writable_schema = ON"))
+    conn.execute(text("UPDATE sqlite_master SET sql = :sql WHERE type = 'table' AND name = :name"),
+                 {"sql": relaxed, "name": table_name})
+    conn.execute(text(f"PRAGMA schema_version = {version + 1}"))
+    conn.execute(text("PRAGMA writable_schema = OFF"))
+    return True
+
+
+def relax_obsolete_columns(engine) -> list:
+    """Let the OBSOLETE_COLUMNS left in a database hold NULL; returns the (table, column) pairs changed.
+
+    New rows no longer set these columns, so a NOT NULL one would reject
+    every insert. The values already stored are kept.
+    """
+    relaxed = []
+    with engine.begin() as conn:
+        for table_name, column in obsolete_columns(engine):
+            if column["nullable"]:
+                continue
+            if conn.dialect.name == "sqlite":
+                if not _drop_not_null_sqlite(conn, table_name, column["name"]):
+                    continue
+            else:
+                conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {column['name']} DROP NOT NULL"))
+            relaxed.append((table_name, column["name"]))
+    return relaxed
+
+
+def drop_obsolete_columns(engine) -> list:
+    """Drop the OBSOLETE_COLUMNS present in an existing database; returns the dropped (table, column) pairs.
+
+    This loses the columns' data for good, so it is not run at startup; see
+    ``main``. SQLite refuses to drop an indexed column or one a trigger
+    refers to, so the app must have started once (which drops the obsolete
+    indexes and rebuilds the search triggers) before this runs.
+    """
+    dropped = []
+    with engine.begin() as conn:
+        for table_name, column in obsolete_columns(engine):
+            conn.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {column['name']}"))
+            dropped.append((table_name, column["name"]))
+    return dropped
+
+
+def recreate_derived_tables(engine, tables) -> list:
+    """Drop and recreate ``tables`` whose columns no longer match the model; returns their names.
+
+    Only for tables derived from other data (such as the ledger rollup), whose
+    key changes cannot be made in place and whose rows are rebuilt afterwards.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    recreated = []
+    for table in tables:
+        if table.name not in existing_tables:
+            continue
+        if {c["name"] for c in inspector.get_columns(table.name)} != {c.name for c in table.columns}:
+            table.drop(bind=engine)
+            table.create(bind=engine)
+            recreated.append(table.name)
+    return recreated
+
+
+def main(argv=None):
+    from database.database import engine
+    from database.vendors import unlinked_vendor_rows
+
+    parser = argparse.ArgumentParser(description="Finish schema migrations that discard data.")
+    parser.add_argument("command", choices=["drop-obsolete"])
+    parser.add_argument("--dry-run", action="store_true", help="only list the columns that would be dropped")
+    args = parser.parse_args(argv)
+
+    present = [f"{table_name}.{column['name']}" for table_name, column in obsolete_columns(engine)]
+    if not present:
+        print("No obsolete columns left.")
+        return 0
+    print("Obsolete columns: " + ", ".join(present))
+    unlinked = unlinked_vendor_rows(engine)
+    if unlinked:
+        print(f"{unlinked} ledger rows have a vendor name but no vendor; start the app to backfill them first.")
+        return 1
+    if args.dry_run:
+        return 0
+    drop_obsolete_columns(engine)
+    print(f"Dropped {len(present)} columns.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
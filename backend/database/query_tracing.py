@@ -0,0 +1,142 @@
+# query_tracing.py
+"""SQL statement tracing, slow-query log and query budgets.
+
+One pair of engine cursor listeners times every statement on every engine
+(sync and async) and reports it to the ``QueryTrace`` objects active in the
+current context. A trace is opened per HTTP request by the metrics
+middleware and by ``trace_queries()`` / ``assert_max_queries()``. The trace
+lives in a context variable, so statements issued from the threadpool that
+runs sync endpoints are attributed to the right request.
+
+Statements slower than SLOW_QUERY_MS (default 250) are written to the
+``database.query_tracing`` logger as one JSON object each, with the EXPLAIN
+plan when SLOW_QUERY_EXPLAIN is on (the default). Within a traced request, a
+statement repeated N_PLUS_ONE_THRESHOLD times (default 10) is logged as a
+likely N+1 pattern.
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "250"))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1").lower() not in ("0", "false", "no", "off")
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "10"))
+
+_STATEMENT_START_KEY = "query_tracing_statement_start"
+
+_active_traces = ContextVar("active_query_traces", default=())
+
+
+class QueryTrace:
+    """Statements executed while the trace was active.
+
+    ``counts`` maps statement text to executions. The individual
+    (statement, seconds) pairs are kept only when ``keep_statements`` is set,
+    which tests do and the per-request trace does not.
+    """
+
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.counts = {}
+        self.statements = [] if keep_statements else None
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.counts[statement] = self.counts.get(statement, 0) + 1
+        if self.statements is not None:
+            self.statements.append((statement, seconds))
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> dict:
+        """Statements executed at least ``threshold`` times, with their counts."""
+        return {statement: n for statement, n in self.counts.items() if n >= threshold}
+
+
+def start_trace(trace: QueryTrace):
+    """Activate ``trace`` in the current context; pass the token to ``end_trace``."""
+    return _active_traces.set(_active_traces.get() + (trace,))
+
+
+def end_trace(token):
+    _active_traces.reset(token)
+
+
+@contextmanager
+def trace_queries(keep_statements: bool = True):
+    trace = QueryTrace(keep_statements=keep_statements)
+    token = start_trace(trace)
+    try:
+        yield trace
+    finally:
+        end_trace(token)
+
+
+@contextmanager
+def assert_max_queries(budget: int):
+    """Fail with the offending statements if the block executes more than ``budget`` statements.
+
+        with assert_max_queries(3):
+            client.get("/ledger_transactions/?program_id=1")
+    """
+    with trace_queries() as trace:
+        yield trace
+    if trace.count > budget:
+        listing = "\n".join(f"  {i + 1}. {statement}" for i, (statement, _) in enumerate(trace.statements))
+        raise AssertionError(f"Expected at most {budget} SQL statements, {trace.count} were executed:\n{listing}")
+
+
+def log_repeated_statements(trace: QueryTrace, context: str):
+    """Warn about statements a single request executed suspiciously often."""
+    for statement, n in trace.repeated().items():
+        logger.warning(json.dumps({"event": "repeated_statement", "context": context, "executions": n, "statement": statement}))
+
+
+def explain(conn, statement: str, parameters) -> list:
+    """The database's plan for ``statement``, read through a raw DBAPI cursor (no events fire)."""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        # SQLite rows are (id, parent, notused, detail); PostgreSQL rows are one line of text.
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement, parameters, executemany, seconds):
+    record = {"event": "slow_query", "duration_ms": round(seconds * 1000, 1), "statement": statement}
+    if executemany:
+        record["executemany_rows"] = len(parameters)
+    else:
+        record["parameters"] = parameters if isinstance(parameters, dict) else list(parameters or ())
+        if SLOW_QUERY_EXPLAIN and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+            try:
+                record["plan"] = explain(conn, statement, parameters)
+            except Exception as exc:  # an EXPLAIN failure must never break the query it describes
+                record["plan_error"] = str(exc)
+    logger.warning(json.dumps(record, default=str))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info[_STATEMENT_START_KEY] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop(_STATEMENT_START_KEY, None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    for trace in _active_traces.get():
+        trace.record(statement, seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(conn, statement, parameters, executemany, seconds)
@@ -0,0 +1,291 @@
+# rollup.py
+"""Incremental maintenance of the ledger_monthly_rollup table.
+
+Every ledger insert, update and delete made through a Session is turned into
+signed per-key deltas in ``after_flush`` and upserted into the rollup in the
+same transaction. Code that writes the ledger with Core statements instead of
+the ORM must call ``apply_rollup_deltas`` itself.
+
+Run ``python -m database.rollup verify`` (or ``rebuild``) from the backend
+directory to compare the rollup with the ledger or to recompute it.
+"""
+import argparse
+import logging
+import sys
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import event, func, inspect, select, delete, true
+from sqlalchemy.orm import Session
+from models.ledger_transaction import LedgerTransaction
+from models.ledger_rollup import LedgerMonthlyRollup
+import database.vendors  # noqa: F401  (sets vendor_id, part of the rollup key, before each flush)
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ("program_id", "wbs_category_id", "wbs_subcategory_id", "vendor_id")
+# Rollup amount kind -> (ledger date field it is bucketed by, ledger amount field it sums).
+# Earned value is the baseline amount of performed lines, bucketed by the actual date.
+KIND_SOURCES = {
+    "baseline": ("baseline_date", "baseline_amount"),
+    "planned": ("planned_date", "planned_amount"),
+    "actual": ("actual_date", "actual_amount"),
+    "earned": ("actual_date", "baseline_amount"),
+}
+AMOUNT_KINDS = tuple(KIND_SOURCES)
+# Kinds that only count once their date is set (a line is not earned until it has an actual date).
+DATED_KINDS = ("earned",)
+# Dates counted in dated_count: a month is in the cash flow while any line has one of them in it.
+COUNTED_DATES = ("baseline_date", "planned_date", "actual_date")
+DATED_COUNT = "dated_count"
+TRACKED_FIELDS = KEY_FIELDS + tuple(sorted({field for pair in KIND_SOURCES.values() for field in pair}))
+
+# Sums that differ by less than this are treated as equal by verify().
+TOLERANCE = Decimal("0.005")
+
+
+def _to_decimal(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal(0)
+
+
+def _month(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value[:7]
+    return value.strftime("%Y-%m")
+
+
+def contributions(state: dict):
+    """Yield ((program, category, subcategory, vendor, month), kind, amount) for one ledger row.
+
+    Besides the amount kinds, each of the row's COUNTED_DATES that is set
+    yields a DATED_COUNT of 1 for its month.
+    """
+    base_key = (
+        state["program_id"],
+        state["wbs_category_id"] or 0,
+        state["wbs_subcategory_id"] or 0,
+        state["vendor_id"] or 0,
+    )
+    for kind, (date_field, amount_field) in KIND_SOURCES.items():
+        amount = state[amount_field]
+        if amount is None or (kind in DATED_KINDS and state[date_field] is None):
+            continue
+        yield base_key + (_month(state[date_field]),), kind, _to_decimal(amount)
+    for date_field in COUNTED_DATES:
+        if state[date_field] is not None:
+            yield base_key + (_month(state[date_field]),), DATED_COUNT, 1
+
+
+def add_row_delta(deltas: dict, state: dict, sign: int):
+    """Accumulate a row's contributions into ``deltas`` with the given sign (+1/-1)."""
+    for key, kind, amount in contributions(state):
+        deltas[key][kind] += sign * amount
+
+
+def new_deltas() -> dict:
+    return defaultdict(lambda: {**{kind: Decimal(0) for kind in AMOUNT_KINDS}, DATED_COUNT: 0})
+
+
+def _instance_states(instance):
+    """Return (old_state, new_state) for a dirty LedgerTransaction from its attribute history."""
+    insp = inspect(instance)
+    old_state, new_state = {}, {}
+    for field in TRACKED_FIELDS:
+        hist = insp.attrs[field].history
+        if hist.has_changes():
+            old_state[field] = hist.deleted[0] if hist.deleted else None
+            new_state[field] = hist.added[0] if hist.added else None
+        else:
+            value = hist.unchanged[0] if hist.unchanged else getattr(instance, field)
+            old_state[field] = new_state[field] = value
+    return old_state, new_state
+
+
+def _upsert_statement(dialect_name: str):
+    table = LedgerMonthlyRollup.__table__
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=["program_id", "wbs_category_id", "wbs_subcategory_id", "vendor_id", "month"],
+        set_={
+            **{
+                f"{kind}_amount": table.c[f"{kind}_amount"] + stmt.excluded[f"{kind}_amount"]
+                for kind in AMOUNT_KINDS
+            },
+            DATED_COUNT: table.c[DATED_COUNT] + stmt.excluded[DATED_COUNT],
+        },
+    )
+
+
+def apply_rollup_deltas(connection, deltas: dict):
+    """Upsert accumulated deltas into the rollup with one executemany statement."""
+    params = [
+        {
+            "program_id": key[0],
+            "wbs_category_id": key[1],
+            "wbs_subcategory_id": key[2],
+            "vendor_id": key[3],
+            "month": key[4],
+            **{f"{kind}_amount": sums[kind] for kind in AMOUNT_KINDS},
+            DATED_COUNT: sums[DATED_COUNT],
+        }
+        for key, sums in deltas.items()
+        if any(sums.values())
+    ]
+    if params:
+        connection.execute(_upsert_statement(connection.dialect.name), params)
+
+
+def update_rollup(session: Session):
+    deltas = new_deltas()
+    for instance in session.new:
+        if isinstance(instance, LedgerTransaction):
+            add_row_delta(deltas, {f: getattr(instance, f) for f in TRACKED_FIELDS}, +1)
+    for instance in session.dirty:
+        if isinstance(instance, LedgerTransaction) and session.is_modified(instance, include_collections=False):
+            old_state, new_state = _instance_states(instance)
+            add_row_delta(deltas, old_state, -1)
+            add_row_delta(deltas, new_state, +1)
+    for instance in session.deleted:
+        if isinstance(instance, LedgerTransaction):
+            old_state, _ = _instance_states(instance)
+            add_row_delta(deltas, old_state, -1)
+    apply_rollup_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, "after_flush")
+def after_flush(session, flush_context):
+    update_rollup(session)
+
+
+# ---------------------------
+# Rebuild / verify
+# ---------------------------
+def compute_rollup_from_ledger(connection, program_id: int = None) -> dict:
+    """Recompute rollup sums straight from the ledger with grouped queries."""
+    from database.dashboard import month_key
+
+    t = LedgerTransaction
+    dialect_name = connection.dialect.name
+    expected = new_deltas()
+    for kind, (date_field, amount_field) in KIND_SOURCES.items():
+        date_column, amount_column = t.__table__.c[date_field], t.__table__.c[amount_field]
+        month = func.coalesce(month_key(date_column, dialect_name), "")
+        stmt = (
+            select(
+                t.program_id,
+                func.coalesce(t.wbs_category_id, 0),
+                func.coalesce(t.wbs_subcategory_id, 0),
+                func.coalesce(t.vendor_id, 0),
+                month,
+                func.sum(amount_column),
+            )
+            .where(amount_column.isnot(None))
+            .where(date_column.isnot(None) if kind in DATED_KINDS else true())
+            .group_by(t.program_id, t.wbs_category_id, t.wbs_subcategory_id, t.vendor_id, month)
+        )
+        if program_id is not None:
+            stmt = stmt.where(t.program_id == program_id)
+        for *key, amount in connection.execute(stmt):
+            expected[tuple(key)][kind] += _to_decimal(amount)
+    for date_field in COUNTED_DATES:
+        date_column = t.__table__.c[date_field]
+        month = month_key(date_column, dialect_name)
+        stmt = (
+            select(
+                t.program_id,
+                func.coalesce(t.wbs_category_id, 0),
+                func.coalesce(t.wbs_subcategory_id, 0),
+                func.coalesce(t.vendor_id, 0),
+                month,
+                func.count(),
+            )
+            .where(date_column.isnot(None))
+            .group_by(t.program_id, t.wbs_category_id, t.wbs_subcategory_id, t.vendor_id, month)
+        )
+        if program_id is not None:
+            stmt = stmt.where(t.program_id == program_id)
+        for *key, count in connection.execute(stmt):
+            expected[tuple(key)][DATED_COUNT] += count
+    return expected
+
+
+def _stored_rollup(connection, program_id: int = None) -> dict:
+    r = LedgerMonthlyRollup
+    stmt = select(r.program_id, r.wbs_category_id, r.wbs_subcategory_id, r.vendor_id, r.month,
+                  *(r.__table__.c[f"{kind}_amount"] for kind in AMOUNT_KINDS), r.dated_count)
+    if program_id is not None:
+        stmt = stmt.where(r.program_id == program_id)
+    stored = new_deltas()
+    for row in connection.execute(stmt):
+        stored[tuple(row[:5])] = {**{kind: _to_decimal(amount) for kind, amount in zip(AMOUNT_KINDS, row[5:])},
+                                  DATED_COUNT: row[-1]}
+    return stored
+
+
+def verify_rollup(connection, program_id: int = None) -> list:
+    """Return a list of drift records: keys whose stored sums differ from the ledger."""
+    expected = compute_rollup_from_ledger(connection, program_id)
+    stored = _stored_rollup(connection, program_id)
+    drift = []
+    for key in sorted(set(expected) | set(stored), key=lambda k: tuple(str(p) for p in k)):
+        for kind in AMOUNT_KINDS + (DATED_COUNT,):
+            want = expected[key][kind] if key in expected else Decimal(0)
+            have = stored[key][kind] if key in stored else Decimal(0)
+            if abs(want - have) >= TOLERANCE:
+                drift.append({"key": key, "kind": kind, "expected": want, "stored": have})
+    return drift
+
+
+def rebuild_rollup(connection, program_id: int = None) -> int:
+    """Replace the rollup (or one program's slice of it) with sums recomputed from the ledger."""
+    r = LedgerMonthlyRollup
+    stmt = delete(r)
+    if program_id is not None:
+        stmt = stmt.where(r.program_id == program_id)
+    connection.execute(stmt)
+    expected = compute_rollup_from_ledger(connection, program_id)
+    apply_rollup_deltas(connection, expected)
+    return len(expected)
+
+
+def ensure_rollup_populated(engine, rebuild: bool = False):
+    """Build the rollup on first start against a ledger that predates it.
+
+    ``rebuild`` forces a full rebuild, e.g. after an amount column was added
+    to an existing rollup table.
+    """
+    with engine.begin() as conn:
+        has_rollup = conn.execute(select(LedgerMonthlyRollup.id).limit(1)).first()
+        has_ledger = conn.execute(select(LedgerTransaction.id).limit(1)).first()
+        if has_ledger and (rebuild or not has_rollup):
+            logger.info("Rebuilding the ledger rollup from the ledger.")
+            rebuild_rollup(conn)
+
+
+def main(argv=None):
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Verify or rebuild the ledger monthly rollup.")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--program-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with engine.begin() as conn:
+        drift = verify_rollup(conn, args.program_id)
+        for d in drift:
+            print(f"drift {d['key']} {d['kind']}: stored={d['stored']} expected={d['expected']}")
+        print(f"{len(drift)} drifting entries found.")
+        if args.command == "rebuild":
+            count = rebuild_rollup(conn, args.program_id)
+            print(f"Rollup rebuilt: {count} keys.")
+            return 0
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
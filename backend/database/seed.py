@@ -0,0 +1,205 @@
+# seed.py
+"""Synthetic data seeder for load testing and benchmarks.
+
+Writes N programs x M WBS categories (each with a few subcategories) x K
+ledger transactions per category straight into the database with executemany
+INSERTs, bypassing the API and the ORM flush hooks. Values are drawn with
+NumPy so millions of rows take seconds:
+
+* amounts are log-normal (most lines are small, a few are large),
+* baseline dates are spread over each program's period of performance,
+  planned dates slip from the baseline and actual dates from the plan,
+* only lines whose actual date has passed carry actuals,
+* vendors follow a Zipf-like popularity curve.
+
+The rollup is rebuilt afterwards; no edit history is written for seeded rows.
+Seeded rows are appended to the existing data unless clearing is asked for
+(``--clear``), which first empties the programs, WBS and ledger tables.
+Clearing also deletes the edit history of the cleared tables, archived parts
+included: the seeded rows reuse the cleared rows' ids and must not inherit
+their history. Ledger snapshots of the cleared ledger are deleted too.
+
+    python -m database.seed --programs 10 --categories 8 --transactions 10000 --clear
+"""
+import argparse
+import sys
+import time
+from datetime import date, datetime, timezone
+import numpy as np
+from sqlalchemy import delete, insert
+from models.program import Program
+from models.wbs_category import WbsCategory
+from models.wbs_subcategory import WbsSubcategory
+from models.ledger_transaction import LedgerTransaction
+from models.ledger_rollup import LedgerMonthlyRollup
+from models.edit_history import EditHistory
+from database.history_archive import drop_archived
+from database.ledger_snapshots import remove_snapshots
+from database.rollup import rebuild_rollup
+from database.vendors import resolve_vendors
+from database.ledger_sync import next_version, reset_sync
+
+VENDORS = [
+    "Acme Corp", "GlobalTech", "OfficeSuppliesRUs", "WidgetCo", "AlphaDynamics", "Initech",
+    "Northwind Traders", "Contoso", "Fabrikam", "Tailspin Toys", "Wingtip Systems", "Litware",
+    "Proseware", "Adventure Works", "Blue Yonder Airlines", "Coho Vineyard", "Lucerne Publishing",
+    "Margie's Travel", "Southridge Video", "Trey Research",
+]
+DESCRIPTIONS = ["Software License", "Hardware Upgrade", "Consulting Fee", "Laptop Purchase",
+                "Cloud Subscription", "Travel", "Test Equipment", "Subcontract Labor"]
+SUBCATEGORIES_PER_CATEGORY = 3
+INSERT_CHUNK = 50000
+# Audited tables emptied by a clear, children first.
+CLEARED_MODELS = (LedgerTransaction, WbsSubcategory, WbsCategory, Program)
+
+# Today's date for the synthetic ledger; lines whose actual date is later have no actuals yet.
+STATUS_DATE = np.datetime64("2025-06-30")
+
+
+def _dates_to_str(days: np.ndarray) -> list:
+    return np.datetime_as_string(days.astype("datetime64[D]"), unit="D").tolist()
+
+
+def _transactions(rng, count, program_id, category_ids, subcategory_ids, start, months, vendor_ids):
+    """Column arrays for ``count`` ledger rows of one program; ``vendor_ids`` has the id of each VENDORS entry."""
+    which = rng.integers(0, len(category_ids), count)
+    sub_offset = rng.integers(0, SUBCATEGORIES_PER_CATEGORY, count)
+    categories = np.asarray(category_ids)[which]
+    subcategories = np.asarray(subcategory_ids).reshape(len(category_ids), SUBCATEGORIES_PER_CATEGORY)[which, sub_offset]
+
+    ranks = np.arange(1, len(VENDORS) + 1)
+    vendor_weights = (1.0 / ranks) / (1.0 / ranks).sum()
+    vendor_index = rng.choice(len(VENDORS), count, p=vendor_weights)
+    descriptions = np.asarray(DESCRIPTIONS)[rng.integers(0, len(DESCRIPTIONS), count)]
+
+    baseline = start + rng.integers(0, months * 30, count).astype("timedelta64[D]")
+    planned = baseline + np.maximum(rng.normal(15, 30, count), -30).astype("int64").astype("timedelta64[D]")
+    actual = planned + np.maximum(rng.normal(10, 20, count), -20).astype("int64").astype("timedelta64[D]")
+
+    baseline_amount = np.round(rng.lognormal(7.5, 1.2, count), 2)
+    planned_amount = np.round(baseline_amount * rng.normal(1.05, 0.1, count).clip(0.5), 2)
+    actual_amount = np.round(planned_amount * rng.normal(1.02, 0.15, count).clip(0.3), 2)
+    has_actual = actual <= STATUS_DATE
+
+    actual_dates = _dates_to_str(actual)
+    actual_amounts = actual_amount.tolist()
+    for i in np.flatnonzero(~has_actual).tolist():
+        actual_dates[i] = None
+        actual_amounts[i] = None
+
+    return {
+        "program_id": [program_id] * count,
+        "vendor_id": np.asarray(vendor_ids)[vendor_index].tolist(),
+        "expense_description": descriptions.tolist(),
+        "wbs_category_id": categories.tolist(),
+        "wbs_subcategory_id": subcategories.tolist(),
+        "baseline_date": _dates_to_str(baseline),
+        "baseline_amount": baseline_amount.tolist(),
+        "planned_date": _dates_to_str(planned),
+        "planned_amount": planned_amount.tolist(),
+        "actual_date": actual_dates,
+        "actual_amount": actual_amounts,
+        "invoice_number": [f"INV-{program_id}-{i}" for i in range(count)],
+        "created_at": [datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")] * count,
+    }
+
+
+def _insert_columns(conn, table, columns: dict):
+    """executemany INSERT of column lists, in chunks, through the DBAPI driver."""
+    names = list(columns)
+    paramstyle = conn.dialect.paramstyle
+    placeholders = ", ".join("?" if paramstyle == "qmark" else f"%({n})s" if paramstyle == "pyformat" else f":{n}" for n in names)
+    sql = f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({placeholders})"
+    rows = list(zip(*columns.values()))
+    if paramstyle != "qmark":
+        rows = [dict(zip(names, r)) for r in rows]
+    for start in range(0, len(rows), INSERT_CHUNK):
+        conn.exec_driver_sql(sql, rows[start:start + INSERT_CHUNK])
+
+
+def seed(engine, programs: int, categories: int, transactions: int, random_seed: int = 0, clear: bool = False,
+         archive_dir: str = None, snapshot_dir: str = None) -> dict:
+    """Seed ``programs`` x ``categories`` x ``transactions`` ledger rows; returns row counts.
+
+    With ``clear`` the existing programs, WBS and ledger rows are deleted first.
+
+    ``archive_dir`` and ``snapshot_dir`` are the edit-history archive and the
+    ledger snapshots cleared along with the tables (default HISTORY_ARCHIVE_DIR
+    and LEDGER_SNAPSHOT_DIR).
+    """
+    rng = np.random.default_rng(random_seed)
+    counts = {"programs": 0, "categories": 0, "subcategories": 0, "transactions": 0}
+    ledger_indexes = list(LedgerTransaction.__table__.indexes)
+    with engine.begin() as conn:
+        if clear:
+            for model in (LedgerMonthlyRollup,) + CLEARED_MODELS:
+                conn.execute(delete(model))
+            conn.execute(delete(EditHistory).where(EditHistory.table_name.in_([m.__tablename__ for m in CLEARED_MODELS])))
+            # Loading into an empty table and indexing afterwards is several times
+            # faster than maintaining the ledger's indexes row by row.
+            for index in ledger_indexes:
+                index.drop(bind=conn, checkfirst=True)
+        # Clients syncing deltas must reload after a clear; the seeded rows share one version.
+        version = reset_sync(conn) if clear else next_version(conn)
+        interned = resolve_vendors(conn, VENDORS)
+        vendor_ids = [interned[name][0] for name in VENDORS]
+        for p in range(programs):
+            code = f"SEED{random_seed}-{p:04d}"
+            program_id = conn.execute(insert(Program).values(
+                program_name=f"Seed Program {code}", program_code=code,
+                program_description="Synthetic program", program_status="Active" if p % 4 else "Closed",
+                program_manager=f"Manager {p % 7}",
+            )).inserted_primary_key[0]
+            category_ids, subcategory_ids = [], []
+            for c in range(categories):
+                category_id = conn.execute(insert(WbsCategory).values(
+                    program_id=program_id, category_name=f"{code} WBS {c + 1}",
+                )).inserted_primary_key[0]
+                category_ids.append(category_id)
+                for s in range(SUBCATEGORIES_PER_CATEGORY):
+                    subcategory_ids.append(conn.execute(insert(WbsSubcategory).values(
+                        category_id=category_id, subcategory_name=f"WBS {c + 1}.{s + 1}",
+                    )).inserted_primary_key[0])
+            start = np.datetime64(date(2023, 1, 1)) + np.timedelta64(int(rng.integers(0, 365)), "D")
+            columns = _transactions(rng, categories * transactions, program_id, category_ids, subcategory_ids,
+                                    start, months=int(rng.integers(18, 48)), vendor_ids=vendor_ids)
+            columns["row_version"] = [version] * len(columns["program_id"])
+            _insert_columns(conn, LedgerTransaction.__table__, columns)
+            counts["programs"] += 1
+            counts["categories"] += categories
+            counts["subcategories"] += categories * SUBCATEGORIES_PER_CATEGORY
+            counts["transactions"] += categories * transactions
+        if clear:
+            for index in ledger_indexes:
+                index.create(bind=conn)
+        rebuild_rollup(conn)
+    if clear:
+        # After the commit, so a failed seed leaves the archive intact.
+        drop_archived([m.__tablename__ for m in CLEARED_MODELS], archive_dir)
+        remove_snapshots(snapshot_dir)
+    return counts
+
+
+def main(argv=None):
+    from database.database import engine, Base
+    import models  # noqa: F401  (registers every table)
+
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic programs and ledger rows.")
+    parser.add_argument("--programs", type=int, default=10)
+    parser.add_argument("--categories", type=int, default=8, help="WBS categories per program")
+    parser.add_argument("--transactions", type=int, default=1000, help="ledger rows per WBS category")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clear", action="store_true",
+                        help="delete existing programs, WBS and ledger rows (and their history) first")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    counts = seed(engine, args.programs, args.categories, args.transactions, args.seed, clear=args.clear)
+    elapsed = time.perf_counter() - started
+    print(", ".join(f"{v} {k}" for k, v in counts.items()) + f" seeded in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# vendors.py
+"""The vendor dimension: interning ledger vendor names as integer keys.
+
+Every ledger write resolves its vendor name to a ``vendors`` row by
+canonical name: accents stripped, case folded, punctuation dropped and the
+usual company suffixes shortened, so "ACME Corp.", "Acme Corporation" and
+"acme corp" are one vendor. The ledger stores only the vendor's id in
+``vendor_id``; its ``vendor_name`` is the vendor's display name (the first
+spelling seen), read from ``vendors``. Vendor filters, the rollup and the
+dashboard's top vendors work on the integer id; sorting by vendor name and
+search join ``vendors`` for the name.
+
+Names are resolved with one INSERT ... ON CONFLICT ... RETURNING per batch,
+which creates the missing vendors and returns the ids of all of them.
+Vendors are never renamed or deleted, so ids are kept in an in-process
+cache once the transaction that saw them has committed; a write naming
+known vendors costs no extra statement.
+
+ORM writes are resolved in ``before_flush``. Code that writes the ledger with
+Core statements calls ``intern_vendors`` (or ``resolve_vendors`` on a plain
+connection) itself. ``backfill_vendors`` links ledger rows written before the
+dimension existed from their old vendor_name column, which is kept until an
+operator drops it (``python -m database.migrations drop-obsolete``).
+"""
+import logging
+import re
+import threading
+import unicodedata
+from sqlalchemy import bindparam, column, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+from models.ledger_transaction import LedgerTransaction
+from models.vendor import Vendor
+from database.database import PARAMETER_BATCH
+
+logger = logging.getLogger(__name__)
+
+# Suffix words folded to one spelling in canonical names.
+SUFFIXES = {
+    "corporation": "corp",
+    "incorporated": "inc",
+    "company": "co",
+    "limited": "ltd",
+}
+# Rows per executemany UPDATE when backfilling.
+BACKFILL_BATCH = 500
+MAX_CACHED_VENDORS = 100000
+
+_PENDING_KEY = "vendors_pending"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_cache = {}  # canonical name -> (id, display name), committed vendors only
+_cache_lock = threading.Lock()
+
+
+def canonical_vendor_name(name: str) -> str:
+    """The matching key for a vendor name.
+
+    A name without letters or digits is matched on its stripped, case folded
+    spelling. A blank name has the key "" and no vendor.
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return " ".join(SUFFIXES.get(word, word) for word in _WORD.findall(folded)) or folded.strip()
+
+
+def clear_vendor_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _remember(vendors: dict):
+    with _cache_lock:
+        if len(_cache) + len(vendors) > MAX_CACHED_VENDORS:
+            _cache.clear()
+        _cache.update(vendors)
+
+
+def _upsert_statement(dialect_name: str, rows: list):
+    table = Vendor.__table__
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values(rows)
+    # A no-op update rather than DO NOTHING, so existing vendors are returned too.
+    return stmt.on_conflict_do_update(
+        index_elements=["canonical_name"],
+        set_={"canonical_name": stmt.excluded.canonical_name},
+    ).returning(table.c.id, table.c.vendor_name, table.c.canonical_name)
+
+
+def resolve_vendors(connection, names, pending: dict = None) -> dict:
+    """{name: (vendor_id, display name)} for ``names``, creating vendors that do not exist yet.
+
+    The first of several new spellings in ``names`` becomes the display name.
+    Blank names are left out.
+    Vendors looked up in the database are added to ``pending`` (canonical
+    name -> (id, display name)) if given, for caching once committed.
+    """
+    canonical = {name: canonical_vendor_name(name) for name in dict.fromkeys(names) if name is not None}
+    found = {}
+    missing = {}
+    with _cache_lock:
+        for name, key in canonical.items():
+            if not key or key in found or key in missing:
+                continue
+            hit = _cache.get(key) or (pending or {}).get(key)
+            if hit is not None:
+                found[key] = hit
+            else:
+                missing[key] = name.strip()
+    keys = list(missing)
+    for start in range(0, len(keys), PARAMETER_BATCH):
+        rows = [{"vendor_name": missing[key], "canonical_name": key} for key in keys[start:start + PARAMETER_BATCH]]
+        for vendor_id, display, key in connection.execute(_upsert_statement(connection.dialect.name, rows)):
+            found[key] = (vendor_id, display)
+            if pending is not None:
+                pending[key] = (vendor_id, display)
+    return {name: found[key] for name, key in canonical.items() if key}
+
+
+def intern_vendors(session: Session, names) -> dict:
+    """``resolve_vendors`` inside a session; new ids are cached when the session commits."""
+    return resolve_vendors(session.connection(), names, session.info.setdefault(_PENDING_KEY, {}))
+
+
+@event.listens_for(Session, "before_flush")
+def assign_vendors(session, flush_context, instances):
+    """Point new ledger rows, and rows whose vendor name changed, at their vendor."""
+    rows = [obj for obj in session.new if isinstance(obj, LedgerTransaction)]
+    rows += [obj for obj in session.dirty
+             if isinstance(obj, LedgerTransaction) and inspect(obj).attrs.vendor_name.history.has_changes()]
+    if not rows:
+        return
+    vendors = intern_vendors(session, [obj.vendor_name for obj in rows])
+    for obj in rows:
+        obj.vendor_id, display = vendors.get(obj.vendor_name, (None, ""))
+        if display != obj.vendor_name:
+            obj.vendor_name = display
+
+
+@event.listens_for(Session, "after_commit")
+def cache_committed_vendors(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _remember(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_vendors(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Vendor.__table__, "after_create")
+@event.listens_for(Vendor.__table__, "after_drop")
+def _vendors_table_replaced(target, connection, **kw):
+    clear_vendor_cache()
+
+
+def backfill_vendors(engine) -> int:
+    """Create vendors for ledger rows that have none and link them; returns the rows updated.
+
+    Only databases whose ledger still has its old vendor_name column need
+    this. Like other migrations this writes no edit history.
+    """
+    t = LedgerTransaction.__table__
+    if "vendor_name" not in {c["name"] for c in inspect(engine).get_columns(t.name)}:
+        return 0
+    vendor_name = column("vendor_name")
+    updated = 0
+    with engine.begin() as conn:
+        # Oldest row first, so a vendor is displayed as it was first spelled.
+        names = conn.execute(
+            select(vendor_name).select_from(t).where(t.c.vendor_id.is_(None))
+            .group_by(vendor_name).order_by(func.min(t.c.id))
+        ).scalars().all()
+        vendors = resolve_vendors(conn, names)
+        if not vendors:
+            return 0
+        link = update(t).where(t.c.vendor_id.is_(None), vendor_name == bindparam("b_name")).values(vendor_id=bindparam("b_vendor_id"))
+        params = [{"b_name": name, "b_vendor_id": vendor_id} for name, (vendor_id, _) in vendors.items()]
+        for start in range(0, len(params), BACKFILL_BATCH):
+            updated += conn.execute(link, params[start:start + BACKFILL_BATCH]).rowcount
+    logger.info("Linked %d ledger rows to %d vendors.", updated, len(set(vendors.values())))
+    return updated
+
+
+def unlinked_vendor_rows(engine) -> int:
+    """Ledger rows with a name in the old vendor_name column but no vendor_id (0 once the column is gone)."""
+    t = LedgerTransaction.__table__
+    if "vendor_name" not in {c["name"] for c in inspect(engine).get_columns(t.name)}:
+        return 0
+    vendor_name = column("vendor_name")
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(t).where(t.c.vendor_id.is_(None), func.trim(vendor_name) != "")
+        ).scalar()
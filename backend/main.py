@@ -1,20 +1,64 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from typing import List
-from database.database import SessionLocal, engine
+from typing import List, Optional
+from datetime import datetime
+from itertools import islice
+from database.database import SessionLocal, engine, settings as database_settings
+from database.config import log_engine_report
+from database.ledger_filters import LedgerFilters
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from database.migrations import drop_obsolete_indexes, ensure_columns, ensure_indexes, recreate_derived_tables, relax_obsolete_columns
+from database.dashboard import compute_dashboard_summary, compute_portfolio_summary
+from database.evm import compute_evm_series
+from database.dashboard_cache import dashboard_cache
+from database.bulk_ingest import BulkFormatError, parse_records, ingest_records
+from database.ledger_bulk_edit import BulkEditError, bulk_delete, bulk_update
+from database.ledger_search import SearchQueryError, ensure_search_index, search_available, search_ledger
+from database.fast_json import select_for_schema, schema_columns, rows_as_dicts, rows_as_columns, json_response
+from database.ledger_export import ARROW_MEDIA_TYPE, EXPORT_FORMATS, STREAMERS, arrow_available, arrow_ipc, parquet_available
+from database.history_archive import iter_archived, merge_newest_first
+from database.history_timeline import UnknownTableError, reconstruct_record, record_timeline
+from database.ledger_snapshots import compute_dashboard_summary_as_known
+from database.vendors import backfill_vendors
+from database.ledger_sync import SyncExpiredError, ledger_changes
+from database.change_feed import FeedFullError, change_feed  # Also registers the change feed listener
 import models
 from models.program import Program as ProgramModel
 from models.ledger_transaction import LedgerTransaction as LedgerTransactionModel
 from models.wbs_category import WbsCategory as WbsCategoryModel
 from models.wbs_subcategory import WbsSubcategory as WbsSubcategoryModel
 from models.edit_history import EditHistory as EditHistoryModel
+from models.vendor import Vendor as VendorModel
 from schemas import schemas
 import database.history_listener  # Ensure the event listener is registered
+from database.rollup import ensure_rollup_populated  # Also registers the rollup listener
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from async_api import router as async_router
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, request_metrics
+from compression import CompressionMiddleware
 
 # Create database tables if they don't exist
 models.Base.metadata.create_all(bind=engine)
+# A rollup keyed on vendor names is emptied here and rebuilt on vendor ids below
+recreate_derived_tables(engine, [models.LedgerMonthlyRollup.__table__])
+added_columns = ensure_columns(engine)
+ensure_indexes(engine)
+# Link ledger rows written before the vendor dimension existed, then drop the old vendor-name indexes
+backfill_vendors(engine)
+drop_obsolete_indexes(engine)
+# Full-text search index (FTS5 on SQLite) for databases created before it existed, or built on vendor_name
+ensure_search_index(engine)
+# Vendor names are read from vendors now. The ledger's old copy is kept, but no longer written,
+# until an operator drops it with `python -m database.migrations drop-obsolete`
+relax_obsolete_columns(engine)
+# A rollup table that just gained a column (an amount or dated_count) must be recomputed from the ledger
+ensure_rollup_populated(engine, rebuild=any(t == models.LedgerMonthlyRollup.__tablename__ for t, _ in added_columns))
+# Log the effective engine settings (PRAGMAs or pool sizes) once at startup
+log_engine_report(engine, database_settings)
 
 app = FastAPI(title="LRE Project API")
 
@@ -27,6 +71,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# zstd, brotli or gzip as the client accepts, for bodies of at least COMPRESSION_MIN_SIZE bytes (see compression.py)
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, response size and DB time histograms, served on /metrics.
+# Added after compression so it wraps it and records the bytes actually sent.
+app.add_middleware(MetricsMiddleware)
+
+# Async versions of the CRUD and dashboard endpoints under /async (see async_api.py)
+app.include_router(async_router)
+
 # Dependency to get a DB session
 def get_db():
     db = SessionLocal()
@@ -83,10 +137,136 @@ def create_ledger_transaction(transaction: schemas.LedgerTransactionCreate, db:
     db.refresh(db_transaction)
     return db_transaction
 
+@app.post("/ledger_transactions/bulk/", response_model=schemas.BulkIngestResult)
+async def bulk_create_ledger_transactions(
+    request: Request,
+    chunk_size: int = Query(0, ge=0, description="Rows per transaction; 0 inserts the whole batch in one transaction"),
+    db: Session = Depends(get_db)
+):
+    # Body is a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) of LedgerTransactionCreate records.
+    body = await request.body()
+    try:
+        records = list(parse_records(body, request.headers.get("content-type")))
+    except (BulkFormatError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(ingest_records, db, records, chunk_size)
+
+@app.patch("/ledger_transactions/bulk/", response_model=schemas.LedgerTransactionBulkUpdateResult)
+def bulk_update_ledger_transactions(
+    edit: schemas.LedgerTransactionBulkUpdate,
+    filters: LedgerFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    # Rows are selected by edit.ids and/or the filter query parameters; see database/ledger_bulk_edit.py.
+    try:
+        return bulk_update(db, edit.ids, filters.conditions(), edit.changes.model_dump(exclude_unset=True), edit.shift_days)
+    except BulkEditError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/ledger_transactions/bulk/", response_model=schemas.LedgerTransactionBulkDeleteResult)
+def bulk_delete_ledger_transactions(
+    selection: Optional[schemas.LedgerTransactionBulkDelete] = None,
+    filters: LedgerFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    try:
+        return bulk_delete(db, selection.ids if selection else None, filters.conditions())
+    except BulkEditError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/ledger_transactions/", response_model=List[schemas.LedgerTransaction])
-def read_ledger_transactions(skip: int = 0, limit: int = None, db: Session = Depends(get_db)):
-    transactions = db.query(LedgerTransactionModel).offset(skip).limit(limit).all()
-    return transactions
+def read_ledger_transactions(
+    skip: int = 0,
+    limit: int = None,
+    list_format: str = Query("json", alias="format", description="json (an object per row), columns (an array per column) or arrow (Arrow IPC stream)"),
+    filters: LedgerFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    if list_format not in ("json", "columns", "arrow"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use one of: json, columns, arrow.")
+    if list_format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=501, detail="Arrow responses require pyarrow to be installed.")
+    # Fast path: plain column tuples encoded straight to JSON (see database/fast_json.py)
+    columns = schema_columns(LedgerTransactionModel, schemas.LedgerTransaction)
+    stmt = filters.apply(select_for_schema(LedgerTransactionModel, schemas.LedgerTransaction)).offset(skip).limit(limit)
+    rows = db.execute(stmt).all()
+    if list_format == "columns":
+        return json_response(rows_as_columns(rows, columns))
+    if list_format == "arrow":
+        return Response(content=arrow_ipc(rows, [c.name for c in columns]), media_type=ARROW_MEDIA_TYPE)
+    return json_response(rows_as_dicts(rows, columns))
+
+@app.get("/ledger_transactions/changes/", response_model=schemas.LedgerTransactionChanges)
+def read_ledger_transaction_changes(
+    since_version: Optional[int] = Query(None, ge=0, description="version from the previous response; omit for every row"),
+    program_id: Optional[int] = Query(None, description="Only rows for this program"),
+    db: Session = Depends(get_db)
+):
+    # Delta sync: rows written and ids deleted since since_version; see database/ledger_sync.py.
+    columns = schema_columns(LedgerTransactionModel, schemas.LedgerTransaction)
+    try:
+        changes = ledger_changes(db, columns, since_version, program_id)
+    except SyncExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return json_response({**changes, "items": rows_as_dicts(changes["items"], columns)})
+
+@app.get("/ledger_transactions/search/", response_model=List[schemas.LedgerTransactionSearchHit])
+def search_ledger_transactions(
+    response: Response,
+    q: str = Query(..., description="Words to find in descriptions, notes, vendors and invoice numbers (prefixes match)"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    filters: LedgerFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    # Best matches first; the filter parameters (e.g. program_id) narrow the hits. See database/ledger_search.py.
+    if not search_available(db):
+        raise HTTPException(status_code=501, detail="Search requires SQLite with FTS5 or PostgreSQL.")
+    try:
+        hits, truncated = search_ledger(db, q, filters.conditions(), limit, filters.program_id)
+    except SearchQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # True when too many rows matched to rank them all; only the newest were ranked.
+    response.headers["X-Search-Truncated"] = "true" if truncated else "false"
+    return hits
+
+@app.get("/ledger_transactions/export/")
+def export_ledger_transactions(
+    export_format: str = Query("csv", alias="format", description="csv, ndjson, parquet or arrow (Arrow IPC stream)"),
+    filters: LedgerFilters = Depends()
+):
+    # Streams the filtered ledger in fixed-size batches; see database/ledger_export.py.
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}.")
+    if export_format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed.")
+    if export_format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=501, detail="Arrow export requires pyarrow to be installed.")
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        STREAMERS[export_format](filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="ledger_transactions.{extension}"'},
+    )
+
+@app.get("/ledger_transactions/page/", response_model=schemas.LedgerTransactionPage)
+def read_ledger_transactions_page(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    filters: LedgerFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    # Keyset pagination on id: every page is an index seek, however deep it is.
+    if filters.sort_by != "id":
+        raise HTTPException(status_code=400, detail="Cursor pagination only supports sort_by=id.")
+    descending = filters.sort_order == "desc"
+    columns = schema_columns(LedgerTransactionModel, schemas.LedgerTransaction)
+    stmt = filters.apply(select_for_schema(LedgerTransactionModel, schemas.LedgerTransaction))
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        stmt = stmt.where(LedgerTransactionModel.id < last_id if descending else LedgerTransactionModel.id > last_id)
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return json_response({"items": rows_as_dicts(rows[:limit], columns), "next_cursor": next_cursor})
 
 @app.put("/ledger_transactions/{transaction_id}", response_model=schemas.LedgerTransaction)
 def update_ledger_transaction(transaction_id: int, update_data: schemas.LedgerTransactionUpdate, db: Session = Depends(get_db)):
@@ -109,6 +289,17 @@ def delete_ledger_transaction(transaction_id: int, db: Session = Depends(get_db)
     db.commit()
     return {"detail": "Ledger Transaction deleted"}
 
+# ---------------------------
+# Vendors Endpoints
+# ---------------------------
+@app.get("/vendors/", response_model=List[schemas.Vendor])
+def read_vendors(
+    skip: int = 0,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    return db.query(VendorModel).order_by(VendorModel.vendor_name).offset(skip).limit(limit).all()
+
 # ---------------------------
 # WBS Categories Endpoints
 # ---------------------------
@@ -188,23 +379,86 @@ def delete_wbs_subcategory(subcategory_id: int, db: Session = Depends(get_db)):
 # ---------------------------
 @app.get("/edit_history/", response_model=List[schemas.EditHistory])
 def read_edit_history(skip: int = 0, limit: int = None, db: Session = Depends(get_db)):
-    histories = db.query(models.edit_history.EditHistory).order_by(models.edit_history.EditHistory.edited_at.desc()).offset(skip).limit(limit).all()
-    return histories
+    stmt = select_for_schema(EditHistoryModel, schemas.EditHistory).order_by(EditHistoryModel.edited_at.desc()).offset(skip).limit(limit)
+    rows = db.execute(stmt).all()
+    return json_response(rows_as_dicts(rows, schema_columns(EditHistoryModel, schemas.EditHistory)))
+
+@app.get("/edit_history/page/", response_model=schemas.EditHistoryPage)
+def read_edit_history_page(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    table_name: Optional[str] = Query(None, description="Only changes to this table"),
+    record_id: Optional[int] = Query(None, description="Only changes to this record"),
+    include_archived: bool = Query(False, description="Continue into archived history once the table is exhausted"),
+    db: Session = Depends(get_db)
+):
+    # Newest first, keyed on (edited_at, id) so ties on edited_at stay stable.
+    columns = schema_columns(EditHistoryModel, schemas.EditHistory)
+    stmt = select_for_schema(EditHistoryModel, schemas.EditHistory).order_by(EditHistoryModel.edited_at.desc(), EditHistoryModel.id.desc())
+    if table_name is not None:
+        stmt = stmt.where(EditHistoryModel.table_name == table_name)
+    if record_id is not None:
+        stmt = stmt.where(EditHistoryModel.record_id == record_id)
+    before = None
+    if cursor:
+        before = decode_cursor(cursor, datetime, int)
+        stmt = stmt.where(tuple_(EditHistoryModel.edited_at, EditHistoryModel.id) < tuple_(*before))
+    items = rows_as_dicts(db.execute(stmt.limit(limit + 1)).all(), columns)
+    if include_archived and len(items) <= limit:
+        # Archived rows are older than everything left in the table, so they
+        # are only needed once the table runs out.
+        archived = iter_archived(before, table_name, record_id)
+        names = [c.name for c in columns]
+        merged = merge_newest_first(iter(items), ({n: row[n] for n in names} for row in archived))
+        items = list(islice(merged, limit + 1))
+    next_cursor = encode_cursor(items[limit - 1]["edited_at"], items[limit - 1]["id"]) if len(items) > limit else None
+    return json_response({"items": items[:limit], "next_cursor": next_cursor})
+
+@app.get("/edit_history/record/{table_name}/{record_id}/", response_model=List[schemas.EditHistory])
+def read_record_timeline(
+    table_name: str,
+    record_id: int,
+    include_archived: bool = Query(False, description="Include archived history"),
+    db: Session = Depends(get_db)
+):
+    # Oldest first: the record's changes in the order they happened.
+    try:
+        entries = record_timeline(db, table_name, record_id, include_archived)
+    except UnknownTableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    names = [c.name for c in schema_columns(EditHistoryModel, schemas.EditHistory)]
+    return json_response([{n: entry[n] for n in names} for entry in entries])
+
+@app.get("/edit_history/record/{table_name}/{record_id}/as_of/", response_model=schemas.RecordState)
+def read_record_as_of(
+    table_name: str,
+    record_id: int,
+    timestamp: datetime = Query(..., description="Point in time (ISO 8601; naive values are UTC)"),
+    db: Session = Depends(get_db)
+):
+    try:
+        state, undone, known = reconstruct_record(db, table_name, record_id, timestamp)
+    except UnknownTableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not known:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return {
+        "table_name": table_name,
+        "record_id": record_id,
+        "as_of": timestamp,
+        "exists": state is not None,
+        "state": state,
+        "changes_undone": undone,
+    }
 
 # ---------------------------
 # Dashboard Endpoint
 # ---------------------------
-
-from fastapi import Query
-from datetime import datetime
-from collections import defaultdict
-from models.ledger_transaction import LedgerTransaction as LedgerTransactionModel
-from schemas import schemas
-
 @app.get("/dashboard/summary/", response_model=schemas.DashboardSummary)
 def get_dashboard_summary(
     program_id: int = Query(..., description="ID of the program"),
     as_of_date: str = Query(..., description="Date in YYYY-MM-DD format for financial summary"),
+    knowledge_date: Optional[datetime] = Query(None, description="Use the ledger as it stood at this time (ISO 8601; naive values are UTC)"),
     db: Session = Depends(get_db)
 ):
     # Parse the provided date
@@ -212,79 +466,88 @@ def get_dashboard_summary(
         as_of = datetime.strptime(as_of_date, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if knowledge_date is not None and not parquet_available():
+        raise HTTPException(status_code=501, detail="Knowledge-date summaries require pyarrow to be installed.")
+
+    # Served from the summary cache until the program's ledger or WBS categories change.
+    cache_key = as_of.isoformat() if knowledge_date is None else f"{as_of.isoformat()}@{knowledge_date.isoformat()}"
+    summary = dashboard_cache.get(program_id, cache_key)
+    if summary is None:
+        generation = dashboard_cache.generation(program_id)
+        if knowledge_date is None:
+            summary = compute_dashboard_summary(db, program_id, as_of)
+        else:
+            # Starts from the nearest ledger snapshot and replays only later history (see ledger_snapshots.py).
+            summary = compute_dashboard_summary_as_known(db, program_id, as_of, knowledge_date)
+        summary = schemas.DashboardSummary(**summary)
+        dashboard_cache.put(program_id, cache_key, summary, generation)
+    return summary
+
+@app.get("/dashboard/portfolio/", response_model=schemas.PortfolioSummary)
+def get_portfolio_summary(
+    as_of_date: str = Query(..., description="Date in YYYY-MM-DD format for financial summary"),
+    program_status: Optional[str] = Query(None, description="Only programs with this status, e.g. Active"),
+    program_id: Optional[List[int]] = Query(None, description="Only these programs (repeatable)"),
+    top_variances: int = Query(3, ge=0, le=50, description="WBS categories with the largest variance per program"),
+    db: Session = Depends(get_db)
+):
+    try:
+        as_of = datetime.strptime(as_of_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    return compute_portfolio_summary(db, as_of, program_status, program_id, top_variances)
 
-    # Get all transactions for this program
-    transactions = db.query(LedgerTransactionModel).filter(LedgerTransactionModel.program_id == program_id).all()
-
-    # Metrics Calculation
-    actuals_to_date = sum(float(t.actual_amount or 0) for t in transactions if t.actual_date and t.actual_date <= as_of)
-    planned_to_date = sum(float(t.planned_amount or 0) for t in transactions if t.planned_date and t.planned_date <= as_of)
-    planned_to_go = sum(float(t.planned_amount or 0) for t in transactions if t.planned_date and t.planned_date >= as_of)
-
-    category_variance = {}
-    vendor_spend = {}
-    monthly_cash_flow = defaultdict(lambda: {"baseline": 0.0, "planned": 0.0, "actual": 0.0})
-
-    for t in transactions:
-        # # Accumulate actuals and planned spend
-        # if t.actual_date and t.actual_date <= as_of:
-        #     actuals_to_date += float(t.actual_amount or 0)
-
-        # if t.planned_date and t.planned_date <= as_of:
-        #     planned_to_date += float(t.planned_amount or 0)
-
-        # Categorize transactions by WBS category
-        if t.wbs_category_id:
-            category_variance.setdefault(t.wbs_category_id, {"planned": 0.0, "actual": 0.0})
-            category_variance[t.wbs_category_id]["planned"] += float(t.planned_amount or 0)
-            category_variance[t.wbs_category_id]["actual"] += float(t.actual_amount or 0)
-
-        # Track spending by vendor
-        if t.vendor_name:
-            vendor_spend.setdefault(t.vendor_name, 0.0)
-            vendor_spend[t.vendor_name] += float(t.actual_amount or 0)
-
-        # Monthly cash flow (YYYY-MM format)
-        if t.baseline_date:
-            month_key = t.baseline_date.strftime("%Y-%m")
-            monthly_cash_flow[month_key]["baseline"] += float(t.baseline_amount or 0)
-
-        if t.planned_date:
-            month_key = t.planned_date.strftime("%Y-%m")
-            monthly_cash_flow[month_key]["planned"] += float(t.planned_amount or 0)
-
-        if t.actual_date:
-            month_key = t.actual_date.strftime("%Y-%m")
-            monthly_cash_flow[month_key]["actual"] += float(t.actual_amount or 0)
-
-    # Calculate Estimate at Completion (EAC) and Variance
-    etc = planned_to_go
-    eac = actuals_to_date + etc
-
-    # Identify Top Variance Categories
-    variance_alerts = []
-    for category_id, values in category_variance.items():
-        variance = abs(values["planned"] - values["actual"])
-        if variance > 1000:  # Threshold for alert (adjust as needed)
-            variance_alerts.append({
-                "wbs_category_id": category_id,
-                "planned": values["planned"],
-                "actual": values["actual"],
-                "variance": variance
-            })
-
-    # Identify Top 5 Vendors by Spend
-    top_vendors = [{"vendor": vendor, "spend": float(spend)} for vendor, spend in sorted(vendor_spend.items(), key=lambda x: x[1], reverse=True)[:5]]
+@app.get("/dashboard/summary/cache_stats/", response_model=schemas.DashboardCacheStats)
+def get_dashboard_cache_stats():
+    return dashboard_cache.stats()
 
+# ---------------------------
+# Analytics Endpoints
+# ---------------------------
+@app.get("/analytics/evm/", response_model=schemas.EvmTimeSeries)
+def get_evm_series(
+    program_id: int = Query(..., description="ID of the program"),
+    as_of_date: Optional[str] = Query(None, description="Cut the series at this date's month (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
+):
+    as_of = None
+    if as_of_date is not None:
+        try:
+            as_of = datetime.strptime(as_of_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+
+    # Shares the dashboard cache, so it is invalidated by the same ledger and WBS writes.
+    cache_key = f"evm:{as_of.isoformat() if as_of else ''}"
+    series = dashboard_cache.get(program_id, cache_key)
+    if series is None:
+        generation = dashboard_cache.generation(program_id)
+        series = schemas.EvmTimeSeries(**compute_evm_series(db, program_id, as_of))
+        dashboard_cache.put(program_id, cache_key, series, generation)
+    return series
 
-    return {
-        "program_id": program_id,
-        "as_of_date": as_of_date,
-        "actuals_to_date": actuals_to_date,
-        "planned_to_date": planned_to_date,
-        "etc": etc,
-        "eac": eac,
-        "monthly_cash_flow": monthly_cash_flow,
-        "variance_alerts": variance_alerts,
-        "top_vendors": top_vendors,
-    }
+# ---------------------------
+# Live Change Feed Endpoint
+# ---------------------------
+@app.get("/changes/stream/")
+async def stream_changes(
+    request: Request,
+    program_id: Optional[int] = Query(None, description="Only changes to this program; omit for every program")
+):
+    # Server-sent events as writes commit; see database/change_feed.py.
+    try:
+        subscription = change_feed.subscribe(program_id)
+    except FeedFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        change_feed.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------------------------
+# Metrics Endpoint
+# ---------------------------
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(content=request_metrics.render(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,213 @@
+# metrics.py
+"""Request metrics exposed in the Prometheus text format on GET /metrics.
+
+``MetricsMiddleware`` is a plain ASGI middleware (no BaseHTTPMiddleware, no
+per-request allocations beyond a couple of small lists). Per method and
+route template, such as ``/programs/{program_id}``, it records:
+
+* request counts by status code,
+* request latency, response body size and DB time histograms,
+* the number of SQL statements executed,
+
+and it also tracks the number of requests in flight. DB time is the time
+spent inside cursor executes on any engine while the request is handled,
+taken from the request's QueryTrace (see database/query_tracing.py).
+Requests that match no route are grouped under a single "unmatched" label so
+that scanners cannot blow up the series count.
+"""
+import bisect
+import threading
+import time
+from database.dashboard_cache import dashboard_cache
+from database.change_feed import change_feed
+from database.query_tracing import QueryTrace, end_trace, log_repeated_statements, start_trace
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}"
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {_number(self.value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}"
+
+
+class RequestMetrics:
+    def __init__(self):
+        route_labels = ("method", "route")
+        self.requests = Counter("lre_http_requests_total", "HTTP requests handled.", route_labels + ("status",))
+        self.in_progress = Gauge("lre_http_requests_in_progress", "HTTP requests currently being handled.")
+        self.latency = Histogram("lre_http_request_duration_seconds", "Time to handle a request, including streaming the body.",
+                                 LATENCY_BUCKETS, route_labels)
+        self.response_size = Histogram("lre_http_response_size_bytes", "Size of the response body.", SIZE_BUCKETS, route_labels)
+        self.db_time = Histogram("lre_http_request_db_seconds", "Time spent executing SQL while handling a request.",
+                                 LATENCY_BUCKETS, route_labels)
+        self.db_statements = Counter("lre_http_request_db_statements_total", "SQL statements executed while handling requests.",
+                                     route_labels)
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int, db_seconds: float, statements: int):
+        labels = (method, route)
+        self.requests.inc(labels + (str(status),))
+        self.latency.observe(labels, seconds)
+        self.response_size.observe(labels, size)
+        self.db_time.observe(labels, db_seconds)
+        if statements:
+            self.db_statements.inc(labels, statements)
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.in_progress, self.latency, self.response_size, self.db_time, self.db_statements):
+            lines.extend(metric.render())
+        lines.extend(_dashboard_cache_lines())
+        lines.extend(_change_feed_lines())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        self.__init__()
+
+
+def _dashboard_cache_lines():
+    stats = dashboard_cache.stats()
+    for key, kind in (("hits", "counter"), ("misses", "counter"), ("invalidations", "counter"), ("entries", "gauge")):
+        name = f"lre_dashboard_cache_{key}" + ("_total" if kind == "counter" else "")
+        yield f"# HELP {name} Dashboard summary cache {key}."
+        yield f"# TYPE {name} {kind}"
+        yield f"{name} {stats[key]}"
+
+
+def _change_feed_lines():
+    stats = change_feed.stats()
+    for key, kind, documentation in (
+        ("subscribers", "gauge", "Open change feed streams."),
+        ("published", "counter", "Change feed events published."),
+        ("dropped", "counter", "Change feed subscribers dropped for falling behind."),
+    ):
+        name = f"lre_change_feed_{key}" + ("_total" if kind == "counter" else "")
+        yield f"# HELP {name} {documentation}"
+        yield f"# TYPE {name} {kind}"
+        yield f"{name} {stats[key]}"
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response = [500, 0]  # status, body bytes
+        trace = QueryTrace()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                response[1] += len(message.get("body", b""))
+            await send(message)
+
+        token = start_trace(trace)
+        self.metrics.in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_progress.dec()
+            end_trace(token)
+            # The router stores the matched route in the scope; use its path template.
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            self.metrics.observe(scope["method"], route, response[0], elapsed, response[1], trace.seconds, trace.count)
+            log_repeated_statements(trace, f"{scope['method']} {route}")
+
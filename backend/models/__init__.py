@@ -5,3 +5,7 @@ from .program import Program
 from .wbs_category import WbsCategory
 from .wbs_subcategory import WbsSubcategory
 from .edit_history import EditHistory
+from .ledger_rollup import LedgerMonthlyRollup
+from .vendor import Vendor
+from .change_version import ChangeVersion
+from .ledger_tombstone import LedgerTombstone
@@ -0,0 +1,15 @@
+# models/change_version.py
+from sqlalchemy import Column, Integer, String
+from database.database import Base
+
+class ChangeVersion(Base):
+    """The latest change version handed out for a table (see database/ledger_sync.py).
+
+    ``pruned_version`` is the newest version whose tombstones have been
+    deleted; clients that last synced before it must reload in full.
+    """
+    __tablename__ = 'change_versions'
+
+    table_name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    pruned_version = Column(Integer, nullable=False, default=0)
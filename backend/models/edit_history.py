@@ -1,5 +1,5 @@
 # models/edit_history.py
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, Index
 from datetime import datetime, timezone
 from database.database import Base
 
@@ -14,3 +14,10 @@ class EditHistory(Base):
     new_value = Column(Text)
     record_id = Column(Integer, nullable=False)  # ID of the record changed
     table_name = Column(String(50), nullable=False)
+
+    # Keyset pagination walks the history newest first on (edited_at, id);
+    # per-record lookups walk one record's history in the same order.
+    __table_args__ = (
+        Index("ix_edit_history_edited_at_id", "edited_at", "id"),
+        Index("ix_edit_history_record", "table_name", "record_id", "edited_at", "id"),
+    )
@@ -0,0 +1,34 @@
+# models/ledger_rollup.py
+from sqlalchemy import Column, Integer, String, DECIMAL, UniqueConstraint
+from database.database import Base
+
+class LedgerMonthlyRollup(Base):
+    """Baseline/planned/actual/earned sums per program, WBS category, subcategory, vendor and month.
+
+    Maintained in the same transaction as every ledger write (see
+    database/rollup.py). Key columns use sentinels instead of NULL so the
+    unique key can be upserted: 0 means "no WBS category/subcategory/vendor"
+    and an empty month means the amount has no date. ``earned_amount`` is the
+    baseline amount of lines that have been performed, bucketed by their
+    actual date (earned value, BCWP). ``dated_count`` counts the baseline,
+    planned and actual dates that fall in the month, with or without an
+    amount, so a month stays in the cash flow while any line is dated in it.
+    """
+    __tablename__ = 'ledger_monthly_rollup'
+
+    id = Column(Integer, primary_key=True, index=True)
+    program_id = Column(Integer, nullable=False)
+    wbs_category_id = Column(Integer, nullable=False, default=0)
+    wbs_subcategory_id = Column(Integer, nullable=False, default=0)
+    vendor_id = Column(Integer, nullable=False, default=0)
+    month = Column(String(7), nullable=False, default="")  # YYYY-MM
+    baseline_amount = Column(DECIMAL(14,2), nullable=False, default=0)
+    planned_amount = Column(DECIMAL(14,2), nullable=False, default=0)
+    actual_amount = Column(DECIMAL(14,2), nullable=False, default=0)
+    earned_amount = Column(DECIMAL(14,2), nullable=False, default=0, server_default="0")
+    dated_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        UniqueConstraint("program_id", "wbs_category_id", "wbs_subcategory_id", "vendor_id", "month",
+                         name="uq_ledger_rollup_key"),
+    )
@@ -0,0 +1,20 @@
+# models/ledger_tombstone.py
+from sqlalchemy import Column, Integer, TIMESTAMP, Index
+from datetime import datetime, timezone
+from database.database import Base
+
+class LedgerTombstone(Base):
+    """A ledger row that left a program at ``version``: deleted, or moved to another program."""
+    __tablename__ = 'ledger_tombstones'
+
+    id = Column(Integer, primary_key=True, index=True)
+    record_id = Column(Integer, nullable=False)
+    program_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+
+    # Delta sync reads one program's tombstones newer than a version, or all of them.
+    __table_args__ = (
+        Index("ix_ledger_tombstones_program_version", "program_id", "version"),
+        Index("ix_ledger_tombstones_version", "version"),
+    )
@@ -1,15 +1,25 @@
 # models/ledger_transaction.py
-from sqlalchemy import Column, Integer, String, Text, Date, DECIMAL, TIMESTAMP, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Date, DECIMAL, TIMESTAMP, ForeignKey, Index, func, literal_column, select
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime, timezone
 from database.database import Base
+from models.vendor import Vendor
 
 class LedgerTransaction(Base):
     __tablename__ = 'ledger_transactions'
     
     id = Column(Integer, primary_key=True, index=True)
     program_id = Column(Integer, ForeignKey("programs.id"), nullable=False)
-    vendor_name = Column(String(255), nullable=False)
+    # Interned vendor (see database/vendors.py); set from vendor_name on every write.
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=True)
+    # The vendor's display name, looked up in vendors rather than stored per row
+    # ("" for a row without a vendor). Assigning it names the row's vendor:
+    # before_flush interns it into vendor_id. It is kept through the flush, so
+    # history records the name that was written.
+    vendor_name = column_property(
+        func.coalesce(select(Vendor.vendor_name).where(Vendor.id == vendor_id).scalar_subquery(), literal_column("''")),
+        expire_on_flush=False,
+    )
     expense_description = Column(Text, nullable=False)
     # New foreign keys for WBS Category and Subcategory
     wbs_category_id = Column(Integer, ForeignKey("wbs_categories.id"), nullable=True)
@@ -25,8 +35,33 @@ class LedgerTransaction(Base):
     invoice_number = Column(String(50), nullable=True)
     notes = Column(Text, nullable=True)
     created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
+    # Change version of the last write to this row (see database/ledger_sync.py).
+    row_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     program = relationship("Program", back_populates="transactions")
     wbs_category = relationship("WbsCategory", back_populates="transactions")
     wbs_subcategory = relationship("WbsSubcategory", back_populates="transactions")
+
+    # Composite indexes backing the ledger list filters. Filters are normally
+    # scoped to a program, so program_id leads most indexes; the trailing id
+    # lets sorted/paged scans stay inside the index. The rest cover filters
+    # made across all programs: WBS category or subcategory alone, vendor,
+    # each date range and delta sync. Vendor filters and aggregations use the
+    # integer vendor_id; sorting by vendor name joins vendors on it.
+    __table_args__ = (
+        Index("ix_ledger_program_id", "program_id", "id"),
+        Index("ix_ledger_program_wbs", "program_id", "wbs_category_id", "wbs_subcategory_id", "id"),
+        Index("ix_ledger_program_vendor_id", "program_id", "vendor_id", "id"),
+        Index("ix_ledger_program_baseline_date", "program_id", "baseline_date", "id"),
+        Index("ix_ledger_program_planned_date", "program_id", "planned_date", "id"),
+        Index("ix_ledger_program_actual_date", "program_id", "actual_date", "id"),
+        Index("ix_ledger_program_row_version", "program_id", "row_version", "id"),
+        Index("ix_ledger_wbs", "wbs_category_id", "wbs_subcategory_id", "id"),
+        Index("ix_ledger_wbs_subcategory", "wbs_subcategory_id", "id"),
+        Index("ix_ledger_baseline_date", "baseline_date", "id"),
+        Index("ix_ledger_planned_date", "planned_date", "id"),
+        Index("ix_ledger_actual_date", "actual_date", "id"),
+        Index("ix_ledger_vendor_id", "vendor_id", "id"),
+        Index("ix_ledger_row_version", "row_version", "id"),
+    )
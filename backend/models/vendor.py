@@ -0,0 +1,18 @@
+# models/vendor.py
+from sqlalchemy import Column, Integer, String, TIMESTAMP
+from datetime import datetime, timezone
+from database.database import Base
+
+class Vendor(Base):
+    """One row per distinct vendor, keyed by its canonical name (see database/vendors.py).
+
+    ``vendor_name`` is the spelling the vendor was first seen with and is what
+    the ledger and dashboard display; "ACME Corp." and "Acme Corporation"
+    share the canonical name "acme corp" and therefore one id.
+    """
+    __tablename__ = 'vendors'
+
+    id = Column(Integer, primary_key=True, index=True)
+    vendor_name = Column(String(255), nullable=False)
+    canonical_name = Column(String(255), nullable=False, unique=True)
+    created_at = Column(TIMESTAMP, default=lambda: datetime.now(timezone.utc))
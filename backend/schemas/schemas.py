@@ -1,6 +1,6 @@
 # schemas.py
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -22,6 +22,16 @@ class Program(ProgramBase):
 
     model_config = ConfigDict(from_attributes=True)  # Updated for Pydantic V2
 
+# --- Vendor Schema ---
+# One interned vendor; canonical_name is what ledger vendor names are matched on.
+class Vendor(BaseModel):
+    id: int
+    vendor_name: str
+    canonical_name: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
 # --- Ledger Transaction Schemas ---
 class LedgerTransactionBase(BaseModel):
     program_id: int
@@ -44,10 +54,38 @@ class LedgerTransactionCreate(LedgerTransactionBase):
 
 class LedgerTransaction(LedgerTransactionBase):
     id: int
+    vendor_id: Optional[int] = None
     created_at: datetime
+    row_version: int = 0
 
     model_config = ConfigDict(from_attributes=True)
 
+# A page of ledger rows from keyset pagination; pass next_cursor back to get the next page.
+class LedgerTransactionPage(BaseModel):
+    items: List[LedgerTransaction]
+    next_cursor: Optional[str] = None
+
+# A full-text search hit; rank orders the hits, higher is a better match.
+class LedgerTransactionSearchHit(LedgerTransaction):
+    rank: float
+
+# Ledger rows changed and ids deleted since a client's version; store version for the next request.
+class LedgerTransactionChanges(BaseModel):
+    version: int
+    items: List[LedgerTransaction]
+    deleted: List[int]
+
+# Result of a bulk ledger upload; row numbers are 1-based positions in the upload.
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class BulkIngestResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+
 # --- WBS Category Schemas ---
 class WbsCategoryBase(BaseModel):
     program_id: int
@@ -89,6 +127,19 @@ class EditHistory(EditHistoryBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class EditHistoryPage(BaseModel):
+    items: List[EditHistory]
+    next_cursor: Optional[str] = None
+
+# A record's column values as of a point in time; state is None if it did not exist then
+class RecordState(BaseModel):
+    table_name: str
+    record_id: int
+    as_of: datetime
+    exists: bool
+    state: Optional[Dict[str, Any]] = None
+    changes_undone: int
+
 # schemas.py (add these at the bottom or after your create schemas)
 
 from datetime import date
@@ -123,6 +174,30 @@ class LedgerTransactionUpdate(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+# Changes applied by a bulk edit; amounts are validated here because the bulk UPDATE bypasses the ORM
+class LedgerTransactionBulkChanges(LedgerTransactionUpdate):
+    baseline_amount: Optional[Decimal] = None
+    planned_amount: Optional[Decimal] = None
+    actual_amount: Optional[Decimal] = None
+
+# Bulk edit of the ledger rows selected by ids and/or the ledger list filters (query parameters)
+class LedgerTransactionBulkUpdate(BaseModel):
+    ids: Optional[List[int]] = None
+    changes: LedgerTransactionBulkChanges = LedgerTransactionBulkChanges()
+    shift_days: Dict[str, int] = {}  # e.g. {"planned_date": 14} moves every planned date two weeks later
+
+class LedgerTransactionBulkDelete(BaseModel):
+    ids: Optional[List[int]] = None
+
+class LedgerTransactionBulkUpdateResult(BaseModel):
+    matched: int
+    updated: int
+    items: List[LedgerTransaction]
+
+class LedgerTransactionBulkDeleteResult(BaseModel):
+    deleted: int
+    ids: List[int]
+
 # --- WBS Category Update Schema ---
 class WbsCategoryUpdate(BaseModel):
     category_name: Optional[str] = None
@@ -168,4 +243,63 @@ class DashboardSummary(BaseModel):
     variance_alerts: List[VarianceAlert]
     top_vendors: List[TopVendor]  # ✅ Expecting a list of dictionaries, not tuples
 
-    model_config = ConfigDict(from_attributes=True)  # ✅ Ensures Pydantic V2 compatibility
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)  # ✅ Ensures Pydantic V2 compatibility
+
+# Hit/miss counters of the dashboard summary cache
+class DashboardCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    invalidations: int
+
+# One program's row of the portfolio summary
+class PortfolioProgramSummary(BaseModel):
+    program_id: int
+    program_name: str
+    program_code: str
+    program_status: str
+    actuals_to_date: float
+    planned_to_date: float
+    etc: float
+    eac: float
+    variance_alert_count: int
+    top_variances: List[VarianceAlert]
+
+# Dashboard figures for a set of programs, with portfolio totals
+class PortfolioSummary(BaseModel):
+    as_of_date: str
+    program_count: int
+    actuals_to_date: float
+    planned_to_date: float
+    etc: float
+    eac: float
+    programs: List[PortfolioProgramSummary]
+
+# One month of the earned value (EVM) series; ratios are None while their denominator is zero
+class EvmMonth(BaseModel):
+    month: str
+    bcws: float
+    bcwp: float
+    acwp: float
+    cum_bcws: float
+    cum_bcwp: float
+    cum_acwp: float
+    cv: float
+    sv: float
+    cpi: Optional[float] = None
+    spi: Optional[float] = None
+    tcpi: Optional[float] = None
+
+# Earned value time series of a program, with the indices of its last month
+class EvmTimeSeries(BaseModel):
+    program_id: int
+    as_of_date: Optional[str] = None
+    bac: float
+    cpi: Optional[float] = None
+    spi: Optional[float] = None
+    tcpi: Optional[float] = None
+    eac: Optional[float] = None
+    vac: Optional[float] = None
+    months: List[EvmMonth]
@@ -6,21 +6,34 @@ import axios from 'axios';
 function EditHistoryPage() {
   const [editHistory, setEditHistory] = useState([]);
   const [currentPage, setCurrentPage] = useState(1);
+  // cursors[i] is the cursor that loads page i + 1 (page 1 needs none).
+  const [cursors, setCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
   const recordsPerPage = 100; // Show 100 records per page
   const navigate = useNavigate();
 
   // Fetch edit history logs from the backend
   const fetchEditHistory = (page = 1) => {
-    const skip = (page - 1) * recordsPerPage;
-    axios.get(`http://localhost:8000/edit_history/?skip=${skip}&limit=${recordsPerPage}`)
+    const params = { limit: recordsPerPage };
+    if (cursors[page - 1]) {
+      params.cursor = cursors[page - 1];
+    }
+    axios.get('http://localhost:8000/edit_history/page/', { params })
       .then(response => {
-        setEditHistory(response.data);
+        setEditHistory(response.data.items);
+        setNextCursor(response.data.next_cursor);
       })
       .catch(error => console.error('Error fetching edit history:', error));
   };
 
+  const goToNextPage = () => {
+    setCursors([...cursors.slice(0, currentPage), nextCursor]);
+    setCurrentPage(currentPage + 1);
+  };
+
   useEffect(() => {
     fetchEditHistory(currentPage);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [currentPage]);
 
   return (
@@ -73,8 +86,8 @@ function EditHistoryPage() {
         </button>
         <span>Page {currentPage}</span>
         <button 
-          onClick={() => setCurrentPage(currentPage + 1)} 
-          disabled={editHistory.length < recordsPerPage} 
+          onClick={goToNextPage} 
+          disabled={!nextCursor} 
           style={{ marginLeft: '1rem' }}
         >
           Next
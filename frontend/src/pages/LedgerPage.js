@@ -63,13 +63,10 @@ function LedgerPage() {
 
   const fetchTransactions = () => {
     axios
-      .get('http://localhost:8000/ledger_transactions/')
-      .then((response) => {
-        const filtered = response.data.filter(
-          (tx) => tx.program_id === parseInt(programId)
-        );
-        setTransactions(filtered);
+      .get('http://localhost:8000/ledger_transactions/', {
+        params: { program_id: programId },
       })
+      .then((response) => setTransactions(response.data))
       .catch((error) => console.error('Error fetching ledger transactions:', error));
   };
 
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Compare the Pydantic response_model path with the fast JSON path for ledger lists.
+
+Seeds a throwaway SQLite database with N ledger rows, then times building the
+GET /ledger_transactions/ body both ways and checks the bytes are identical.
+
+    python scripts/benchmark_list_serialization.py --rows 20000 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def seed(engine, Base, rows):
+    from sqlalchemy import insert
+    from models.program import Program
+    from models.ledger_transaction import LedgerTransaction
+    from database.vendors import resolve_vendors
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    start = date(2023, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Program.__table__), [{"program_name": "Bench", "program_code": "BENCH", "program_manager": "Bench"}])
+        # Rows point at interned vendors, so the fast path pays for its vendor name lookup as in production.
+        vendor_ids = [vendor_id for vendor_id, _ in resolve_vendors(conn, ["Acme Corp", "GlobalTech", "WidgetCo"]).values()]
+        conn.execute(insert(LedgerTransaction.__table__), [{
+            "program_id": 1,
+            "vendor_id": rng.choice(vendor_ids),
+            "expense_description": "Benchmark row",
+            "baseline_date": start + timedelta(days=rng.randint(0, 900)),
+            "baseline_amount": Decimal(rng.randint(100, 500000)) / 100,
+            "planned_date": start + timedelta(days=rng.randint(0, 900)),
+            "planned_amount": Decimal(rng.randint(100, 500000)) / 100,
+            "actual_date": start + timedelta(days=rng.randint(0, 900)),
+            "actual_amount": Decimal(rng.randint(100, 500000)) / 100,
+            "invoice_number": f"INV-{i}",
+            "notes": "Benchmark",
+        } for i in range(rows)])
+
+
+def pydantic_path(SessionLocal, LedgerTransaction, adapter):
+    db = SessionLocal()
+    try:
+        objects = db.query(LedgerTransaction).all()
+        payload = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+        return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+    finally:
+        db.close()
+
+
+def fast_path(SessionLocal, LedgerTransaction, schema):
+    from database.fast_json import dumps, rows_as_dicts, schema_columns, select_for_schema
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(select_for_schema(LedgerTransaction, schema)).all()
+        return dumps(rows_as_dicts(rows, schema_columns(LedgerTransaction, schema)))
+    finally:
+        db.close()
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 20000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='lre_bench_'), 'bench.db')}")
+    sys.path.insert(0, BACKEND_DIR)
+    from typing import List
+    from pydantic import TypeAdapter
+    from database.database import Base, SessionLocal, engine
+    import models  # noqa: F401  (registers every table)
+    from models.ledger_transaction import LedgerTransaction
+    from schemas import schemas
+
+    adapter = TypeAdapter(List[schemas.LedgerTransaction])
+    print(f"{'rows':>8} {'pydantic (s)':>13} {'fast (s)':>10} {'speedup':>8} {'bytes':>12}")
+    for rows in args.rows:
+        seed(engine, Base, rows)
+        slow, slow_body = best_of(lambda: pydantic_path(SessionLocal, LedgerTransaction, adapter), args.repeat)
+        fast, fast_body = best_of(lambda: fast_path(SessionLocal, LedgerTransaction, schemas.LedgerTransaction), args.repeat)
+        if slow_body != fast_body:
+            sys.exit(f"Fast path output differs from the Pydantic output at {rows} rows")
+        print(f"{rows:>8} {slow:>13.3f} {fast:>10.3f} {slow / fast:>7.1f}x {len(fast_body):>12}")
+
+
+if __name__ == "__main__":
+    main()
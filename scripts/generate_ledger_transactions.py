@@ -4,7 +4,7 @@ import requests
 import random
 import datetime
 
-API_URL = "http://localhost:8000/ledger_transactions/"
+API_URL = "http://localhost:8000/ledger_transactions/bulk/"
 
 def random_date(start_year=2023, end_year=2025):
     """Generate a random ISO-format date string between start_year and end_year."""
@@ -32,6 +32,7 @@ def main():
     #               if category=5 => 12
     #               if category=6 => 13
 
+    transactions = []
     for i in range(num_records):
         vendor_name = random.choice(possible_vendors)
         expense_description = random.choice(possible_descriptions)
@@ -75,14 +76,18 @@ def main():
             "notes": notes
         }
 
-        try:
-            response = requests.post(API_URL, json=transaction_data)
-            response.raise_for_status()
-            # If your API returns the created record ID
-            record_id = response.json().get("id", "Unknown")
-            print(f"Created record {i+1}/{num_records} - ID: {record_id}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error creating record {i+1}: {e}")
+        transactions.append(transaction_data)
+
+    # Send every record in one bulk request; bad rows come back in the error report.
+    try:
+        response = requests.post(API_URL, json=transactions)
+        response.raise_for_status()
+        result = response.json()
+        print(f"Created {result['inserted']}/{num_records} records")
+        for error in result["errors"]:
+            print(f"Error in record {error['row']}: {'; '.join(error['errors'])}")
+    except requests.exceptions.RequestException as e:
+        print(f"Error creating records: {e}")
 
 if __name__ == "__main__":
     main()
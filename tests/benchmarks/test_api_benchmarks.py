@@ -0,0 +1,184 @@
+# tests/benchmarks/test_api_benchmarks.py
+"""In-process benchmarks for the API, the dashboard and the history listener.
+
+Each benchmark runs once per ledger size in LRE_BENCHMARK_SIZES (total ledger
+rows, default "1000,10000,100000"), against a database filled by the
+synthetic seeder. Runs are skipped unless --run-benchmarks is given and are
+autosaved under .benchmarks/, so a later run can be compared:
+
+    pytest tests/benchmarks --run-benchmarks
+    pytest tests/benchmarks --run-benchmarks --benchmark-compare --benchmark-compare-fail=mean:25%
+
+The CRUD endpoints are all covered; /programs/{id} and
+/ledger_transactions/{id} have no GET route, only the PUT and DELETE
+benchmarked here.
+"""
+import itertools
+import os
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine, SessionLocal
+from database.dashboard_cache import dashboard_cache
+from database.seed import seed
+from models.ledger_transaction import LedgerTransaction
+from models.program import Program
+from models.wbs_category import WbsCategory
+
+pytestmark = pytest.mark.benchmark_suite
+
+SIZES = [int(s) for s in os.environ.get("LRE_BENCHMARK_SIZES", "1000,10000,100000").split(",")]
+PROGRAMS = 4
+CATEGORIES = 5
+
+client = TestClient(app)
+_counter = itertools.count()
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}rows")
+def seeded(request):
+    Base.metadata.create_all(bind=engine)
+    seed(engine, PROGRAMS, CATEGORIES, max(request.param // (PROGRAMS * CATEGORIES), 1), clear=True)
+    dashboard_cache.clear()
+    db = SessionLocal()
+    program_id = db.query(Program.id).order_by(Program.id).first()[0]
+    category_id = db.query(WbsCategory.id).filter(WbsCategory.program_id == program_id).first()[0]
+    transaction_id = db.query(LedgerTransaction.id).filter(LedgerTransaction.program_id == program_id).first()[0]
+    db.close()
+    yield {"program_id": program_id, "category_id": category_id, "transaction_id": transaction_id}
+    Base.metadata.drop_all(bind=engine)
+
+
+def _ok(response):
+    assert response.status_code == 200, response.text
+    return response
+
+
+def _new_transaction(program_id):
+    return {
+        "program_id": program_id,
+        "vendor_name": "Benchmark Vendor",
+        "expense_description": "Benchmark insert",
+        "planned_date": "2024-06-01",
+        "planned_amount": "100.00",
+    }
+
+
+# ---------------------------
+# Programs / WBS endpoints
+# ---------------------------
+def test_read_programs(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/programs/")))
+
+def test_create_update_delete_program(benchmark, seeded):
+    def cycle():
+        n = next(_counter)
+        program_id = _ok(client.post("/programs/", json={
+            "program_name": f"Bench Program {n}", "program_code": f"BP{n}", "program_manager": "Bench",
+        })).json()["id"]
+        _ok(client.put(f"/programs/{program_id}", json={"program_manager": "Bench 2"}))
+        _ok(client.delete(f"/programs/{program_id}"))
+    benchmark(cycle)
+
+def test_read_wbs_categories(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/wbs_categories/")))
+
+def test_read_wbs_subcategories(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/wbs_subcategories/")))
+
+def test_update_wbs_category(benchmark, seeded):
+    benchmark(lambda: _ok(client.put(f"/wbs_categories/{seeded['category_id']}", json={"category_name": f"Bench {next(_counter)}"})))
+
+def test_create_delete_wbs_category(benchmark, seeded):
+    def cycle():
+        category_id = _ok(client.post("/wbs_categories/", json={
+            "program_id": seeded["program_id"], "category_name": f"Bench WBS {next(_counter)}",
+        })).json()["id"]
+        _ok(client.delete(f"/wbs_categories/{category_id}"))
+    benchmark(cycle)
+
+def test_create_update_delete_wbs_subcategory(benchmark, seeded):
+    def cycle():
+        n = next(_counter)
+        subcategory_id = _ok(client.post("/wbs_subcategories/", json={
+            "category_id": seeded["category_id"], "subcategory_name": f"Bench Sub {n}",
+        })).json()["id"]
+        _ok(client.put(f"/wbs_subcategories/{subcategory_id}", json={"subcategory_name": f"Bench Sub {n}b"}))
+        _ok(client.delete(f"/wbs_subcategories/{subcategory_id}"))
+    benchmark(cycle)
+
+# ---------------------------
+# Ledger endpoints
+# ---------------------------
+def test_read_ledger_for_program(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/ledger_transactions/", params={"program_id": seeded["program_id"]})))
+
+def test_read_ledger_filtered(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/ledger_transactions/", params={
+        "program_id": seeded["program_id"], "wbs_category_id": seeded["category_id"],
+        "planned_date_from": "2024-01-01", "planned_date_to": "2024-03-31",
+    })))
+
+def test_read_ledger_page(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/ledger_transactions/page/", params={"program_id": seeded["program_id"], "limit": 100})))
+
+def test_create_ledger_transaction(benchmark, seeded):
+    benchmark(lambda: _ok(client.post("/ledger_transactions/", json=_new_transaction(seeded["program_id"]))))
+
+def test_update_ledger_transaction(benchmark, seeded):
+    benchmark(lambda: _ok(client.put(f"/ledger_transactions/{seeded['transaction_id']}", json={"notes": f"Bench {next(_counter)}"})))
+
+def test_delete_ledger_transaction(benchmark, seeded):
+    def setup():
+        transaction_id = _ok(client.post("/ledger_transactions/", json=_new_transaction(seeded["program_id"]))).json()["id"]
+        return (transaction_id,), {}
+    benchmark.pedantic(lambda transaction_id: _ok(client.delete(f"/ledger_transactions/{transaction_id}")),
+                       setup=setup, rounds=20)
+
+def test_bulk_ingest_500(benchmark, seeded):
+    rows = [_new_transaction(seeded["program_id"]) for _ in range(500)]
+    benchmark(lambda: _ok(client.post("/ledger_transactions/bulk/", json=rows)))
+
+def test_export_csv_program(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/ledger_transactions/export/", params={"program_id": seeded["program_id"], "format": "csv"})))
+
+def test_async_read_ledger_for_program(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/async/ledger_transactions/", params={"program_id": seeded["program_id"]})))
+
+# ---------------------------
+# Edit history
+# ---------------------------
+def test_read_edit_history(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/edit_history/", params={"limit": 100})))
+
+def test_read_edit_history_page(benchmark, seeded):
+    benchmark(lambda: _ok(client.get("/edit_history/page/", params={"limit": 100})))
+
+def test_history_listener_flush_100_updates(benchmark, seeded):
+    db = SessionLocal()
+    transactions = db.query(LedgerTransaction).filter(LedgerTransaction.program_id == seeded["program_id"]).limit(100).all()
+
+    def flush_updates():
+        n = next(_counter)
+        for t in transactions:
+            t.notes = f"Bench {n}"
+            t.vendor_name = f"Vendor {n % 7}"
+        db.commit()
+    try:
+        benchmark(flush_updates)
+    finally:
+        db.close()
+
+# ---------------------------
+# Dashboard
+# ---------------------------
+def test_dashboard_uncached(benchmark, seeded):
+    def summary():
+        dashboard_cache.clear()
+        _ok(client.get("/dashboard/summary/", params={"program_id": seeded["program_id"], "as_of_date": "2024-06-15"}))
+    benchmark(summary)
+
+def test_dashboard_cached(benchmark, seeded):
+    params = {"program_id": seeded["program_id"], "as_of_date": "2024-06-15"}
+    _ok(client.get("/dashboard/summary/", params=params))
+    benchmark(lambda: _ok(client.get("/dashboard/summary/", params=params)))
@@ -1,6 +1,38 @@
 # tests/conftest.py
 import sys
 import os
+import tempfile
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The backend modules import each other as top-level packages (database, models, schemas)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+# Run against a throwaway database so the test modules' drop_all never touches a real one.
+_scratch = tempfile.mkdtemp(prefix='lre_tests_')
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'test.db')}")
+# Likewise for the files kept beside it, which seeding with clear=True deletes.
+os.environ.setdefault("HISTORY_ARCHIVE_DIR", os.path.join(_scratch, "history_archive"))
+os.environ.setdefault("LEDGER_SNAPSHOT_DIR", os.path.join(_scratch, "ledger_snapshots"))
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-benchmarks", action="store_true", default=False,
+                     help="run the benchmark suite in tests/benchmarks (needs pytest-benchmark)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark_suite: in-process API benchmarks, skipped unless --run-benchmarks")
+    if config.getoption("--run-benchmarks") and hasattr(config.option, "benchmark_autosave"):
+        # Keep every run under .benchmarks/ so later runs can --benchmark-compare against it.
+        config.option.benchmark_autosave = True
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    import pytest
+    skip = pytest.mark.skip(reason="benchmarks run only with --run-benchmarks")
+    for item in items:
+        if "benchmark_suite" in item.keywords:
+            item.add_marker(skip)
@@ -151,3 +151,27 @@ def test_edit_history():
         for record in data
     )
     assert found
+
+# ---------------------------
+# Test Engine Configuration
+# ---------------------------
+def test_sqlite_pragmas_applied():
+    from database.config import describe_engine
+    from database.database import settings
+    report = describe_engine(engine, settings)
+    assert report["journal_mode"] == "wal"
+    assert report["synchronous"] == 1  # NORMAL
+    assert report["busy_timeout"] == settings.sqlite_busy_timeout
+    assert report["cache_size"] == settings.sqlite_cache_size
+
+def test_database_settings_from_env(monkeypatch):
+    from database.config import DatabaseSettings
+    monkeypatch.setenv("DATABASE_URL", "postgresql://user:secret@db:5432/lre")
+    monkeypatch.setenv("DB_POOL_SIZE", "25")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    settings = DatabaseSettings.from_env()
+    assert not settings.is_sqlite
+    kwargs = settings.engine_kwargs()
+    assert kwargs["pool_size"] == 25
+    assert kwargs["pool_pre_ping"] is False
+    assert "connect_args" not in kwargs
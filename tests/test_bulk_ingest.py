@@ -0,0 +1,93 @@
+# tests/test_bulk_ingest.py
+import json
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+ids = {}
+
+def _row(**overrides):
+    row = {
+        "program_id": ids["program_id"],
+        "vendor_name": "Bulk Vendor",
+        "expense_description": "Bulk row",
+        "planned_date": "2024-04-01",
+        "planned_amount": "10.00",
+    }
+    row.update(overrides)
+    return row
+
+def _count():
+    return len(client.get("/ledger_transactions/", params={"program_id": ids["program_id"]}).json())
+
+def test_create_bulk_program():
+    response = client.post("/programs/", json={
+        "program_name": "Bulk Program",
+        "program_code": "BLK01",
+        "program_manager": "Manager B",
+    })
+    ids["program_id"] = response.json()["id"]
+
+def test_bulk_json_array_with_bad_rows():
+    rows = [_row(), _row(vendor_name=None), _row(), _row(program_id=999999), _row(planned_amount="abc")]
+    response = client.post("/ledger_transactions/bulk/", json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["received"] == 5
+    assert data["inserted"] == 2
+    assert [e["row"] for e in data["errors"]] == [2, 4, 5]
+    assert "program_id 999999 does not exist" in data["errors"][1]["errors"]
+    assert _count() == 2
+
+def test_bulk_ndjson_in_chunks():
+    body = "\n".join(json.dumps(_row(expense_description=f"NDJSON {i}")) for i in range(5)) + "\n{not json}\n"
+    response = client.post(
+        "/ledger_transactions/bulk/",
+        params={"chunk_size": 2},
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    data = response.json()
+    assert data["inserted"] == 5
+    assert data["errors"][0]["row"] == 6
+    assert _count() == 7
+
+def test_bulk_csv():
+    body = (
+        "program_id,vendor_name,expense_description,actual_date,actual_amount,notes\n"
+        f"{ids['program_id']},CSV Vendor,CSV row,2024-05-01,25.50,\n"
+        f"{ids['program_id']},CSV Vendor,CSV row,not-a-date,25.50,bad date\n"
+    )
+    response = client.post("/ledger_transactions/bulk/", content=body, headers={"Content-Type": "text/csv"})
+    data = response.json()
+    assert data["inserted"] == 1
+    assert data["errors"][0]["row"] == 2
+    rows = client.get("/ledger_transactions/", params={"program_id": ids["program_id"], "vendor_name": "CSV Vendor"}).json()
+    assert rows[0]["notes"] is None
+    assert rows[0]["actual_amount"] == "25.50"
+
+def test_bulk_updates_dashboard_rollup():
+    summary = client.get("/dashboard/summary/", params={"program_id": ids["program_id"], "as_of_date": "2024-12-31"}).json()
+    assert summary["planned_to_date"] == pytest.approx(70.0)
+    assert summary["actuals_to_date"] == pytest.approx(25.5)
+
+def test_bulk_rejects_unparseable_body():
+    response = client.post("/ledger_transactions/bulk/", content="{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    response = client.post("/ledger_transactions/bulk/", content="x", headers={"Content-Type": "application/xml"})
+    assert response.status_code == 400
+    # A quoted field longer than csv.field_size_limit() cannot be read at all.
+    notes = "x" * 200_000
+    body = f'program_id,vendor_name,expense_description,notes\n{ids["program_id"]},CSV Vendor,Long notes,"{notes}"\n'
+    response = client.post("/ledger_transactions/bulk/", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid CSV")
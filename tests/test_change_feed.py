@@ -0,0 +1,121 @@
+# tests/test_change_feed.py
+import asyncio
+import json
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+from database.change_feed import ChangeFeed, FeedFullError, change_feed
+
+client = TestClient(app)
+
+ids = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _sse_events(body: str) -> list:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def _stream_while(writes, program="program"):
+    """Events the stream sends while ``writes`` runs (the stream is closed afterwards)."""
+    responses = []
+    params = {"program_id": ids[program]} if program else {}
+    reader = threading.Thread(target=lambda: responses.append(client.get("/changes/stream/", params=params)))
+    reader.start()
+    deadline = time.monotonic() + 10
+    while change_feed.stats()["subscribers"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writes()
+    change_feed.close_all()
+    reader.join(10)
+    assert responses[0].headers["content-type"].startswith("text/event-stream")
+    return _sse_events(responses[0].text)
+
+def _ledger_row(description, program="program"):
+    return {"program_id": ids[program], "vendor_name": "Feed Vendor", "expense_description": description, "planned_amount": "5.00"}
+
+def test_seed_programs():
+    for key, code in (("program", "FEED01"), ("other", "FEED02")):
+        ids[key] = client.post("/programs/", json={
+            "program_name": f"Feed Program {code}",
+            "program_code": code,
+            "program_manager": "Manager F",
+        }).json()["id"]
+    ids["category"] = client.post("/wbs_categories/", json={"program_id": ids["program"], "category_name": "Feed WBS"}).json()["id"]
+
+def test_stream_sends_committed_changes_for_its_program():
+    def writes():
+        row = client.post("/ledger_transactions/", json=_ledger_row("Streamed")).json()
+        client.post("/ledger_transactions/", json=_ledger_row("Not for this stream", program="other"))
+        client.put(f"/ledger_transactions/{row['id']}", json={"notes": "changed"})
+        client.post("/wbs_subcategories/", json={"category_id": ids["category"], "subcategory_name": "Feed Sub"})
+        client.delete(f"/ledger_transactions/{row['id']}")
+        ids["row"] = row["id"]
+
+    events = _stream_while(writes)
+    changes = [(e["table"], e["op"], e["ids"]) for kind, e in events if kind == "change"]
+    assert changes[0] == ("ledger_transactions", "insert", [ids["row"]])
+    assert changes[1] == ("ledger_transactions", "update", [ids["row"]])
+    assert changes[2][:2] == ("wbs_subcategories", "insert")
+    assert changes[3] == ("ledger_transactions", "delete", [ids["row"]])
+    assert len(changes) == 4
+    assert {e["program_id"] for _, e in events} == {ids["program"]}
+    # Ledger events carry the sync version, so the rows can be fetched as a delta.
+    versions = [e["version"] for _, e in events if e["table"] == "ledger_transactions"]
+    assert versions == sorted(versions) and len(set(versions)) == 3
+    assert events[2][1]["version"] is None
+    seqs = [e["seq"] for _, e in events]
+    assert seqs == sorted(seqs)
+
+def test_bulk_writes_are_published():
+    def writes():
+        inserted = client.post("/ledger_transactions/bulk/", json=[_ledger_row(f"Bulk {i}") for i in range(3)] + [
+            _ledger_row("Bulk elsewhere", program="other")
+        ])
+        assert inserted.json()["inserted"] == 4
+        rows = client.get("/ledger_transactions/", params={"program_id": ids["program"]}).json()
+        ids["bulk"] = sorted(r["id"] for r in rows if r["expense_description"].startswith("Bulk "))
+        client.patch("/ledger_transactions/bulk/", json={"ids": ids["bulk"], "changes": {"notes": "bulk edited"}})
+        client.request("DELETE", "/ledger_transactions/bulk/", json={"ids": ids["bulk"][:1]})
+
+    events = _stream_while(writes, program=None)
+    ledger = [(e["op"], e["program_id"], sorted(e["ids"])) for _, e in events if e["table"] == "ledger_transactions"]
+    assert ("update", ids["program"], ids["bulk"]) in ledger
+    assert ("delete", ids["program"], ids["bulk"][:1]) in ledger
+    inserts = {program_id: len(row_ids) for op, program_id, row_ids in ledger if op == "insert"}
+    assert inserts == {ids["program"]: 3, ids["other"]: 1}
+
+def test_slow_subscriber_is_dropped_not_buffered():
+    feed = ChangeFeed(max_subscribers=1, queue_size=2)
+
+    async def read_all():
+        subscription = feed.subscribe(program_id=7)
+        with pytest.raises(FeedFullError):
+            feed.subscribe()
+        # Another program's events are not queued for it; the third of its own overflows the queue.
+        for program_id, n in ((8, 9), (7, 0), (7, 1), (7, 2)):
+            feed.publish([{"table": "programs", "op": "update", "program_id": program_id, "ids": [n], "version": None}])
+
+        async def disconnected():
+            return False
+        return [chunk async for chunk in feed.stream(subscription, disconnected, heartbeat=0.01)]
+
+    body = b"".join(asyncio.run(read_all())).decode()
+    assert [kind for kind, _ in _sse_events(body)] == ["resync"]
+    assert feed.stats() == {"subscribers": 0, "published": 4, "dropped": 1}
+
+def test_nothing_is_collected_without_subscribers():
+    before = change_feed.stats()["published"]
+    client.post("/ledger_transactions/", json=_ledger_row("Unobserved"))
+    assert change_feed.stats()["published"] == before
@@ -0,0 +1,81 @@
+# tests/test_compression.py
+import gzip
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+from compression import ENCODERS, choose_encoding
+
+client = TestClient(app)
+
+ids = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _raw(path, encoding, params=None):
+    """(response, body bytes as sent) for a GET with Accept-Encoding ``encoding``."""
+    with client.stream("GET", path, params=params, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+def _decode(raw, encoding):
+    if encoding == "br":
+        import brotli
+        return brotli.decompress(raw)
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    return gzip.decompress(raw)
+
+def test_choose_encoding():
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0.5, br;q=0.8") == ("br" if "br" in ENCODERS else "gzip")
+    assert choose_encoding("gzip, br, zstd") == next(iter(ENCODERS))
+    assert choose_encoding("deflate, *;q=0.2") == next(iter(ENCODERS))
+    assert choose_encoding("identity") is None
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("") is None
+
+def test_seed_ledger():
+    ids["program"] = client.post("/programs/", json={
+        "program_name": "Compression Program",
+        "program_code": "ZIP01",
+        "program_manager": "Manager Z",
+    }).json()["id"]
+    client.post("/ledger_transactions/bulk/", json=[{
+        "program_id": ids["program"],
+        "vendor_name": f"Vendor {i % 4}",
+        "expense_description": f"Compressed line {i}",
+        "planned_amount": f"{i}.50",
+    } for i in range(200)])
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_large_responses_are_compressed(encoding):
+    if encoding not in ENCODERS:
+        pytest.skip(f"{encoding} support is not installed")
+    params = {"program_id": ids["program"]}
+    plain = client.get("/ledger_transactions/", params=params, headers={"Accept-Encoding": "identity"})
+    response, raw = _raw("/ledger_transactions/", encoding, params)
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(raw) < len(plain.content) / 4
+    assert _decode(raw, encoding) == plain.content
+
+def test_small_and_incompressible_responses_are_sent_as_is():
+    response, raw = _raw(f"/programs/{ids['program']}", "gzip")
+    assert "content-encoding" not in response.headers
+    assert raw.startswith(b"{")
+    pytest.importorskip("pyarrow.parquet")
+    # Parquet is compressed internally.
+    response, raw = _raw("/ledger_transactions/export/", "gzip", {"program_id": ids["program"], "format": "parquet"})
+    assert "content-encoding" not in response.headers and raw.startswith(b"PAR1")
+
+def test_streamed_export_is_compressed_per_chunk():
+    response, raw = _raw("/ledger_transactions/export/", "gzip", {"program_id": ids["program"], "format": "csv"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = _decode(raw, "gzip").decode().splitlines()
+    assert len(lines) == 201 and "Compressed line 199" in lines[-1]
@@ -0,0 +1,201 @@
+# tests/test_dashboard.py
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine, SessionLocal
+from models.program import Program
+from models.wbs_category import WbsCategory
+from models.ledger_transaction import LedgerTransaction
+from database.dashboard_cache import dashboard_cache
+
+client = TestClient(app)
+
+AS_OF = date(2024, 6, 30)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    dashboard_cache.clear()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+ids = {}
+
+def _reference_summary(transactions, as_of):
+    """The row-by-row computation the SQL version has to reproduce."""
+    actuals = sum(float(t.actual_amount or 0) for t in transactions if t.actual_date and t.actual_date <= as_of)
+    planned = sum(float(t.planned_amount or 0) for t in transactions if t.planned_date and t.planned_date <= as_of)
+    to_go = sum(float(t.planned_amount or 0) for t in transactions if t.planned_date and t.planned_date >= as_of)
+    categories, vendors = {}, {}
+    months = defaultdict(lambda: {"baseline": 0.0, "planned": 0.0, "actual": 0.0})
+    for t in transactions:
+        if t.wbs_category_id:
+            c = categories.setdefault(t.wbs_category_id, {"planned": 0.0, "actual": 0.0})
+            c["planned"] += float(t.planned_amount or 0)
+            c["actual"] += float(t.actual_amount or 0)
+        if t.vendor_name:
+            vendors[t.vendor_name] = vendors.get(t.vendor_name, 0.0) + float(t.actual_amount or 0)
+        for kind in ("baseline", "planned", "actual"):
+            d = getattr(t, f"{kind}_date")
+            if d:
+                months[d.strftime("%Y-%m")][kind] += float(getattr(t, f"{kind}_amount") or 0)
+    alerts = [
+        {"wbs_category_id": cid, "planned": v["planned"], "actual": v["actual"], "variance": abs(v["planned"] - v["actual"])}
+        for cid, v in sorted(categories.items()) if abs(v["planned"] - v["actual"]) > 1000
+    ]
+    top = [{"vendor": v, "spend": s} for v, s in sorted(vendors.items(), key=lambda x: (-x[1], x[0]))[:5]]
+    return actuals, planned, to_go, months, alerts, top
+
+def test_seed_dashboard_data():
+    rng = random.Random(42)
+    db = SessionLocal()
+    program = Program(program_name="Dashboard Program", program_code="DB001", program_manager="Manager D")
+    other = Program(program_name="Other Program", program_code="DB002", program_manager="Manager O")
+    db.add_all([program, other])
+    db.flush()
+    categories = [WbsCategory(program_id=program.id, category_name=f"Dash Cat {i}") for i in range(4)]
+    db.add_all(categories)
+    db.flush()
+
+    def maybe_date():
+        return date(2023, 1, 1) + timedelta(days=rng.randint(0, 900)) if rng.random() > 0.1 else None
+
+    def maybe_amount():
+        return Decimal(rng.randint(100, 500000)) / 100 if rng.random() > 0.1 else None
+
+    for i in range(300):
+        db.add(LedgerTransaction(
+            program_id=program.id if i % 10 else other.id,
+            vendor_name=rng.choice(["Acme Corp", "GlobalTech", "WidgetCo", "AlphaDynamics", "Initech", "Hooli", ""]),
+            expense_description="Dashboard row",
+            wbs_category_id=rng.choice(categories).id if rng.random() > 0.2 else None,
+            baseline_date=maybe_date(), baseline_amount=maybe_amount(),
+            planned_date=maybe_date(), planned_amount=maybe_amount(),
+            actual_date=maybe_date(), actual_amount=maybe_amount(),
+        ))
+    db.commit()
+    ids["program_id"] = program.id
+    db.close()
+
+def test_dashboard_matches_row_by_row_reference():
+    response = client.get("/dashboard/summary/", params={"program_id": ids["program_id"], "as_of_date": AS_OF.isoformat()})
+    assert response.status_code == 200
+    data = response.json()
+
+    db = SessionLocal()
+    transactions = db.query(LedgerTransaction).filter(LedgerTransaction.program_id == ids["program_id"]).order_by(LedgerTransaction.id).all()
+    actuals, planned, to_go, months, alerts, top = _reference_summary(transactions, AS_OF)
+    db.close()
+
+    assert data["as_of_date"] == AS_OF.isoformat()
+    assert data["actuals_to_date"] == pytest.approx(actuals)
+    assert data["planned_to_date"] == pytest.approx(planned)
+    assert data["etc"] == pytest.approx(to_go)
+    assert data["eac"] == pytest.approx(actuals + to_go)
+    assert list(data["monthly_cash_flow"]) == sorted(months)
+    for month, entry in months.items():
+        assert data["monthly_cash_flow"][month] == pytest.approx(entry)
+    assert [a["wbs_category_id"] for a in data["variance_alerts"]] == [a["wbs_category_id"] for a in alerts]
+    for got, expected in zip(data["variance_alerts"], alerts):
+        assert got == pytest.approx(expected)
+    assert [v["vendor"] for v in data["top_vendors"]] == [v["vendor"] for v in top]
+    for got, expected in zip(data["top_vendors"], top):
+        assert got["spend"] == pytest.approx(expected["spend"])
+
+def test_dashboard_empty_program():
+    response = client.get("/dashboard/summary/", params={"program_id": 999999, "as_of_date": "2024-01-01"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["eac"] == 0.0
+    assert data["monthly_cash_flow"] == {}
+    assert data["top_vendors"] == []
+
+def test_dashboard_invalid_date():
+    response = client.get("/dashboard/summary/", params={"program_id": ids["program_id"], "as_of_date": "06/30/2024"})
+    assert response.status_code == 400
+
+def test_dashboard_follows_ledger_writes():
+    params = {"program_id": ids["program_id"], "as_of_date": AS_OF.isoformat()}
+    before = client.get("/dashboard/summary/", params=params).json()
+
+    response = client.post("/ledger_transactions/", json={
+        "program_id": ids["program_id"],
+        "vendor_name": "Late Vendor",
+        "expense_description": "Rollup write-through",
+        "planned_date": "2024-06-10",
+        "planned_amount": "250.00",
+        "actual_date": "2024-05-20",
+        "actual_amount": "200.00",
+    })
+    transaction_id = response.json()["id"]
+    after_create = client.get("/dashboard/summary/", params=params).json()
+    assert after_create["actuals_to_date"] == pytest.approx(before["actuals_to_date"] + 200)
+    assert after_create["planned_to_date"] == pytest.approx(before["planned_to_date"] + 250)
+    assert after_create["monthly_cash_flow"]["2024-05"]["actual"] == pytest.approx(before["monthly_cash_flow"]["2024-05"]["actual"] + 200)
+
+    client.put(f"/ledger_transactions/{transaction_id}", json={"planned_date": "2024-07-01"})
+    after_update = client.get("/dashboard/summary/", params=params).json()
+    assert after_update["planned_to_date"] == pytest.approx(before["planned_to_date"])
+    assert after_update["etc"] == pytest.approx(before["etc"] + 250)
+
+    client.delete(f"/ledger_transactions/{transaction_id}")
+    after_delete = client.get("/dashboard/summary/", params=params).json()
+    assert after_delete["actuals_to_date"] == pytest.approx(before["actuals_to_date"])
+    assert after_delete["etc"] == pytest.approx(before["etc"])
+
+def test_rollup_verify_and_rebuild():
+    from database.rollup import verify_rollup, rebuild_rollup
+    from models.ledger_rollup import LedgerMonthlyRollup
+    with engine.begin() as conn:
+        assert verify_rollup(conn) == []
+        conn.execute(LedgerMonthlyRollup.__table__.update().values(actual_amount=0))
+        assert verify_rollup(conn, ids["program_id"]) != []
+        rebuild_rollup(conn)
+        assert verify_rollup(conn) == []
+
+def test_dashboard_cache_hits_and_invalidation():
+    params = {"program_id": ids["program_id"], "as_of_date": "2024-03-31"}
+    first = client.get("/dashboard/summary/", params=params).json()
+    stats = client.get("/dashboard/summary/cache_stats/").json()
+    second = client.get("/dashboard/summary/", params=params).json()
+    assert second == first
+    after_hit = client.get("/dashboard/summary/cache_stats/").json()
+    assert after_hit["hits"] == stats["hits"] + 1
+    assert after_hit["misses"] == stats["misses"]
+
+    # A ledger write for the program drops its cached summaries.
+    client.post("/ledger_transactions/", json={
+        "program_id": ids["program_id"],
+        "vendor_name": "Cache Vendor",
+        "expense_description": "Cache invalidation",
+        "actual_date": "2024-01-05",
+        "actual_amount": "75.00",
+    })
+    third = client.get("/dashboard/summary/", params=params).json()
+    assert third["actuals_to_date"] == pytest.approx(first["actuals_to_date"] + 75)
+    after_write = client.get("/dashboard/summary/cache_stats/").json()
+    assert after_write["misses"] == after_hit["misses"] + 1
+    assert after_write["invalidations"] > after_hit["invalidations"]
+
+def test_dashboard_cache_skips_stale_put():
+    generation = dashboard_cache.generation(424242)
+    dashboard_cache.invalidate_program(424242)
+    dashboard_cache.put(424242, "2024-01-01", {"stale": True}, generation)
+    assert dashboard_cache.get(424242, "2024-01-01") is None
+
+def test_month_with_dated_rows_but_no_amounts_is_reported():
+    params = {"program_id": ids["program_id"], "as_of_date": AS_OF.isoformat()}
+    created = client.post("/ledger_transactions/", json={
+        "program_id": ids["program_id"],
+        "vendor_name": "Zero Vendor",
+        "expense_description": "Dated, no amount",
+        "planned_date": "2031-02-14",
+    }).json()
+    flow = client.get("/dashboard/summary/", params=params).json()["monthly_cash_flow"]
+    assert flow["2031-02"] == {"baseline": 0.0, "planned": 0.0, "actual": 0.0}
+    client.delete(f"/ledger_transactions/{created['id']}")
+    assert "2031-02" not in client.get("/dashboard/summary/", params=params).json()["monthly_cash_flow"]
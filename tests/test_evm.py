@@ -0,0 +1,142 @@
+# tests/test_evm.py
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+from database.rollup import verify_rollup
+
+client = TestClient(app)
+
+ids = {}
+rows = []
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _reference(as_of_month=None):
+    """Plain-Python EVM series straight from the posted rows."""
+    bcws, bcwp, acwp = defaultdict(float), defaultdict(float), defaultdict(float)
+    for r in rows:
+        if r.get("baseline_date"):
+            bcws[r["baseline_date"][:7]] += float(r["baseline_amount"])
+        if r.get("actual_date"):
+            bcwp[r["actual_date"][:7]] += float(r["baseline_amount"])
+            acwp[r["actual_date"][:7]] += float(r["actual_amount"])
+    bac = sum(float(r["baseline_amount"]) for r in rows)
+    months = sorted(m for m in set(bcws) | set(bcwp) | set(acwp) if as_of_month is None or m <= as_of_month)
+    return bac, months, bcws, bcwp, acwp
+
+def test_seed_evm_data():
+    ids["program"] = client.post("/programs/", json={
+        "program_name": "EVM Program",
+        "program_code": "EVM001",
+        "program_manager": "Manager E",
+    }).json()["id"]
+    rng = random.Random(7)
+    start = date(2024, 1, 1)
+    for i in range(200):
+        baseline = start + timedelta(days=rng.randint(0, 300))
+        row = {
+            "program_id": ids["program"],
+            "vendor_name": rng.choice(["Acme Corp", "GlobalTech", "WidgetCo"]),
+            "expense_description": f"EVM line {i}",
+            "baseline_date": baseline.isoformat(),
+            "baseline_amount": f"{rng.randint(100, 50000) / 100:.2f}",
+        }
+        # Most lines are performed a little before or after their baseline date.
+        if rng.random() < 0.7:
+            row["actual_date"] = (baseline + timedelta(days=rng.randint(-20, 60))).isoformat()
+            row["actual_amount"] = f"{rng.randint(100, 50000) / 100:.2f}"
+        rows.append(row)
+    # An undated baseline counts toward BAC only.
+    rows.append({"program_id": ids["program"], "vendor_name": "Acme Corp", "expense_description": "Undated", "baseline_amount": "1000.00"})
+    response = client.post("/ledger_transactions/bulk/", json=rows)
+    assert response.json()["inserted"] == len(rows)
+
+def test_evm_series_matches_reference():
+    response = client.get("/analytics/evm/", params={"program_id": ids["program"]})
+    assert response.status_code == 200
+    data = response.json()
+    bac, months, bcws, bcwp, acwp = _reference()
+    assert data["bac"] == pytest.approx(bac)
+    # Months are contiguous from the first to the last dated amount.
+    assert data["months"][0]["month"] == months[0]
+    assert data["months"][-1]["month"] == months[-1]
+    cum = [0.0, 0.0, 0.0]
+    for entry in data["months"]:
+        m = entry["month"]
+        assert entry["bcws"] == pytest.approx(bcws[m])
+        assert entry["bcwp"] == pytest.approx(bcwp[m])
+        assert entry["acwp"] == pytest.approx(acwp[m])
+        cum = [cum[0] + bcws[m], cum[1] + bcwp[m], cum[2] + acwp[m]]
+        assert entry["cum_bcws"] == pytest.approx(cum[0])
+        assert entry["cum_bcwp"] == pytest.approx(cum[1])
+        assert entry["cum_acwp"] == pytest.approx(cum[2])
+        assert entry["cv"] == pytest.approx(cum[1] - cum[2])
+        assert entry["sv"] == pytest.approx(cum[1] - cum[0])
+        assert entry["cpi"] == (pytest.approx(cum[1] / cum[2]) if cum[2] else None)
+        assert entry["spi"] == (pytest.approx(cum[1] / cum[0]) if cum[0] else None)
+        assert entry["tcpi"] == pytest.approx((bac - cum[1]) / (bac - cum[2]))
+    assert data["cpi"] == data["months"][-1]["cpi"]
+    assert data["eac"] == pytest.approx(bac / data["cpi"], abs=0.01)
+    assert data["vac"] == pytest.approx(bac - data["eac"], abs=0.01)
+
+def test_evm_series_cut_at_as_of_date():
+    data = client.get("/analytics/evm/", params={"program_id": ids["program"], "as_of_date": "2024-06-15"}).json()
+    _, months, _, bcwp, acwp = _reference("2024-06")
+    assert data["as_of_date"] == "2024-06-15"
+    assert data["months"][-1]["month"] == "2024-06"
+    assert data["months"][-1]["cum_acwp"] == pytest.approx(sum(acwp[m] for m in months))
+    assert data["spi"] == data["months"][-1]["spi"]
+
+def test_evm_series_follows_ledger_writes():
+    before = client.get("/analytics/evm/", params={"program_id": ids["program"]}).json()
+    transaction_id = client.post("/ledger_transactions/", json={
+        "program_id": ids["program"],
+        "vendor_name": "Late Vendor",
+        "expense_description": "Performed late",
+        "baseline_date": "2024-02-10",
+        "baseline_amount": "500.00",
+        "actual_date": "2024-03-05",
+        "actual_amount": "650.00",
+    }).json()["id"]
+    after = client.get("/analytics/evm/", params={"program_id": ids["program"]}).json()
+    by_month = lambda data: {e["month"]: e for e in data["months"]}
+    assert by_month(after)["2024-03"]["bcwp"] == pytest.approx(by_month(before)["2024-03"]["bcwp"] + 500)
+    assert by_month(after)["2024-03"]["acwp"] == pytest.approx(by_month(before)["2024-03"]["acwp"] + 650)
+    assert after["bac"] == pytest.approx(before["bac"] + 500)
+
+    # Un-performing the line removes its earned value again.
+    client.put(f"/ledger_transactions/{transaction_id}", json={"actual_date": None, "actual_amount": None})
+    assert by_month(client.get("/analytics/evm/", params={"program_id": ids["program"]}).json())["2024-03"]["bcwp"] == \
+        pytest.approx(by_month(before)["2024-03"]["bcwp"])
+    with engine.connect() as conn:
+        assert verify_rollup(conn, ids["program"]) == []
+
+def test_evm_series_empty_program_and_bad_date():
+    data = client.get("/analytics/evm/", params={"program_id": 999999}).json()
+    assert data["months"] == [] and data["bac"] == 0 and data["cpi"] is None
+    response = client.get("/analytics/evm/", params={"program_id": ids["program"], "as_of_date": "06/15/2024"})
+    assert response.status_code == 400
+
+def test_ensure_columns_adds_earned_amount(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+    from database.migrations import ensure_columns
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(text("CREATE TABLE ledger_monthly_rollup (id INTEGER PRIMARY KEY, program_id INTEGER NOT NULL, "
+                          "wbs_category_id INTEGER NOT NULL, wbs_subcategory_id INTEGER NOT NULL, vendor_id INTEGER NOT NULL, "
+                          "month VARCHAR(7) NOT NULL, baseline_amount DECIMAL(14,2) NOT NULL, planned_amount DECIMAL(14,2) NOT NULL, "
+                          "actual_amount DECIMAL(14,2) NOT NULL)"))
+        conn.execute(text("INSERT INTO ledger_monthly_rollup VALUES (1, 1, 0, 0, 0, '2024-01', 1, 2, 3)"))
+    assert ensure_columns(old) == [("ledger_monthly_rollup", "earned_amount"), ("ledger_monthly_rollup", "dated_count")]
+    assert "earned_amount" in {c["name"] for c in inspect(old).get_columns("ledger_monthly_rollup")}
+    with old.connect() as conn:
+        assert conn.execute(text("SELECT earned_amount FROM ledger_monthly_rollup")).scalar() == 0
+    assert ensure_columns(old) == []
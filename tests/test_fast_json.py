@@ -0,0 +1,66 @@
+# tests/test_fast_json.py
+import json
+from typing import List
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from main import app
+from database import Base, engine, SessionLocal
+from models.ledger_transaction import LedgerTransaction
+from models.edit_history import EditHistory
+from schemas import schemas
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _pydantic_bytes(schema, objects) -> bytes:
+    """What FastAPI's response_model path would have sent for ``objects``."""
+    adapter = TypeAdapter(List[schema])
+    payload = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+def test_seed_fast_json_data():
+    response = client.post("/programs/", json={
+        "program_name": "Fast JSON Program",
+        "program_code": "FJ001",
+        "program_manager": "Manager J",
+    })
+    program_id = response.json()["id"]
+    rows = [{
+        "program_id": program_id,
+        "vendor_name": "Café Über GmbH" if i % 2 else "Plain Vendor",
+        "expense_description": f"Row \"{i}\"",
+        "baseline_date": "2024-01-31",
+        "baseline_amount": "1000.10",
+        "planned_amount": f"{i}.05",
+        "actual_date": None if i % 3 else "2024-03-01",
+        "notes": None,
+    } for i in range(12)]
+    assert client.post("/ledger_transactions/bulk/", json=rows).json()["inserted"] == 12
+    client.put(f"/programs/{program_id}", json={"program_manager": "Manager K"})
+
+def test_ledger_list_is_byte_identical_to_pydantic():
+    response = client.get("/ledger_transactions/")
+    db = SessionLocal()
+    expected = _pydantic_bytes(schemas.LedgerTransaction, db.query(LedgerTransaction).order_by(LedgerTransaction.id).all())
+    db.close()
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == expected
+
+def test_edit_history_list_is_byte_identical_to_pydantic():
+    response = client.get("/edit_history/")
+    db = SessionLocal()
+    expected = _pydantic_bytes(schemas.EditHistory, db.query(EditHistory).order_by(EditHistory.edited_at.desc()).all())
+    db.close()
+    assert response.content == expected
+
+def test_fast_json_timezone_matches_pydantic():
+    from datetime import datetime, timezone
+    from database.fast_json import dumps
+    value = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    assert dumps([value]) == TypeAdapter(List[datetime]).dump_json([value])
@@ -0,0 +1,96 @@
+# tests/test_history_listener.py
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from main import app
+from database import Base, engine, SessionLocal
+from database.history_listener import CREATED_FIELD, DELETED_FIELD
+from models.program import Program
+from models.edit_history import EditHistory
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _history(table_name, record_id):
+    db = SessionLocal()
+    rows = db.query(EditHistory).filter(EditHistory.table_name == table_name, EditHistory.record_id == record_id).order_by(EditHistory.id).all()
+    db.close()
+    return rows
+
+def test_insert_update_delete_are_recorded():
+    response = client.post("/programs/", json={
+        "program_name": "History Program",
+        "program_code": "HIS01",
+        "program_manager": "Manager H",
+    })
+    program_id = response.json()["id"]
+    response = client.post("/ledger_transactions/", json={
+        "program_id": program_id,
+        "vendor_name": "History Vendor",
+        "expense_description": "History row",
+        "planned_amount": "12.50",
+    })
+    transaction_id = response.json()["id"]
+    client.put(f"/ledger_transactions/{transaction_id}", json={"vendor_name": "Renamed Vendor", "notes": "n"})
+    client.delete(f"/ledger_transactions/{transaction_id}")
+
+    rows = _history("ledger_transactions", transaction_id)
+    assert rows[0].field_changed == CREATED_FIELD
+    assert {r.field_changed for r in rows[1:4]} == {"vendor_name", "vendor_id", "notes"}
+    assert rows[4].field_changed == DELETED_FIELD
+    created = json.loads(rows[0].new_value)
+    assert created["vendor_name"] == "History Vendor"
+    assert created["planned_amount"] == "12.50"
+    deleted = json.loads(rows[-1].old_value)
+    assert deleted["vendor_name"] == "Renamed Vendor"
+    assert rows[-1].new_value is None
+
+def test_bulk_edit_writes_one_history_insert_per_flush():
+    db = SessionLocal()
+    programs = [Program(program_name=f"Batch {i}", program_code=f"BAT{i:02d}", program_manager="M") for i in range(20)]
+    db.add_all(programs)
+    db.commit()
+    for program in programs:
+        program.program_manager = "Batch Manager"
+        program.program_status = "Closed"
+
+    history_inserts = []
+
+    def count_history_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO edit_history"):
+            history_inserts.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_history_inserts)
+    try:
+        db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_history_inserts)
+    ids = [p.id for p in programs]
+    db.close()
+
+    assert len(history_inserts) == 1
+    for program_id in ids:
+        fields = {r.field_changed for r in _history("programs", program_id)}
+        assert {"program_manager", "program_status"} <= fields
+
+def test_bulk_ingest_records_created_rows():
+    response = client.post("/programs/", json={
+        "program_name": "Bulk History Program",
+        "program_code": "HIS02",
+        "program_manager": "Manager H",
+    })
+    program_id = response.json()["id"]
+    rows = [{"program_id": program_id, "vendor_name": "V", "expense_description": f"Bulk {i}"} for i in range(3)]
+    assert client.post("/ledger_transactions/bulk/", json=rows).json()["inserted"] == 3
+    created = client.get("/ledger_transactions/", params={"program_id": program_id}).json()
+    for tx in created:
+        # SQLite may reuse the id of the row deleted above, so look at the latest entry only.
+        latest = _history("ledger_transactions", tx["id"])[-1]
+        assert latest.field_changed == CREATED_FIELD
+        assert json.loads(latest.new_value)["expense_description"] == tx["expense_description"]
@@ -0,0 +1,95 @@
+# tests/test_history_timeline.py
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+from database import history_archive
+from database.history_archive import archive_history
+from database.query_tracing import assert_max_queries
+
+client = TestClient(app)
+
+ids = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db(tmp_path_factory):
+    Base.metadata.create_all(bind=engine)
+    original, history_archive.ARCHIVE_DIR = history_archive.ARCHIVE_DIR, str(tmp_path_factory.mktemp("timeline_archive"))
+    yield
+    history_archive.ARCHIVE_DIR = original
+    Base.metadata.drop_all(bind=engine)
+
+def _as_of(timestamp, table_name="ledger_transactions", record_id=None):
+    return client.get(f"/edit_history/record/{table_name}/{record_id or ids['transaction']}/as_of/",
+                      params={"timestamp": timestamp.isoformat()})
+
+def test_seed_record_history():
+    ids["program"] = client.post("/programs/", json={
+        "program_name": "Timeline Program",
+        "program_code": "TL001",
+        "program_manager": "Manager T",
+    }).json()["id"]
+    ids["transaction"] = client.post("/ledger_transactions/", json={
+        "program_id": ids["program"],
+        "vendor_name": "Acme Corp",
+        "expense_description": "Audited purchase",
+        "planned_date": "2024-04-01",
+        "planned_amount": "100.00",
+    }).json()["id"]
+    client.put(f"/ledger_transactions/{ids['transaction']}", json={"planned_amount": "250.50", "planned_date": "2024-05-01"})
+    client.put(f"/ledger_transactions/{ids['transaction']}", json={"vendor_name": "GlobalTech"})
+    client.delete(f"/ledger_transactions/{ids['transaction']}")
+
+def test_record_timeline_is_chronological():
+    response = client.get(f"/edit_history/record/ledger_transactions/{ids['transaction']}/")
+    assert response.status_code == 200
+    timeline = response.json()
+    assert [e["field_changed"] for e in timeline][0] == "__created__"
+    assert [e["field_changed"] for e in timeline][-1] == "__deleted__"
+    assert {e["field_changed"] for e in timeline[1:-1]} == {"planned_amount", "planned_date", "vendor_name", "vendor_id"}
+    ids["moments"] = [datetime.fromisoformat(e["edited_at"]) for e in timeline]
+
+def test_state_as_of_each_point():
+    created, *_, vendor_changed, deleted = ids["moments"]
+    before = _as_of(created - timedelta(microseconds=1)).json()
+    assert before["exists"] is False and before["state"] is None
+
+    first = _as_of(created).json()
+    assert first["exists"] is True
+    assert first["state"]["planned_amount"] == "100.00"
+    assert first["state"]["planned_date"] == "2024-04-01"
+    assert first["state"]["vendor_name"] == "Acme Corp"
+    assert first["state"]["expense_description"] == "Audited purchase"
+
+    before_vendor = _as_of(vendor_changed - timedelta(microseconds=1)).json()
+    assert before_vendor["state"]["planned_amount"] == "250.50"
+    assert before_vendor["state"]["vendor_name"] == "Acme Corp"
+
+    last = _as_of(vendor_changed).json()
+    assert last["state"]["vendor_name"] == "GlobalTech"
+    assert last["state"]["planned_date"] == "2024-05-01"
+    assert last["changes_undone"] == 1
+
+    assert _as_of(deleted).json()["exists"] is False
+
+def test_state_of_live_record_costs_two_statements():
+    client.put(f"/programs/{ids['program']}", json={"program_manager": "Manager U"})
+    with assert_max_queries(2):
+        response = _as_of(datetime(2000, 1, 1), table_name="programs", record_id=ids["program"])
+    assert response.json()["exists"] is False
+    now = _as_of(datetime.utcnow() + timedelta(days=1), table_name="programs", record_id=ids["program"]).json()
+    assert now["state"]["program_manager"] == "Manager U" and now["changes_undone"] == 0
+
+def test_reconstruction_reads_archived_history():
+    expected = _as_of(ids["moments"][1]).json()
+    archive_history(engine, datetime.utcnow() + timedelta(days=1))
+    assert client.get(f"/edit_history/record/ledger_transactions/{ids['transaction']}/").json() == []
+    archived = client.get(f"/edit_history/record/ledger_transactions/{ids['transaction']}/",
+                          params={"include_archived": "true"}).json()
+    assert [datetime.fromisoformat(e["edited_at"]) for e in archived] == ids["moments"]
+    assert _as_of(ids["moments"][1]).json()["state"] == expected["state"]
+
+def test_unknown_table_and_record():
+    assert client.get("/edit_history/record/edit_history/1/").status_code == 400
+    assert _as_of(datetime(2024, 1, 1), record_id=999999).status_code == 404
@@ -0,0 +1,110 @@
+# tests/test_ledger_bulk_edit.py
+from datetime import date, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, SessionLocal, engine
+from database.query_tracing import assert_max_queries
+from database.rollup import verify_rollup
+
+client = TestClient(app)
+
+ids = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _ledger(**params):
+    return {t["id"]: t for t in client.get("/ledger_transactions/", params={"program_id": ids["program"], **params}).json()}
+
+def _history(record_id):
+    return client.get(f"/edit_history/record/ledger_transactions/{record_id}/").json()
+
+def test_seed_ledger():
+    ids["program"] = client.post("/programs/", json={
+        "program_name": "Bulk Edit Program",
+        "program_code": "BE001",
+        "program_manager": "Manager B",
+    }).json()["id"]
+    ids["category"] = client.post("/wbs_categories/", json={"program_id": ids["program"], "category_name": "Bulk WBS"}).json()["id"]
+    ids["subcategory"] = client.post("/wbs_subcategories/", json={"category_id": ids["category"], "subcategory_name": "Bulk Sub"}).json()["id"]
+    rows = [{
+        "program_id": ids["program"],
+        "vendor_name": "Acme Corp" if i % 2 else "GlobalTech",
+        "expense_description": f"Bulk line {i}",
+        "planned_date": f"2024-03-{10 + i % 15}",
+        "planned_amount": f"{100 + i}.00",
+        **({"actual_date": "2024-03-05", "actual_amount": "90.00"} if i % 5 == 0 else {}),
+    } for i in range(30)]
+    assert client.post("/ledger_transactions/bulk/", json=rows).json()["inserted"] == 30
+    ids["rows"] = sorted(_ledger())
+
+def test_bulk_update_by_ids():
+    chosen = ids["rows"][:4]
+    response = client.patch("/ledger_transactions/bulk/", json={
+        "ids": chosen + [999999],
+        "changes": {"wbs_category_id": ids["category"], "wbs_subcategory_id": ids["subcategory"]},
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert result["matched"] == 4 and result["updated"] == 4
+    assert [t["id"] for t in result["items"]] == chosen
+    assert all(t["wbs_subcategory_id"] == ids["subcategory"] for t in _ledger(wbs_category_id=ids["category"]).values())
+    assert {e["field_changed"] for e in _history(chosen[0])} == {"__created__", "wbs_category_id", "wbs_subcategory_id"}
+
+def test_bulk_shift_dates_by_filter():
+    before = _ledger(vendor_name="Acme Corp")
+    result = client.patch("/ledger_transactions/bulk/", params={"program_id": ids["program"], "vendor_name": "Acme Corp"},
+                          json={"shift_days": {"planned_date": 30}, "changes": {"notes": "Slipped a month"}}).json()
+    assert result["matched"] == len(before) == 15
+    after = _ledger(vendor_name="Acme Corp")
+    for record_id, row in before.items():
+        assert after[record_id]["planned_date"] == (date.fromisoformat(row["planned_date"]) + timedelta(days=30)).isoformat()
+        assert after[record_id]["notes"] == "Slipped a month"
+    planned = [e for e in _history(next(iter(before))) if e["field_changed"] == "planned_date"]
+    assert planned[0]["new_value"][:7] == "2024-04"
+    # The rollup moved the planned amounts with the dates.
+    with SessionLocal() as db:
+        assert verify_rollup(db.connection(), ids["program"]) == []
+    cash_flow = client.get("/dashboard/summary/", params={"program_id": ids["program"], "as_of_date": "2024-03-31"}).json()["monthly_cash_flow"]
+    assert cash_flow["2024-04"]["planned"] == pytest.approx(sum(float(r["planned_amount"]) for r in before.values()))
+
+def test_bulk_update_is_set_based():
+    # Read the rows, one UPDATE per 500 ids, one rollup upsert, one history insert per 500 changes.
+    with assert_max_queries(4):
+        result = client.patch("/ledger_transactions/bulk/", params={"program_id": ids["program"]},
+                              json={"changes": {"invoice_number": "INV-42"}}).json()
+    assert result["updated"] == 30
+
+def test_bulk_update_rejects_bad_requests():
+    assert client.patch("/ledger_transactions/bulk/", json={"changes": {"notes": "everything"}}).status_code == 400
+    assert client.patch("/ledger_transactions/bulk/", json={"ids": ids["rows"][:1]}).status_code == 400
+    assert client.patch("/ledger_transactions/bulk/", json={"ids": ids["rows"][:1], "shift_days": {"created_at": 1}}).status_code == 400
+    assert client.patch("/ledger_transactions/bulk/", json={"ids": ids["rows"][:1], "changes": {"wbs_category_id": 999999}}).status_code == 400
+    assert client.patch("/ledger_transactions/bulk/", json={"ids": ids["rows"][:1], "changes": {"baseline_amount": "abc"}}).status_code == 422
+
+def test_bulk_delete_by_filter_and_ids():
+    summary_before = client.get("/dashboard/summary/", params={"program_id": ids["program"], "as_of_date": "2024-12-31"}).json()
+    doomed = _ledger(vendor_name="GlobalTech")
+    response = client.request("DELETE", "/ledger_transactions/bulk/", params={"program_id": ids["program"], "vendor_name": "GlobalTech"})
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 15, "ids": sorted(doomed)}
+    assert set(_ledger()) == set(ids["rows"]) - set(doomed)
+    assert _history(next(iter(doomed)))[-1]["field_changed"] == "__deleted__"
+
+    kept = sorted(_ledger())
+    result = client.request("DELETE", "/ledger_transactions/bulk/", json={"ids": kept[:2]}).json()
+    assert result["deleted"] == 2
+    # The cached summary was invalidated and the rollup stays in step with the ledger.
+    summary = client.get("/dashboard/summary/", params={"program_id": ids["program"], "as_of_date": "2024-12-31"}).json()
+    remaining = _ledger()
+    assert summary["planned_to_date"] == pytest.approx(sum(float(r["planned_amount"]) for r in remaining.values()))
+    assert summary["planned_to_date"] < summary_before["planned_to_date"]
+    with SessionLocal() as db:
+        assert verify_rollup(db.connection(), ids["program"]) == []
+
+def test_bulk_delete_requires_a_selection():
+    assert client.request("DELETE", "/ledger_transactions/bulk/").status_code == 400
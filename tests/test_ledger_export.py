@@ -0,0 +1,103 @@
+# tests/test_ledger_export.py
+import csv
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+from database.ledger_export import stream_csv
+from database.ledger_filters import LedgerFilters
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+ids = {}
+
+def test_seed_export_data():
+    response = client.post("/programs/", json={
+        "program_name": "Export Program",
+        "program_code": "EXP01",
+        "program_manager": "Manager E",
+    })
+    ids["program_id"] = response.json()["id"]
+    rows = [{
+        "program_id": ids["program_id"],
+        "vendor_name": f"Vendor {i % 3}",
+        "expense_description": f"Export row {i}",
+        "planned_date": f"2024-0{1 + i % 9}-01",
+        "planned_amount": f"{i}.25",
+    } for i in range(25)]
+    assert client.post("/ledger_transactions/bulk/", json=rows).json()["inserted"] == 25
+
+def test_export_csv():
+    response = client.get("/ledger_transactions/export/", params={"program_id": ids["program_id"], "format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 25
+    assert rows[3]["planned_amount"] == "3.25"
+    assert rows[3]["planned_date"] == "2024-04-01"
+
+def test_export_ndjson_with_date_filter():
+    response = client.get("/ledger_transactions/export/", params={
+        "program_id": ids["program_id"],
+        "format": "ndjson",
+        "planned_date_from": "2024-09-01",
+    })
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["expense_description"] for r in rows] == ["Export row 8", "Export row 17"]
+    assert rows[0]["planned_amount"] == "8.25"
+
+def test_export_parquet():
+    pq = pytest.importorskip("pyarrow.parquet")
+    import pyarrow as pa
+    response = client.get("/ledger_transactions/export/", params={"program_id": ids["program_id"], "format": "parquet"})
+    assert response.status_code == 200
+    table = pq.read_table(pa.BufferReader(response.content))
+    assert table.num_rows == 25
+    assert str(table.column("planned_amount")[1]) == "1.25"
+
+def test_export_arrow():
+    pa = pytest.importorskip("pyarrow")
+    response = client.get("/ledger_transactions/export/", params={"program_id": ids["program_id"], "format": "arrow"})
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 25
+    assert str(table.column("planned_amount")[1]) == "1.25"
+    assert str(table.schema.field("planned_date").type) == "date32[day]"
+
+def test_list_in_columnar_formats():
+    params = {"program_id": ids["program_id"], "limit": 5}
+    rows = client.get("/ledger_transactions/", params=params).json()
+    columns = client.get("/ledger_transactions/", params={**params, "format": "columns"}).json()
+    assert list(columns) == list(rows[0])
+    assert columns["expense_description"] == [r["expense_description"] for r in rows]
+    assert columns["planned_amount"] == [r["planned_amount"] for r in rows]
+    assert client.get("/ledger_transactions/", params={**params, "format": "columns", "vendor_name": "Nobody"}).json()["id"] == []
+    assert client.get("/ledger_transactions/", params={**params, "format": "xml"}).status_code == 400
+
+    pa = pytest.importorskip("pyarrow")
+    response = client.get("/ledger_transactions/", params={**params, "format": "arrow"})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == list(rows[0])
+    assert table.column("id").to_pylist() == [r["id"] for r in rows]
+
+def test_export_is_batched():
+    filters = LedgerFilters(program_id=ids["program_id"], sort_by="id", sort_order="asc")
+    for name in ("wbs_category_id", "wbs_subcategory_id", "vendor_name", "baseline_date_from", "baseline_date_to",
+                 "planned_date_from", "planned_date_to", "actual_date_from", "actual_date_to"):
+        setattr(filters, name, None)
+    chunks = list(stream_csv(filters, batch_size=10))
+    # header + three batches of 10, 10 and 5 rows
+    assert len(chunks) == 3
+    assert chunks[0].decode().count("\n") == 11
+
+def test_export_invalid_format():
+    response = client.get("/ledger_transactions/export/", params={"format": "xlsx"})
+    assert response.status_code == 400
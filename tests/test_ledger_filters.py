@@ -0,0 +1,108 @@
+# tests/test_ledger_filters.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from main import app
+from database import Base, engine
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+ids = {}
+
+def _create_transaction(**overrides):
+    payload = {
+        "program_id": ids["program_a"],
+        "vendor_name": "Acme Corp",
+        "expense_description": "Filter test",
+        "planned_date": "2024-01-15",
+        "planned_amount": "100.00",
+    }
+    payload.update(overrides)
+    response = client.post("/ledger_transactions/", json=payload)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_seed_filter_data():
+    for key, code in (("program_a", "FLT-A"), ("program_b", "FLT-B")):
+        response = client.post("/programs/", json={
+            "program_name": f"Filter Program {code}",
+            "program_code": code,
+            "program_manager": "Manager F",
+        })
+        assert response.status_code == 200
+        ids[key] = response.json()["id"]
+
+    response = client.post("/wbs_categories/", json={"program_id": ids["program_a"], "category_name": "Filter Category"})
+    ids["category"] = response.json()["id"]
+
+    ids["tx1"] = _create_transaction(wbs_category_id=ids["category"], actual_date="2024-02-01", actual_amount="90.00")
+    ids["tx2"] = _create_transaction(vendor_name="GlobalTech", planned_date="2024-03-15", planned_amount="50.00")
+    ids["tx3"] = _create_transaction(program_id=ids["program_b"], planned_date="2024-02-15")
+
+def test_filter_by_program():
+    response = client.get("/ledger_transactions/", params={"program_id": ids["program_a"]})
+    assert response.status_code == 200
+    assert [tx["id"] for tx in response.json()] == [ids["tx1"], ids["tx2"]]
+
+def test_filter_by_category_and_vendor():
+    response = client.get("/ledger_transactions/", params={"wbs_category_id": ids["category"]})
+    assert [tx["id"] for tx in response.json()] == [ids["tx1"]]
+
+    response = client.get("/ledger_transactions/", params={"program_id": ids["program_a"], "vendor_name": "GlobalTech"})
+    assert [tx["id"] for tx in response.json()] == [ids["tx2"]]
+
+def test_filter_by_date_range():
+    response = client.get("/ledger_transactions/", params={
+        "planned_date_from": "2024-02-01",
+        "planned_date_to": "2024-03-31",
+    })
+    assert [tx["id"] for tx in response.json()] == [ids["tx2"], ids["tx3"]]
+
+    response = client.get("/ledger_transactions/", params={"actual_date_to": "2024-02-01"})
+    assert [tx["id"] for tx in response.json()] == [ids["tx1"]]
+
+def test_sort_keys():
+    response = client.get("/ledger_transactions/", params={
+        "program_id": ids["program_a"],
+        "sort_by": "planned_amount",
+        "sort_order": "asc",
+    })
+    assert [tx["id"] for tx in response.json()] == [ids["tx2"], ids["tx1"]]
+
+def test_sort_by_vendor_name_joins_vendors():
+    for order, expected in (("asc", [ids["tx1"], ids["tx2"]]), ("desc", [ids["tx2"], ids["tx1"]])):
+        response = client.get("/ledger_transactions/", params={
+            "program_id": ids["program_a"],
+            "sort_by": "vendor_name",
+            "sort_order": order,
+        })
+        assert [tx["id"] for tx in response.json()] == expected
+        assert [tx["vendor_name"] for tx in response.json()] == sorted(["Acme Corp", "GlobalTech"], reverse=order == "desc")
+
+def test_invalid_sort_key():
+    response = client.get("/ledger_transactions/", params={"sort_by": "notes"})
+    assert response.status_code == 400
+
+def test_program_filter_uses_index():
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM ledger_transactions "
+            "WHERE program_id = 1 AND planned_date >= '2024-01-01' ORDER BY planned_date, id"
+        )).fetchall()
+    detail = " ".join(row[-1] for row in plan)
+    assert "USING INDEX ix_ledger_program_planned_date" in detail
+
+@pytest.mark.parametrize("where, index", [
+    ("wbs_subcategory_id = 1", "ix_ledger_wbs_subcategory"),
+    ("actual_date BETWEEN '2024-01-01' AND '2024-03-31'", "ix_ledger_actual_date"),
+])
+def test_unscoped_filters_use_an_index(where, index):
+    with engine.connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN SELECT * FROM ledger_transactions WHERE {where}")).fetchall()
+    assert f"USING INDEX {index}" in " ".join(row[-1] for row in plan)
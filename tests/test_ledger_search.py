@@ -0,0 +1,120 @@
+# tests/test_ledger_search.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from main import app
+from database import Base, engine
+from database import ledger_search
+from database.ledger_search import SEARCH_TABLE, ensure_search_index
+from database.query_tracing import assert_max_queries
+
+client = TestClient(app)
+
+ids = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _search(q, **params):
+    response = client.get("/ledger_transactions/search/", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def _hit_ids(q, **params):
+    return [hit["id"] for hit in _search(q, **params)]
+
+def test_seed_ledger():
+    for key, code in (("alpha", "FTS01"), ("beta", "FTS02")):
+        ids[key] = client.post("/programs/", json={
+            "program_name": f"Search Program {code}",
+            "program_code": code,
+            "program_manager": "Manager F",
+        }).json()["id"]
+    rows = [
+        {"vendor_name": "Acme Corp", "expense_description": "Titanium fasteners for the airframe", "invoice_number": "INV-1001"},
+        {"vendor_name": "GlobalTech", "expense_description": "Avionics firmware license", "notes": "Renewal covers titanium test rig software"},
+        {"vendor_name": "Acme Corp", "expense_description": "Composite panels", "notes": "Café delivery delayed"},
+        {"vendor_name": "Initech", "expense_description": "Titanium titanium titanium sheet stock"},
+    ]
+    for row in rows:
+        ids.setdefault("alpha_rows", []).append(client.post("/ledger_transactions/", json={"program_id": ids["alpha"], **row}).json()["id"])
+    client.post("/ledger_transactions/bulk/", json=[
+        {"program_id": ids["beta"], "vendor_name": "Acme Corp", "expense_description": f"Titanium order {i}"} for i in range(5)
+    ])
+
+def test_search_matches_all_columns_and_prefixes():
+    assert set(_hit_ids("titanium")) >= {ids["alpha_rows"][0], ids["alpha_rows"][1], ids["alpha_rows"][3]}
+    assert _hit_ids("glob", program_id=ids["alpha"]) == [ids["alpha_rows"][1]]
+    assert _hit_ids("INV-1001") == [ids["alpha_rows"][0]]
+    # Every word must match; accents are ignored.
+    assert _hit_ids("acme cafe") == [ids["alpha_rows"][2]]
+    assert _hit_ids("acme titan", program_id=ids["alpha"]) == [ids["alpha_rows"][0]]
+
+def test_search_ranks_and_filters():
+    hits = _search("titanium", program_id=ids["alpha"])
+    assert {h["program_id"] for h in hits} == {ids["alpha"]}
+    assert hits[0]["id"] == ids["alpha_rows"][3]
+    assert [h["rank"] for h in hits] == sorted((h["rank"] for h in hits), reverse=True)
+    assert len(_search("titanium", program_id=ids["beta"], limit=2)) == 2
+    assert len(_search("titanium", vendor_name="Acme Corp")) == 6
+
+def test_search_reports_when_only_the_newest_matches_are_ranked(monkeypatch):
+    response = client.get("/ledger_transactions/search/", params={"q": "titanium", "program_id": ids["beta"]})
+    assert response.headers["X-Search-Truncated"] == "false" and len(response.json()) == 5
+    newest = sorted(h["id"] for h in response.json())[-2:]
+    monkeypatch.setattr(ledger_search, "RANK_WINDOW", 2)
+    response = client.get("/ledger_transactions/search/", params={"q": "titanium", "program_id": ids["beta"]})
+    assert response.headers["X-Search-Truncated"] == "true"
+    assert sorted(h["id"] for h in response.json()) == newest
+    assert client.get("/ledger_transactions/search/", params={"q": "glob"}).headers["X-Search-Truncated"] == "false"
+
+def test_index_follows_updates_and_deletes():
+    target = ids["alpha_rows"][2]
+    client.put(f"/ledger_transactions/{target}", json={"notes": "Replaced by carbon fibre"})
+    assert _hit_ids("cafe") == []
+    assert _hit_ids("carbon") == [target]
+    client.patch("/ledger_transactions/bulk/", json={"ids": [target], "changes": {"expense_description": "Kevlar panels"}})
+    assert _hit_ids("kevlar") == [target]
+    client.delete(f"/ledger_transactions/{target}")
+    assert _hit_ids("kevlar") == []
+    client.request("DELETE", "/ledger_transactions/bulk/", params={"program_id": ids["beta"]})
+    assert len(_search("titanium")) == 3
+
+def test_vendor_change_is_indexed():
+    target = ids["alpha_rows"][0]
+    client.put(f"/ledger_transactions/{target}", json={"vendor_name": "Umbrella Holdings"})
+    assert _hit_ids("umbrella") == [target]
+    client.patch("/ledger_transactions/bulk/", json={"ids": [target], "changes": {"vendor_name": "Acme Corp"}})
+    assert _hit_ids("umbrella") == []
+    assert target in _hit_ids("acme")
+
+def test_search_is_one_statement():
+    with assert_max_queries(2):
+        _search("titanium", program_id=ids["alpha"])
+
+def test_user_text_is_not_fts_syntax():
+    assert _hit_ids('titanium OR "avionics" NEAR(') == []
+    assert client.get("/ledger_transactions/search/", params={"q": "  -- * "}).status_code == 400
+
+def test_existing_database_is_indexed_on_startup():
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER {SEARCH_TABLE}_{suffix}"))
+    ensure_search_index(engine)
+    assert len(_search("titanium")) == 3
+
+def test_index_on_the_former_vendor_name_column_is_rebuilt():
+    acme = _hit_ids("acme")
+    with engine.begin() as conn:
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER {SEARCH_TABLE}_{suffix}"))
+        conn.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+        conn.execute(text(f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(expense_description, notes, vendor_name, "
+                          f"invoice_number, program_id, content='ledger_transactions', content_rowid='id')"))
+    ensure_search_index(engine)
+    assert len(_search("titanium")) == 3
+    assert _hit_ids("acme") == acme != []
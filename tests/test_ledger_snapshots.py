@@ -0,0 +1,170 @@
+# tests/test_ledger_snapshots.py
+import os
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, SessionLocal, engine
+from database import ledger_snapshots
+from database.ledger_snapshots import ledger_as_known, list_snapshots, take_snapshot
+from database.ledger_sync import ledger_epoch, reset_sync
+from models.ledger_transaction import LedgerTransaction
+
+client = TestClient(app)
+
+ids = {"moments": []}
+
+AS_OF = "2024-05-15"
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db(tmp_path_factory):
+    Base.metadata.create_all(bind=engine)
+    original, ledger_snapshots.SNAPSHOT_DIR = ledger_snapshots.SNAPSHOT_DIR, str(tmp_path_factory.mktemp("ledger_snapshots"))
+    yield
+    ledger_snapshots.SNAPSHOT_DIR = original
+    Base.metadata.drop_all(bind=engine)
+
+def _summary(**params):
+    response = client.get("/dashboard/summary/", params={"program_id": ids["program"], "as_of_date": AS_OF, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def _snapshots():
+    with engine.connect() as conn:
+        return list_snapshots(ids["program"], ledger_epoch(conn))
+
+def _remember_moment():
+    """Record the live summary now, with a knowledge date just after it."""
+    summary = _summary()
+    ids["moments"].append((datetime.now(timezone.utc).replace(tzinfo=None), summary))
+
+def _assert_same(known, live):
+    for key in ("actuals_to_date", "planned_to_date", "etc", "eac"):
+        assert known[key] == pytest.approx(live[key])
+    assert known["monthly_cash_flow"].keys() == live["monthly_cash_flow"].keys()
+    for month, flow in live["monthly_cash_flow"].items():
+        assert known["monthly_cash_flow"][month] == pytest.approx(flow)
+    assert [a["wbs_category_id"] for a in known["variance_alerts"]] == [a["wbs_category_id"] for a in live["variance_alerts"]]
+    assert [a["variance"] for a in known["variance_alerts"]] == pytest.approx([a["variance"] for a in live["variance_alerts"]])
+    assert [v["vendor"] for v in known["top_vendors"]] == [v["vendor"] for v in live["top_vendors"]]
+    assert [v["spend"] for v in known["top_vendors"]] == pytest.approx([v["spend"] for v in live["top_vendors"]])
+
+def test_seed_ledger():
+    for key, code in (("program", "SNAP01"), ("other", "SNAP02")):
+        ids[key] = client.post("/programs/", json={
+            "program_name": f"Snapshot Program {code}",
+            "program_code": code,
+            "program_manager": "Manager S",
+        }).json()["id"]
+    ids["category"] = client.post("/wbs_categories/", json={"program_id": ids["program"], "category_name": "Snapshot WBS"}).json()["id"]
+    rows = [{
+        "program_id": ids["program"],
+        "vendor_name": ["Acme Corp", "GlobalTech", "Initech"][i % 3],
+        "expense_description": f"Snapshot line {i}",
+        "wbs_category_id": ids["category"] if i % 2 else None,
+        "planned_date": f"2024-0{1 + i % 8}-1{i % 10}",
+        "planned_amount": f"{1000 + 137 * i}.25",
+        **({"actual_date": f"2024-0{1 + i % 6}-0{1 + i % 9}", "actual_amount": f"{900 + 151 * i}.50"} if i % 3 else {}),
+    } for i in range(40)]
+    client.post("/ledger_transactions/bulk/", json=rows)
+    ids["transactions"] = [t["id"] for t in client.get("/ledger_transactions/", params={"program_id": ids["program"]}).json()]
+    ids["stranger"] = client.post("/ledger_transactions/", json={
+        "program_id": ids["other"],
+        "vendor_name": "Umbrella",
+        "expense_description": "Belongs elsewhere at first",
+        "planned_date": "2024-03-03",
+        "planned_amount": "5000.00",
+    }).json()["id"]
+    _remember_moment()
+
+def test_snapshot_is_compressed_parquet():
+    import pyarrow.parquet as pq
+
+    path = take_snapshot(engine, ids["program"])
+    assert _snapshots()[-1][2] == path
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_rows == 40
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+
+def test_edits_after_snapshot():
+    transactions = ids["transactions"]
+    client.put(f"/ledger_transactions/{transactions[0]}", json={"actual_date": "2024-04-20", "actual_amount": "777.77"})
+    client.put(f"/ledger_transactions/{transactions[1]}", json={"wbs_category_id": None, "vendor_name": "Hooli"})
+    client.delete(f"/ledger_transactions/{transactions[2]}")
+    _remember_moment()
+    client.post("/ledger_transactions/", json={
+        "program_id": ids["program"],
+        "vendor_name": "Hooli",
+        "expense_description": "Added after the snapshot",
+        "actual_date": "2024-05-10",
+        "actual_amount": "12345.00",
+    })
+    # The API cannot move a row to another program, but the history records it if it happens.
+    with SessionLocal() as db:
+        db.get(LedgerTransaction, ids["stranger"]).program_id = ids["program"]
+        db.get(LedgerTransaction, transactions[3]).program_id = ids["other"]
+        db.commit()
+    client.put(f"/ledger_transactions/{ids['stranger']}", json={"planned_amount": "6000.00"})
+    moved = {t["id"] for t in client.get("/ledger_transactions/", params={"program_id": ids["program"]}).json()}
+    assert ids["stranger"] in moved and transactions[3] not in moved
+    _remember_moment()
+
+def test_knowledge_date_matches_dashboard_at_that_time():
+    for moment, live in ids["moments"]:
+        _assert_same(_summary(knowledge_date=moment.isoformat()), live)
+
+def test_replays_only_history_since_snapshot():
+    snapshot_path = _snapshots()[-1][2]
+    moment = ids["moments"][1][0]
+    with SessionLocal() as db:
+        table, path, replayed = ledger_as_known(db, ids["program"], moment)
+    assert path == snapshot_path
+    # Two field changes on the first update, three on the second (vendor_id follows vendor_name), one delete.
+    assert replayed == 6
+    assert table.num_rows == 39
+
+def test_without_snapshot_undoes_history_from_current_ledger():
+    # Before the first snapshot there is nothing to start from but the current ledger.
+    moment, live = ids["moments"][0]
+    with SessionLocal() as db:
+        _, path, _ = ledger_as_known(db, ids["program"], moment)
+    assert path is None
+    _assert_same(_summary(knowledge_date=moment.isoformat()), live)
+    assert _summary(knowledge_date="2000-01-01")["actuals_to_date"] == 0
+
+def test_reads_only_the_programs_history():
+    moment = ids["moments"][0][0]
+    with SessionLocal() as db:
+        _, _, replayed = ledger_as_known(db, ids["program"], moment)
+    elsewhere = client.post("/ledger_transactions/", json={
+        "program_id": ids["other"], "vendor_name": "Umbrella", "expense_description": "Other program", "planned_amount": "1.00",
+    }).json()
+    client.put(f"/ledger_transactions/{elsewhere['id']}", json={"notes": "edited"})
+    client.delete(f"/ledger_transactions/{elsewhere['id']}")
+    with SessionLocal() as db:
+        _, path, replayed_now = ledger_as_known(db, ids["program"], moment)
+    assert path is None
+    assert replayed_now == replayed
+
+def test_cli_snapshots_and_prunes(capsys):
+    assert ledger_snapshots.main(["--program-id", str(ids["program"]), "--keep", "1"]) == 0
+    assert len(_snapshots()) == 1
+    assert "1 programs snapshotted" in capsys.readouterr().out
+    # The newest snapshot already holds every change, so the live figures need no replay.
+    with SessionLocal() as db:
+        _, _, replayed = ledger_as_known(db, ids["program"], datetime.now(timezone.utc) + timedelta(seconds=1))
+    assert replayed == 0
+    _assert_same(_summary(knowledge_date=(ids["moments"][-1][0] + timedelta(days=1)).isoformat()), ids["moments"][-1][1])
+
+def test_snapshots_of_an_earlier_epoch_are_not_used():
+    directory = os.path.dirname(_snapshots()[0][2])
+    # Reseeding resets the ledger; the snapshots no longer describe it.
+    with engine.begin() as conn:
+        reset_sync(conn)
+    assert _snapshots() == []
+    with SessionLocal() as db:
+        _, path, _ = ledger_as_known(db, ids["program"], datetime.now(timezone.utc))
+    assert path is None
+    # The next snapshot run deletes them.
+    assert ledger_snapshots.main(["--program-id", str(ids["program"]), "--keep", "5"]) == 0
+    assert os.listdir(directory) == [os.path.basename(_snapshots()[0][2])]
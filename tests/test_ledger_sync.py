@@ -0,0 +1,101 @@
+# tests/test_ledger_sync.py
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, SessionLocal, engine
+from database.ledger_sync import main as ledger_sync_main, prune_tombstones
+from models.ledger_transaction import LedgerTransaction
+
+client = TestClient(app)
+
+ids = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _changes(since=None, program="program", status_code=200):
+    params = {"program_id": ids[program]} if program else {}
+    if since is not None:
+        params["since_version"] = since
+    response = client.get("/ledger_transactions/changes/", params=params)
+    assert response.status_code == status_code
+    return response.json()
+
+def _row(description, program="program"):
+    return {"program_id": ids[program], "vendor_name": "Sync Vendor", "expense_description": description, "planned_amount": "10.00"}
+
+def test_seed_ledger():
+    for key, code in (("program", "SYNC01"), ("other", "SYNC02")):
+        ids[key] = client.post("/programs/", json={
+            "program_name": f"Sync Program {code}",
+            "program_code": code,
+            "program_manager": "Manager S",
+        }).json()["id"]
+    client.post("/ledger_transactions/bulk/", json=[_row(f"Line {i}") for i in range(5)])
+    client.post("/ledger_transactions/", json=_row("Elsewhere", program="other"))
+    full = _changes()
+    assert len(full["items"]) == 5 and full["deleted"] == []
+    # One transaction, one version; the other program's insert came after it.
+    assert {t["row_version"] for t in full["items"]} == {full["version"] - 1}
+    ids["rows"] = [t["id"] for t in full["items"]]
+    ids["version"] = full["version"]
+
+def test_delta_has_only_writes_and_deletes_since_version():
+    rows, since = ids["rows"], ids["version"]
+    assert _changes(since) == {"version": since, "items": [], "deleted": []}
+    created = client.post("/ledger_transactions/", json=_row("Added")).json()
+    client.put(f"/ledger_transactions/{rows[0]}", json={"notes": "edited"})
+    client.delete(f"/ledger_transactions/{rows[1]}")
+    delta = _changes(since)
+    assert [t["id"] for t in delta["items"]] == [created["id"], rows[0]]
+    assert delta["items"][1]["notes"] == "edited"
+    assert delta["deleted"] == [rows[1]]
+    assert delta["version"] == since + 3
+    # Another client that synced halfway only sees the later changes.
+    assert [t["id"] for t in _changes(since + 1)["items"]] == [rows[0]]
+    assert _changes(delta["version"])["items"] == []
+    ids["version"] = delta["version"]
+
+def test_bulk_edits_are_versioned():
+    rows, since = ids["rows"], ids["version"]
+    client.patch("/ledger_transactions/bulk/", json={"ids": rows[2:4], "changes": {"invoice_number": "INV-S"}})
+    client.request("DELETE", "/ledger_transactions/bulk/", json={"ids": rows[4:]})
+    delta = _changes(since)
+    assert [t["id"] for t in delta["items"]] == rows[2:4]
+    assert delta["deleted"] == rows[4:]
+    # Version bookkeeping stays out of the audit trail.
+    history = client.get(f"/edit_history/record/ledger_transactions/{rows[2]}/").json()
+    assert "row_version" not in {e["field_changed"] for e in history}
+    # A row the bulk edit leaves as it was keeps its version and is not sent again.
+    edited = client.patch("/ledger_transactions/bulk/", json={"ids": [rows[0], rows[2]], "changes": {"invoice_number": "INV-S"}}).json()
+    assert edited["updated"] == 1
+    again = _changes(delta["version"])
+    assert [t["id"] for t in again["items"]] == [rows[0]]
+    ids["version"] = again["version"]
+
+def test_row_moved_between_programs():
+    since = ids["version"]
+    moved = ids["rows"][2]
+    with SessionLocal() as db:
+        db.get(LedgerTransaction, moved).program_id = ids["other"]
+        db.commit()
+    assert _changes(since)["deleted"] == [moved]
+    assert [t["id"] for t in _changes(since, program="other")["items"]] == [moved]
+    unscoped = _changes(since, program=None)
+    assert [t["id"] for t in unscoped["items"]] == [moved] and unscoped["deleted"] == []
+
+def test_expired_versions_must_reload():
+    latest = _changes()["version"]
+    _changes(latest + 1, status_code=410)
+    with engine.begin() as conn:
+        assert prune_tombstones(conn, datetime.utcnow() + timedelta(days=1)) > 0
+    assert "reload" in _changes(ids["version"], status_code=410)["detail"]
+    assert _changes(latest)["items"] == []
+
+def test_cli_prunes(capsys):
+    assert ledger_sync_main(["prune", "--days", "0"]) == 0
+    assert "0 tombstones pruned" in capsys.readouterr().out
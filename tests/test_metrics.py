@@ -0,0 +1,77 @@
+# tests/test_metrics.py
+import re
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+from metrics import Histogram, request_metrics
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    request_metrics.reset()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _sample(body: str, name: str, **labels) -> float:
+    """Value of the sample ``name`` whose labels include ``labels``."""
+    for line in body.splitlines():
+        if not line.startswith(name + "{") and not line.startswith(name + " "):
+            continue
+        if all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No sample {name} {labels} in metrics output")
+
+def test_metrics_endpoint_format():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE lre_http_request_duration_seconds histogram" in response.text
+    assert "# TYPE lre_http_requests_in_progress gauge" in response.text
+
+def test_requests_recorded_by_route_template():
+    program_id = client.post("/programs/", json={
+        "program_name": "Metrics Program",
+        "program_code": "MET001",
+        "program_manager": "Manager M",
+    }).json()["id"]
+    client.put(f"/programs/{program_id}", json={"program_manager": "Manager N"})
+    client.put("/programs/999999", json={"program_manager": "Nobody"})
+    client.get("/no/such/route")
+
+    body = client.get("/metrics").text
+    assert _sample(body, "lre_http_requests_total", method="POST", route="/programs/", status="200") == 1
+    assert _sample(body, "lre_http_requests_total", method="PUT", route="/programs/{program_id}", status="200") == 1
+    assert _sample(body, "lre_http_requests_total", method="PUT", route="/programs/{program_id}", status="404") == 1
+    assert _sample(body, "lre_http_requests_total", method="GET", route="unmatched", status="404") == 1
+    # No per-id series
+    assert f"/programs/{program_id}\"" not in body
+    assert _sample(body, "lre_http_request_duration_seconds_count", method="PUT", route="/programs/{program_id}") == 2
+    assert _sample(body, "lre_http_request_duration_seconds_bucket", method="PUT", route="/programs/{program_id}", le="+Inf") == 2
+
+def test_db_time_and_response_size_recorded():
+    client.get("/programs/")
+    body = client.get("/metrics").text
+    # The sync endpoint runs in the threadpool; its statements are still attributed to the request.
+    assert _sample(body, "lre_http_request_db_statements_total", method="GET", route="/programs/") >= 1
+    assert _sample(body, "lre_http_request_db_seconds_sum", method="GET", route="/programs/") > 0
+    assert _sample(body, "lre_http_response_size_bytes_sum", method="GET", route="/programs/") > 0
+    assert _sample(body, "lre_http_requests_in_progress") == 1  # the /metrics request itself
+
+def test_async_route_db_time_recorded():
+    client.get("/async/programs/")
+    body = client.get("/metrics").text
+    assert _sample(body, "lre_http_request_db_statements_total", method="GET", route="/async/programs/") >= 1
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", (0.1, 1.0), ("route",))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("/x",), value)
+    lines = list(histogram.render())
+    assert 'test_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{route="/x"} 4' in lines
+    assert re.search(r'test_seconds_sum\{route="/x"\} 3\.65', "\n".join(lines))
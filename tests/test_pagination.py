@@ -0,0 +1,85 @@
+# tests/test_pagination.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from main import app
+from database import Base, engine
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+ids = {"transactions": []}
+
+def test_seed_pagination_data():
+    response = client.post("/programs/", json={
+        "program_name": "Paging Program",
+        "program_code": "PG001",
+        "program_manager": "Manager P",
+    })
+    ids["program_id"] = response.json()["id"]
+    for i in range(7):
+        response = client.post("/ledger_transactions/", json={
+            "program_id": ids["program_id"],
+            "vendor_name": "Paging Vendor",
+            "expense_description": f"Row {i}",
+        })
+        ids["transactions"].append(response.json()["id"])
+    # Each rename writes one edit history row.
+    for i in range(5):
+        client.put(f"/programs/{ids['program_id']}", json={"program_manager": f"Manager {i}"})
+
+def _walk(url, **params):
+    pages, cursor = [], None
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_ledger_keyset_pages():
+    pages = _walk("/ledger_transactions/page/", program_id=ids["program_id"], limit=3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [tx["id"] for p in pages for tx in p] == ids["transactions"]
+
+def test_ledger_keyset_descending():
+    pages = _walk("/ledger_transactions/page/", program_id=ids["program_id"], limit=4, sort_order="desc")
+    assert [tx["id"] for p in pages for tx in p] == list(reversed(ids["transactions"]))
+
+def test_ledger_keyset_rejects_other_sorts():
+    response = client.get("/ledger_transactions/page/", params={"sort_by": "planned_date"})
+    assert response.status_code == 400
+
+def test_ledger_page_size_is_bounded():
+    response = client.get("/ledger_transactions/page/", params={"limit": 100000})
+    assert response.status_code == 422
+
+def test_edit_history_keyset_pages():
+    pages = _walk("/edit_history/page/", limit=2)
+    rows = [h for p in pages for h in p]
+    offset_rows = client.get("/edit_history/").json()
+    assert [h["id"] for h in rows] == [h["id"] for h in offset_rows]
+    assert len(rows) >= 5
+
+def test_invalid_cursor():
+    response = client.get("/edit_history/page/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_edit_history_cursor_uses_index():
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM edit_history "
+            "WHERE (edited_at, id) < ('2025-01-01 00:00:00', 10) ORDER BY edited_at DESC, id DESC LIMIT 100"
+        )).fetchall()
+    detail = " ".join(row[-1] for row in plan)
+    assert "ix_edit_history_edited_at_id" in detail
+    assert "TEMP B-TREE" not in detail
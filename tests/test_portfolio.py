@@ -0,0 +1,112 @@
+# tests/test_portfolio.py
+import random
+from datetime import date, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from sqlalchemy import event
+from database import Base, engine, SessionLocal
+from database.dashboard import compute_portfolio_summary
+from database.query_tracing import assert_max_queries
+
+client = TestClient(app)
+
+ids = {"programs": [], "categories": {}}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_seed_portfolio_data():
+    rng = random.Random(11)
+    start = date(2024, 1, 1)
+    for p in range(4):
+        program_id = client.post("/programs/", json={
+            "program_name": f"Portfolio Program {p}",
+            "program_code": f"PF00{p}",
+            "program_manager": "Manager P",
+            "program_status": "Closed" if p == 3 else "Active",
+        }).json()["id"]
+        ids["programs"].append(program_id)
+        categories = [client.post("/wbs_categories/", json={"program_id": program_id, "category_name": f"PF{p} WBS {c}"}).json()["id"]
+                      for c in range(3)]
+        ids["categories"][program_id] = categories
+        rows = []
+        for i in range(80):
+            planned = start + timedelta(days=rng.randint(0, 250))
+            row = {
+                "program_id": program_id,
+                "vendor_name": rng.choice(["Acme Corp", "GlobalTech"]),
+                "expense_description": f"Portfolio line {i}",
+                "wbs_category_id": rng.choice(categories + [None]),
+                "planned_date": planned.isoformat(),
+                "planned_amount": f"{rng.randint(1000, 900000) / 100:.2f}",
+            }
+            if rng.random() < 0.6:
+                row["actual_date"] = (planned + timedelta(days=rng.randint(-5, 30))).isoformat()
+                row["actual_amount"] = f"{rng.randint(1000, 900000) / 100:.2f}"
+            rows.append(row)
+        assert client.post("/ledger_transactions/bulk/", json=rows).json()["inserted"] == len(rows)
+
+def test_portfolio_matches_program_dashboards():
+    response = client.get("/dashboard/portfolio/", params={"as_of_date": "2024-05-15"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["program_id"] for p in data["programs"]] == ids["programs"]
+    for entry in data["programs"]:
+        summary = client.get("/dashboard/summary/", params={"program_id": entry["program_id"], "as_of_date": "2024-05-15"}).json()
+        for key in ("actuals_to_date", "planned_to_date", "etc", "eac"):
+            assert entry[key] == pytest.approx(summary[key])
+        assert entry["variance_alert_count"] == len(summary["variance_alerts"])
+        largest = sorted(summary["variance_alerts"], key=lambda v: -v["variance"])[:3]
+        assert [v["wbs_category_id"] for v in entry["top_variances"]][:len(largest)] == [v["wbs_category_id"] for v in largest]
+    assert data["eac"] == pytest.approx(sum(p["eac"] for p in data["programs"]))
+    assert data["program_count"] == 4
+
+def test_portfolio_filters():
+    active = client.get("/dashboard/portfolio/", params={"as_of_date": "2024-05-15", "program_status": "Active"}).json()
+    assert [p["program_id"] for p in active["programs"]] == ids["programs"][:3]
+    chosen = client.get("/dashboard/portfolio/", params=[
+        ("as_of_date", "2024-05-15"), ("program_id", ids["programs"][1]), ("program_id", ids["programs"][3]), ("top_variances", 1),
+    ]).json()
+    assert [p["program_id"] for p in chosen["programs"]] == [ids["programs"][1], ids["programs"][3]]
+    assert all(len(p["top_variances"]) <= 1 for p in chosen["programs"])
+
+def test_portfolio_query_count_independent_of_programs():
+    # One query for the programs plus four grouped aggregates, however many programs there are.
+    with assert_max_queries(5):
+        assert client.get("/dashboard/portfolio/", params={"as_of_date": "2024-05-15"}).status_code == 200
+
+def test_portfolio_bad_date():
+    assert client.get("/dashboard/portfolio/", params={"as_of_date": "May 2024"}).status_code == 400
+
+def test_program_created_during_the_summary_is_left_out():
+    created = []
+
+    def create_program(conn, cursor, statement, parameters, context, executemany):
+        # Runs before the first aggregate, once the program list has been read.
+        if created or "ledger_monthly_rollup" not in statement:
+            return
+        program_id = conn.exec_driver_sql(
+            "INSERT INTO programs (program_name, program_code, program_manager, program_status) "
+            "VALUES ('Late', 'PFLATE', 'M', 'Active')"
+        ).lastrowid
+        created.append(program_id)
+        conn.exec_driver_sql(
+            "INSERT INTO ledger_monthly_rollup (program_id, wbs_category_id, wbs_subcategory_id, vendor_id, month, "
+            "baseline_amount, planned_amount, actual_amount, earned_amount, dated_count) "
+            f"VALUES ({program_id}, 1, 0, 0, '2024-01', 0, 10, 5, 0, 1)"
+        )
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", create_program)
+    try:
+        summary = compute_portfolio_summary(db, date(2024, 5, 15))
+    finally:
+        event.remove(engine, "before_cursor_execute", create_program)
+        db.rollback()
+        db.close()
+    assert created
+    assert [p["program_id"] for p in summary["programs"]] == ids["programs"]
@@ -0,0 +1,99 @@
+# tests/test_query_tracing.py
+import json
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import Base, engine
+from database import query_tracing
+from database.dashboard_cache import dashboard_cache
+from database.query_tracing import assert_max_queries, trace_queries
+
+client = TestClient(app)
+
+ids = {}
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _row(i):
+    return {
+        "program_id": ids["program"],
+        "vendor_name": f"Vendor {i % 3}",
+        "expense_description": f"Traced row {i}",
+        "wbs_category_id": ids["category"],
+        "planned_date": "2024-01-15",
+        "planned_amount": "10.00",
+        "actual_date": "2024-02-01",
+        "actual_amount": "9.50",
+    }
+
+def test_seed_query_tracing_data():
+    ids["program"] = client.post("/programs/", json={
+        "program_name": "Query Budget Program",
+        "program_code": "QB001",
+        "program_manager": "Manager Q",
+    }).json()["id"]
+    ids["category"] = client.post("/wbs_categories/", json={"program_id": ids["program"], "category_name": "Traced"}).json()["id"]
+    # Bulk ingest is a fixed number of statements however many rows it carries,
+    # including one vendor upsert for vendors this process has not seen yet
+    # and one change-version bump.
+    with assert_max_queries(7):
+        response = client.post("/ledger_transactions/bulk/", json=[_row(i) for i in range(60)])
+    assert response.json()["inserted"] == 60
+
+def test_ledger_reads_within_budget():
+    with assert_max_queries(1):
+        assert client.get("/ledger_transactions/", params={"program_id": ids["program"]}).status_code == 200
+    with assert_max_queries(1):
+        assert client.get("/ledger_transactions/page/", params={"program_id": ids["program"], "limit": 20}).status_code == 200
+    with assert_max_queries(1):
+        assert client.get("/edit_history/page/", params={"limit": 20}).status_code == 200
+
+def test_ledger_writes_within_budget():
+    # Each write transaction also bumps the change version; a delete writes a tombstone.
+    with assert_max_queries(5):
+        transaction_id = client.post("/ledger_transactions/", json=_row(100)).json()["id"]
+    with assert_max_queries(6):
+        assert client.put(f"/ledger_transactions/{transaction_id}", json={"planned_amount": "12.00"}).status_code == 200
+    with assert_max_queries(6):
+        assert client.delete(f"/ledger_transactions/{transaction_id}").status_code == 200
+
+def test_dashboard_within_budget():
+    dashboard_cache.clear()
+    params = {"program_id": ids["program"], "as_of_date": "2024-03-01"}
+    with assert_max_queries(5):
+        assert client.get("/dashboard/summary/", params=params).status_code == 200
+    with assert_max_queries(0):
+        assert client.get("/dashboard/summary/", params=params).status_code == 200
+
+def test_budget_exceeded_lists_statements():
+    with pytest.raises(AssertionError, match="Expected at most 0 SQL statements, 1 were executed"):
+        with assert_max_queries(0):
+            client.get("/programs/")
+
+def test_repeated_statements_detected(caplog):
+    with trace_queries() as trace:
+        for i in range(12):
+            client.get("/ledger_transactions/page/", params={"program_id": ids["program"], "limit": 1})
+    assert trace.count == 12
+    assert list(trace.repeated(10).values()) == [12]
+
+    caplog.set_level(logging.WARNING, logger=query_tracing.__name__)
+    query_tracing.log_repeated_statements(trace, "test")
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["event"] == "repeated_statement"
+    assert record["executions"] == 12
+
+def test_slow_query_logged_with_plan(caplog, monkeypatch):
+    monkeypatch.setattr(query_tracing, "SLOW_QUERY_MS", 0)
+    caplog.set_level(logging.WARNING, logger=query_tracing.__name__)
+    client.get("/ledger_transactions/", params={"program_id": ids["program"]})
+    records = [json.loads(r.getMessage()) for r in caplog.records if r.name == query_tracing.__name__]
+    slow = [r for r in records if r["event"] == "slow_query" and "FROM ledger_transactions" in r["statement"]]
+    assert slow
+    assert slow[0]["parameters"][0] == ids["program"]
+    assert any("ix_ledger_program_id" in line for line in slow[0]["plan"])
@@ -0,0 +1,59 @@
+# tests/test_seed.py
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from main import app
+from database import Base, engine
+from database.history_archive import archive_history, archive_parts, read_part
+from database.seed import seed
+from models.edit_history import EditHistory
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_clear_drops_the_history_and_snapshots_of_cleared_rows(tmp_path):
+    pytest.importorskip("zstandard")
+    program_id = client.post("/programs/", json={
+        "program_name": "Old Program", "program_code": "OLD01", "program_manager": "Manager O",
+    }).json()["id"]
+    old = client.post("/ledger_transactions/", json={
+        "program_id": program_id, "vendor_name": "Old Vendor", "expense_description": "old row", "planned_amount": "999.00",
+    }).json()
+    client.put(f"/ledger_transactions/{old['id']}", json={"planned_amount": "12345.00"})
+    # Archive the creation entries; the update stays in the table.
+    with engine.begin() as conn:
+        conn.execute(update(EditHistory).where(EditHistory.field_changed == "__created__")
+                     .values(edited_at=datetime(2020, 1, 15)))
+        conn.execute(EditHistory.__table__.insert().values(
+            table_name="vendors", record_id=1, field_changed="vendor_name", old_value=None, new_value="kept",
+            edited_by="system", edited_at=datetime(2020, 1, 20)))
+    archive_dir = str(tmp_path / "archive")
+    assert sum(archive_history(engine, datetime(2021, 1, 1), archive_dir).values()) == 3
+
+    snapshot_dir = tmp_path / "snapshots"
+    (snapshot_dir / "program-1").mkdir(parents=True)
+    (snapshot_dir / "program-1" / "ledger-20200101T000000000000-1-e0.parquet").write_bytes(b"")
+
+    seed(engine, programs=1, categories=1, transactions=3, clear=True, archive_dir=archive_dir, snapshot_dir=str(snapshot_dir))
+    assert not snapshot_dir.exists()
+    # The seeded rows reuse the ids, but not the cleared rows' history.
+    rows = client.get("/ledger_transactions/").json()
+    assert old["id"] in {row["id"] for row in rows}
+    assert "old row" not in {row["expense_description"] for row in rows}
+    assert client.get(f"/edit_history/record/ledger_transactions/{old['id']}/",
+                      params={"include_archived": True}).json() == []
+    assert client.get("/edit_history/").json() == []
+    parts = [path for paths in archive_parts(archive_dir).values() for path in paths]
+    assert [row["new_value"] for path in parts for row in read_part(path)] == ["kept"]
+
+def test_seed_appends_unless_asked_to_clear():
+    before = {row["id"] for row in client.get("/ledger_transactions/").json()}
+    assert seed(engine, programs=1, categories=1, transactions=2, random_seed=1)["transactions"] == 2
+    after = {row["id"] for row in client.get("/ledger_transactions/").json()}
+    assert before < after and len(after - before) == 2
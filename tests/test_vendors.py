@@ -0,0 +1,154 @@
+# tests/test_vendors.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+from main import app
+from database import Base, SessionLocal, engine
+import database.database
+from database import migrations
+from database.migrations import (drop_obsolete_indexes, ensure_columns, obsolete_columns, recreate_derived_tables,
+                                 relax_obsolete_columns)
+from database.ledger_search import ensure_search_index
+from database.pagination import MAX_PAGE_SIZE
+from database.rollup import verify_rollup
+from database.vendors import backfill_vendors, canonical_vendor_name, clear_vendor_cache, unlinked_vendor_rows
+from models.ledger_rollup import LedgerMonthlyRollup
+from models.ledger_transaction import LedgerTransaction
+
+client = TestClient(app)
+
+ids = {}
+
+# The ledger table as it was before vendors were interned (without the closing parenthesis).
+LEGACY_LEDGER = ("CREATE TABLE ledger_transactions (id INTEGER PRIMARY KEY, program_id INTEGER NOT NULL REFERENCES programs (id), "
+                 "vendor_name VARCHAR(255) NOT NULL, expense_description TEXT NOT NULL, wbs_category_id INTEGER, "
+                 "wbs_subcategory_id INTEGER, baseline_date DATE, baseline_amount DECIMAL(12,2), planned_date DATE, "
+                 "planned_amount DECIMAL(12,2), actual_date DATE, actual_amount DECIMAL(12,2), invoice_link TEXT, "
+                 "invoice_number VARCHAR(50), notes TEXT, created_at TIMESTAMP, row_version INTEGER NOT NULL DEFAULT 0")
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def _post(vendor_name, amount="100.00", program="program"):
+    return client.post("/ledger_transactions/", json={
+        "program_id": ids[program],
+        "vendor_name": vendor_name,
+        "expense_description": "Vendor line",
+        "actual_date": "2024-02-10",
+        "actual_amount": amount,
+    }).json()
+
+def test_canonical_vendor_name():
+    assert canonical_vendor_name("ACME Corp.") == "acme corp"
+    assert canonical_vendor_name("  Acme   Corporation ") == "acme corp"
+    assert canonical_vendor_name("Café Holdings, Limited") == "cafe holdings ltd"
+    assert canonical_vendor_name(" -- ") == "--"
+    assert canonical_vendor_name("   ") == ""
+
+def test_spellings_share_one_vendor():
+    ids["program"] = client.post("/programs/", json={
+        "program_name": "Vendor Program",
+        "program_code": "VEN01",
+        "program_manager": "Manager V",
+    }).json()["id"]
+    first = _post("Acme Corp", "100.00")
+    second = _post("ACME Corp.", "250.00")
+    client.post("/ledger_transactions/bulk/", json=[
+        {"program_id": ids["program"], "vendor_name": name, "expense_description": "Bulk vendor line",
+         "actual_date": "2024-02-11", "actual_amount": "50.00"}
+        for name in ("acme corporation", "GlobalTech", "Globaltech")
+    ])
+    rows = client.get("/ledger_transactions/", params={"program_id": ids["program"]}).json()
+    assert first["vendor_id"] == second["vendor_id"] is not None
+    assert {r["vendor_name"] for r in rows} == {"Acme Corp", "GlobalTech"}
+    assert len({r["vendor_id"] for r in rows}) == 2
+    assert [v["vendor_name"] for v in client.get("/vendors/").json()] == ["Acme Corp", "GlobalTech"]
+    assert [v["vendor_name"] for v in client.get("/vendors/", params={"skip": 1, "limit": 1}).json()] == ["GlobalTech"]
+    assert client.get("/vendors/", params={"limit": MAX_PAGE_SIZE + 1}).status_code == 422
+    ids["acme"] = first["vendor_id"]
+
+def test_vendor_filter_and_top_vendors_use_the_vendor_key():
+    assert len(client.get("/ledger_transactions/", params={"program_id": ids["program"], "vendor_name": "ACME CORPORATION"}).json()) == 3
+    assert client.get("/ledger_transactions/", params={"vendor_name": "Nobody"}).json() == []
+    summary = client.get("/dashboard/summary/", params={"program_id": ids["program"], "as_of_date": "2024-03-01"}).json()
+    assert summary["top_vendors"] == [{"vendor": "Acme Corp", "spend": 400.0}, {"vendor": "GlobalTech", "spend": 100.0}]
+
+def test_changing_the_vendor_moves_the_row():
+    row = _post("Initech")
+    updated = client.put(f"/ledger_transactions/{row['id']}", json={"vendor_name": "acme corp"}).json()
+    assert updated["vendor_id"] == ids["acme"] and updated["vendor_name"] == "Acme Corp"
+    result = client.patch("/ledger_transactions/bulk/", json={"ids": [row["id"]], "changes": {"vendor_name": "Hooli"}}).json()
+    assert result["items"][0]["vendor_name"] == "Hooli" and result["items"][0]["vendor_id"] != ids["acme"]
+    with SessionLocal() as db:
+        assert verify_rollup(db.connection(), ids["program"]) == []
+
+def test_backfill_links_rows_of_a_database_that_stored_vendor_names(tmp_path, monkeypatch):
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(text(LEGACY_LEDGER + ", vendor_id INTEGER REFERENCES vendors (id))"))
+    Base.metadata.create_all(bind=old)
+    ensure_search_index(old)
+    with old.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_ledger_program_vendor ON ledger_transactions (program_id, vendor_name, id)"))
+        conn.execute(text("INSERT INTO vendors (vendor_name, canonical_name) VALUES ('Acme Corp', 'acme corp')"))
+        conn.execute(text("INSERT INTO programs (program_name, program_code, program_manager, program_status) "
+                          "VALUES ('Old', 'OLD01', 'Manager O', 'Active')"))
+        for name in ("Wayne Enterprises", "WAYNE enterprises", "Acme Corp."):
+            conn.execute(text("INSERT INTO ledger_transactions (program_id, vendor_name, expense_description) "
+                              "VALUES (1, :name, 'Before vendors')"), {"name": name})
+    monkeypatch.setattr(database.database, "engine", old)
+    clear_vendor_cache()
+    try:
+        assert unlinked_vendor_rows(old) == 3
+        assert migrations.main(["drop-obsolete", "--dry-run"]) == 1
+        assert backfill_vendors(old) == 3
+        assert backfill_vendors(old) == 0
+        assert drop_obsolete_indexes(old) == ["ix_ledger_program_vendor"]
+        assert relax_obsolete_columns(old) == [("ledger_transactions", "vendor_name")]
+        assert relax_obsolete_columns(old) == []
+        with Session(old) as db:
+            db.add(LedgerTransaction(program_id=1, vendor_name="Acme Corp", expense_description="After vendors"))
+            db.commit()
+        with old.connect() as conn:
+            rows = conn.execute(select(LedgerTransaction.vendor_name, LedgerTransaction.vendor_id)).all()
+            # The old spellings are kept until the column is dropped on purpose.
+            kept = conn.execute(text("SELECT vendor_name FROM ledger_transactions ORDER BY id")).scalars().all()
+        assert kept == ["Wayne Enterprises", "WAYNE enterprises", "Acme Corp.", None]
+        assert migrations.main(["drop-obsolete", "--dry-run"]) == 0
+        assert [c["name"] for _, c in obsolete_columns(old)] == ["vendor_name"]
+        assert migrations.main(["drop-obsolete"]) == 0
+        assert obsolete_columns(old) == []
+    finally:
+        clear_vendor_cache()
+    assert sorted(name for name, _ in rows) == ["Acme Corp", "Acme Corp", "Wayne Enterprises", "Wayne Enterprises"]
+    assert len({vendor_id for _, vendor_id in rows}) == 2
+    assert {vendor_id for name, vendor_id in rows if name == "Acme Corp"} == {1}
+
+def test_added_vendor_column_references_vendors(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(text(LEGACY_LEDGER + ")"))
+    assert ensure_columns(old) == [("ledger_transactions", "vendor_id")]
+    keys = inspect(old).get_foreign_keys("ledger_transactions")
+    vendor_key = next(k for k in keys if k["constrained_columns"] == ["vendor_id"])
+    assert (vendor_key["referred_table"], vendor_key["referred_columns"]) == ("vendors", ["id"])
+
+def test_migrating_a_vendor_name_rollup(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(text("CREATE TABLE ledger_monthly_rollup (id INTEGER PRIMARY KEY, program_id INTEGER NOT NULL, "
+                          "wbs_category_id INTEGER NOT NULL, wbs_subcategory_id INTEGER NOT NULL, vendor_name VARCHAR(255) NOT NULL, "
+                          "month VARCHAR(7) NOT NULL, baseline_amount DECIMAL(14,2) NOT NULL, planned_amount DECIMAL(14,2) NOT NULL, "
+                          "actual_amount DECIMAL(14,2) NOT NULL, earned_amount DECIMAL(14,2) NOT NULL DEFAULT 0)"))
+        conn.execute(text("CREATE TABLE ledger_transactions (id INTEGER PRIMARY KEY, vendor_name VARCHAR(255) NOT NULL)"))
+        conn.execute(text("CREATE INDEX ix_ledger_vendor ON ledger_transactions (vendor_name, id)"))
+    rollup = LedgerMonthlyRollup.__table__
+    assert recreate_derived_tables(old, [rollup]) == [rollup.name]
+    assert "vendor_id" in {c["name"] for c in inspect(old).get_columns(rollup.name)}
+    assert recreate_derived_tables(old, [rollup]) == []
+    assert drop_obsolete_indexes(old) == ["ix_ledger_vendor"]
+    assert drop_obsolete_indexes(old) == []